@@ -89,11 +89,44 @@ THIRD_PARTY_MIDDLEWARE = [
 
 CUSTOM_MIDDLEWARE = [
     'core.middleware.DatabaseConnectionMiddleware',
+    'core.middleware.ReadYourWritesMiddleware',
     'core.middleware.AdminCSPMiddleware',
     'core.middleware.APIAuthenticationDebugMiddleware',
 ]
 
-MIDDLEWARE = THIRD_PARTY_MIDDLEWARE + DJANGO_MIDDLEWARE + CUSTOM_MIDDLEWARE
+# Outermost so they see every query of the request and the bytes actually sent
+INSTRUMENTATION_MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.QueryInstrumentationMiddleware',
+]
+
+# Compresses the finished response body, so it sits outside everything that produces it
+COMPRESSION_MIDDLEWARE = [
+    'core.middleware.CompressionMiddleware',
+]
+
+MIDDLEWARE = (
+    INSTRUMENTATION_MIDDLEWARE + COMPRESSION_MIDDLEWARE + THIRD_PARTY_MIDDLEWARE + DJANGO_MIDDLEWARE + CUSTOM_MIDDLEWARE
+)
+
+# Per-request query count / duplicate SQL / timing report (Server-Timing header + log line)
+QUERY_INSTRUMENTATION_ENABLED = os.environ.get('QUERY_INSTRUMENTATION_ENABLED', 'False').lower() == 'true'
+QUERY_INSTRUMENTATION_WARN_THRESHOLD = int(os.environ.get('QUERY_INSTRUMENTATION_WARN_THRESHOLD', 50))
+
+# Per-route request histograms and fetch daemon counters (core.metrics). Each process publishes
+# its values to the cache; with the default locmem cache readers only see their own process.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+METRICS_PUBLISH_INTERVAL = int(os.environ.get('METRICS_PUBLISH_INTERVAL', 10))
+METRICS_PROCESS_TTL = int(os.environ.get('METRICS_PROCESS_TTL', 300))
+# Bearer token Prometheus sends to /metrics/ (the endpoint answers 404 while unset)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Brotli for JSON, Django's padded gzip otherwise (turn off if the proxy already compresses API responses)
+RESPONSE_COMPRESSION_ENABLED = os.environ.get('RESPONSE_COMPRESSION_ENABLED', 'True').lower() == 'true'
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', 1024))
+RESPONSE_COMPRESSION_BROTLI_QUALITY = int(os.environ.get('RESPONSE_COMPRESSION_BROTLI_QUALITY', 5))
+# Responses carrying credentials are sent uncompressed (BREACH)
+RESPONSE_COMPRESSION_EXCLUDED_PATHS = ('/api/token/', '/api/auth/')
 
 ROOT_URLCONF = 'attendance_system.urls'
 
@@ -148,6 +181,41 @@ STATICFILES_FINDERS = [
 MEDIA_URL = os.environ.get('MEDIA_URL', '/media/')
 MEDIA_ROOT = os.environ.get('MEDIA_ROOT', BASE_DIR / 'media')
 
+# Generated files with personal data (salary slip ZIPs, job progress) live outside
+# MEDIA_ROOT so the web server never publishes them; they are served by authenticated views
+PRIVATE_MEDIA_ROOT = os.environ.get('PRIVATE_MEDIA_ROOT', BASE_DIR / 'private_media')
+
+# Stored document downloads: 'django' streams the file (Range/ETag aware);
+# 'x-accel' (nginx internal location) or 'x-sendfile' (Apache) hand it to the web server
+FILE_SERVING_MODE = os.environ.get('FILE_SERVING_MODE', 'django')
+FILE_SERVING_ACCEL_PREFIX = os.environ.get('FILE_SERVING_ACCEL_PREFIX', '/protected-media/')
+
+# Content-hash PDF cache under PRIVATE_MEDIA_ROOT/pdf_cache/: entries unused for
+# PDF_CACHE_MAX_AGE seconds are pruned, and the least recently used beyond PDF_CACHE_MAX_FILES
+PDF_CACHE_MAX_AGE = int(os.environ.get('PDF_CACHE_MAX_AGE', 60 * 60 * 24 * 7))
+PDF_CACHE_MAX_FILES = int(os.environ.get('PDF_CACHE_MAX_FILES', 2000))
+
+# WeasyPrint is imported on first PDF; set true on dedicated document/Celery workers to load it at startup
+PDF_ENGINE_PREWARM = os.environ.get('PDF_ENGINE_PREWARM', 'False').lower() == 'true'
+
+# Salary slip batch generation: worker processes (default one per CPU core). Celery prefork
+# children are daemonic and cannot start a pool, so slips render serially there; run the
+# queue on a worker started with --pool=solo/threads or use the generate_salary_slips command
+SALARY_SLIP_BATCH_MAX_WORKERS = int(os.environ.get('SALARY_SLIP_BATCH_MAX_WORKERS', 0)) or None
+
+# =============================================================================
+# DATABASE ROUTING
+# =============================================================================
+# Reports, dashboards and salary statistics read from DATABASES['reporting'] when the
+# environment defines it (replica in production, local snapshot in development)
+DATABASE_ROUTERS = ['core.db_routers.ReportingRouter']
+REPORTING_DB_ALIAS = 'reporting'
+# Fall back to the primary when the replica is further behind than this (None: never check)
+REPORTING_MAX_LAG_SECONDS = int(os.environ.get('REPORTING_MAX_LAG_SECONDS', 30))
+REPORTING_LAG_CHECK_INTERVAL = int(os.environ.get('REPORTING_LAG_CHECK_INTERVAL', 15))
+# Read-your-writes: after a user's write their reports read from the primary this long
+REPORTING_PIN_SECONDS = int(os.environ.get('REPORTING_PIN_SECONDS', 10))
+
 # =============================================================================
 # AUTHENTICATION AND USER MODEL
 # =============================================================================
@@ -165,7 +233,7 @@ AUTHENTICATION_BACKENDS = [
 # =============================================================================
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedUserJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -178,7 +246,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        # orjson when installed (optional), DRF's JSONRenderer otherwise
+        'core.renderers.FastJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -205,6 +274,10 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
 }
 
+# Seconds the JWT authentication keeps a user's auth columns cached (0: load the user every request).
+# Saves/deletes invalidate the entry in this process; other processes see the change within the TTL
+AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL', 60))
+
 # =============================================================================
 # CORS CONFIGURATION
 # =============================================================================
@@ -23,6 +23,26 @@ DATABASES = {
     }
 }
 
+# Optional reporting snapshot so report queries don't touch the shared database:
+# REPORTING_SQLITE_PATH for a SQLite copy, or REPORTING_DB_NAME for a local MySQL restore
+if os.environ.get('REPORTING_SQLITE_PATH'):
+    DATABASES['reporting'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['REPORTING_SQLITE_PATH'],
+        'REPORTING_SNAPSHOT': True,
+    }
+elif os.environ.get('REPORTING_DB_NAME'):
+    DATABASES['reporting'] = {
+        'ENGINE': 'django.db.backends.mysql',
+        'NAME': os.environ['REPORTING_DB_NAME'],
+        'USER': os.environ.get('REPORTING_DB_USER', 'root'),
+        'PASSWORD': os.environ.get('REPORTING_DB_PASSWORD', ''),
+        'HOST': os.environ.get('REPORTING_DB_HOST', '127.0.0.1'),
+        'PORT': os.environ.get('REPORTING_DB_PORT', '3306'),
+        'OPTIONS': {'charset': 'utf8mb4'},
+        'REPORTING_SNAPSHOT': True,
+    }
+
 # Channels Configuration for development
 CHANNEL_LAYERS = {
     'default': {
@@ -7,9 +7,13 @@ ALLOWED_HOSTS = [host.strip() for host in os.environ.get('ALLOWED_HOSTS', 'compa
 
 # Database configuration for production
 # Usually taken from environment variables
+DB_ENGINE = os.environ.get('DB_ENGINE', 'core.db_pool')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        # core.db_pool keeps a few connections per worker and counts new ones against
+        # the host's max_connections_per_hour; set DB_ENGINE=django.db.backends.mysql to opt out
+        'ENGINE': DB_ENGINE,
         'NAME': os.environ.get('DB_NAME', 'u434975676_DOS'),
         'USER': os.environ.get('DB_USER', 'u434975676_bimal'),
         'PASSWORD': os.environ.get('DB_PASSWORD', 'DishaSolution@8989'),
@@ -20,10 +24,30 @@ DATABASES = {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
             'connect_timeout': 60,
         },
-        'CONN_MAX_AGE': 600,
+        # The pool owns connection lifetime; Django's persistent connections only for the plain engine
+        'CONN_MAX_AGE': 0 if DB_ENGINE == 'core.db_pool' else 600,
+        'POOL': {
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 4)),
+            'CHECKOUT_TIMEOUT': int(os.environ.get('DB_POOL_CHECKOUT_TIMEOUT', 10)),
+            'MAX_IDLE': int(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+            'MAX_LIFETIME': int(os.environ.get('DB_POOL_MAX_LIFETIME', 3600)),
+            'HOURLY_BUDGET': int(os.environ.get('DB_CONNECTIONS_PER_HOUR', 500)),
+        },
     }
 }
 
+# Read replica for reports and dashboards (see core.db_routers); unset DB_REPLICA_HOST keeps them on the primary
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['reporting'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['DB_REPLICA_HOST'],
+        'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'USER': os.environ.get('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'POOL': {**DATABASES['default']['POOL'], 'MAX_SIZE': int(os.environ.get('DB_REPLICA_POOL_MAX_SIZE', 2))},
+        'TEST': {'MIRROR': 'default'},
+    }
+
 # Channels Configuration for production (uses Redis)
 CHANNEL_LAYERS = {
     'default': {
@@ -0,0 +1,111 @@
+"""
+Access Scope
+The requesting user's role and office reach, resolved once per request and
+applied as a queryset filter by the viewsets
+"""
+
+from functools import cached_property
+
+from django.db.models import Q
+
+ROLE_ADMIN = 'admin'
+ROLE_MANAGER = 'manager'
+ROLE_ACCOUNTANT = 'accountant'
+ROLE_EMPLOYEE = 'employee'
+
+
+class AccessScope:
+    """
+    Role, own office and managed offices of one user. Built from the user row
+    already loaded by authentication; the managed-office lookup (Office.managers)
+    runs at most once and only when a manager's queryset is actually scoped.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.authenticated = bool(user and user.is_authenticated)
+        self.user_id = user.pk if self.authenticated else None
+        self.role = getattr(user, 'role', None) if self.authenticated else None
+        self.is_superuser = bool(self.authenticated and user.is_superuser)
+        # office_id, not office: no lazy FK fetch
+        self.office_id = getattr(user, 'office_id', None) if self.authenticated else None
+
+    @property
+    def is_admin(self):
+        return self.role == ROLE_ADMIN
+
+    @property
+    def is_manager(self):
+        return self.role == ROLE_MANAGER
+
+    @property
+    def is_accountant(self):
+        return self.role == ROLE_ACCOUNTANT
+
+    @property
+    def is_employee(self):
+        return self.role == ROLE_EMPLOYEE
+
+    def has_role(self, *roles):
+        return self.role in roles
+
+    @cached_property
+    def managed_office_ids(self):
+        """Offices listing the user in Office.managers"""
+        if not self.is_manager:
+            return frozenset()
+        return frozenset(self.user.managed_offices.values_list('id', flat=True))
+
+    @cached_property
+    def office_ids(self):
+        """Offices whose data the user may see as a manager: their own plus the ones they manage"""
+        ids = set(self.managed_office_ids)
+        if self.office_id:
+            ids.add(self.office_id)
+        return frozenset(ids)
+
+    def can_access_office(self, office_id):
+        if self.is_admin:
+            return True
+        return office_id is not None and office_id in self.office_ids
+
+    def filter(self, queryset, office_field, user_field=None, see_all=(ROLE_ADMIN,),
+               manager_includes_own=False):
+        """
+        Restrict `queryset` to what the user may see:
+        - roles in `see_all` (and superusers when 'superuser' is listed) get everything;
+        - managers get rows whose `office_field` is one of their offices, plus their own
+          rows through `user_field` when `manager_includes_own`;
+        - everyone else gets their own rows through `user_field`, or nothing without one.
+        """
+        if not self.authenticated:
+            return queryset.none()
+        if self.role in see_all or (self.is_superuser and 'superuser' in see_all):
+            return queryset
+        if self.is_manager:
+            condition = Q(**{f'{office_field}__in': self.office_ids}) if self.office_ids else Q(pk__in=[])
+            if manager_includes_own and user_field:
+                condition |= Q(**{user_field: self.user_id})
+            return queryset.filter(condition)
+        if user_field:
+            return queryset.filter(**{user_field: self.user_id})
+        return queryset.none()
+
+
+def get_access_scope(request):
+    """The request's AccessScope, built on first use and cached on the underlying HttpRequest"""
+    http_request = getattr(request, '_request', request)
+    user = request.user
+    scope = getattr(http_request, '_access_scope', None)
+    if scope is None or scope.user is not user:
+        scope = AccessScope(user)
+        http_request._access_scope = scope
+    return scope
+
+
+class AccessScopeMixin:
+    """Gives views `self.access_scope`"""
+
+    @property
+    def access_scope(self):
+        return get_access_scope(self.request)
@@ -22,6 +22,7 @@ from .models import (
     WorkingHoursSettings, Resignation, DocumentTemplate, GeneratedDocument,
     Department, Designation, Shift, EmployeeShiftAssignment, BankAccountHistory
 )
+from .conditional import bump_model_version
 
 
 @admin.register(Office)
@@ -62,12 +63,14 @@ class DepartmentAdmin(SimpleHistoryAdmin, ModelAdmin):
     def activate_departments(self, request, queryset):
         """Activate selected departments"""
         updated = queryset.update(is_active=True)
+        bump_model_version(queryset.model)  # update() skips the signals
         self.message_user(request, f'{updated} departments activated.')
     activate_departments.short_description = "Activate selected departments"
     
     def deactivate_departments(self, request, queryset):
         """Deactivate selected departments"""
         updated = queryset.update(is_active=False)
+        bump_model_version(queryset.model)  # update() skips the signals
         self.message_user(request, f'{updated} departments deactivated.')
     deactivate_departments.short_description = "Deactivate selected departments"
 
@@ -94,12 +97,14 @@ class DesignationAdmin(SimpleHistoryAdmin, ModelAdmin):
     def activate_designations(self, request, queryset):
         """Activate selected designations"""
         updated = queryset.update(is_active=True)
+        bump_model_version(queryset.model)  # update() skips the signals
         self.message_user(request, f'{updated} designations activated.')
     activate_designations.short_description = "Activate selected designations"
     
     def deactivate_designations(self, request, queryset):
         """Deactivate selected designations"""
         updated = queryset.update(is_active=False)
+        bump_model_version(queryset.model)  # update() skips the signals
         self.message_user(request, f'{updated} designations deactivated.')
     deactivate_designations.short_description = "Deactivate selected designations"
 
@@ -733,7 +738,7 @@ class DeviceUserAdmin(ModelAdmin):
 @admin.register(Attendance)
 class AttendanceAdmin(ModelAdmin):
     list_display = ['user', 'date', 'check_in_time', 'check_out_time', 'total_hours', 'status', 'day_status', 'is_late', 'device']
-    list_filter = ['status', 'day_status', 'is_late', 'date', 'device', 'user__office']
+    list_filter = ['status', 'day_status', 'is_late', 'date', 'device', 'office']
     search_fields = ['user__first_name', 'user__last_name', 'user__employee_id', 'notes']
     ordering = ['-date', '-check_in_time']
     readonly_fields = ['id', 'total_hours', 'day_status', 'is_late', 'late_minutes', 'created_at', 'updated_at']
@@ -30,4 +30,14 @@ class CoreConfig(AppConfig):
         django.contrib.auth.update_last_login = dummy_update_last_login
         
         # Import signals to ensure they are connected
-        import core.signals
\ No newline at end of file
+        import core.signals
+        
+        # WeasyPrint loads on first PDF; dedicated document workers can opt into paying it at startup
+        from django.conf import settings
+        if getattr(settings, 'PDF_ENGINE_PREWARM', False):
+            from core.pdf_engine import prewarm
+            try:
+                prewarm()
+            except Exception as e:
+                import logging
+                logging.getLogger(__name__).warning(f"PDF engine pre-warm failed: {e}")
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""
+Attendance Scope
+Keeps the denormalized Attendance.office / user_active columns in step with the user
+"""
+
+import logging
+
+from .conditional import bump_model_version
+from .models import Attendance, CustomUser
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 2000
+
+
+def _sync_rows(user_id, office_id, user_active, batch_size):
+    """Rewrite the user's rows whose copy differs, at most batch_size rows per UPDATE"""
+    stale = Attendance.objects.filter(user_id=user_id).exclude(office_id=office_id, user_active=user_active)
+    updated = 0
+    while True:
+        ids = list(stale.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            if updated:
+                bump_model_version(Attendance)
+            return updated
+        # QuerySet.update() leaves updated_at alone, so real-time change feeds don't fire
+        updated += Attendance.objects.filter(pk__in=ids).update(office_id=office_id, user_active=user_active)
+
+
+def sync_user_attendance_scope(user_id, batch_size=BATCH_SIZE):
+    """Bring one user's attendance rows in line with their current office/active flag"""
+    user = CustomUser.objects.filter(pk=user_id).values('office_id', 'is_active').first()
+    if user is None:
+        return 0
+    updated = _sync_rows(user_id, user['office_id'], user['is_active'], batch_size)
+    if updated:
+        logger.info(f"Attendance scope synced for user {user_id}: {updated} rows")
+    return updated
+
+
+def backfill_attendance_scope(user_ids=None, batch_size=BATCH_SIZE):
+    """Re-sync every user's rows (or only `user_ids`); safe to re-run, in-sync rows are skipped"""
+    users = CustomUser.objects.all()
+    if user_ids:
+        users = users.filter(pk__in=user_ids)
+
+    result = {'users': 0, 'updated': 0}
+    for user in users.values('id', 'office_id', 'is_active').iterator():
+        result['users'] += 1
+        result['updated'] += _sync_rows(user['id'], user['office_id'], user['is_active'], batch_size)
+    logger.info(f"Attendance scope backfill: {result['updated']} rows across {result['users']} users")
+    return result
+
+
+def schedule_user_scope_sync(user_id):
+    """Queue the re-sync on Celery; run it inline when no worker/broker is reachable"""
+    try:
+        from .tasks import sync_attendance_scope_task
+        sync_attendance_scope_task.delay(str(user_id))
+    except Exception as e:
+        logger.warning(f"Could not queue attendance scope sync for user {user_id}, running inline: {e}")
+        sync_user_attendance_scope(user_id)
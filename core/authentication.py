@@ -2,8 +2,26 @@
 Custom authentication classes for the Attendance System
 """
 
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_PREFIX = 'auth_user'
+
+# Columns most requests touch (permissions, access scope, names); anything else
+# is a deferred field and loads on first access like any .only() queryset
+CACHED_USER_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'role', 'office_id',
+    'department_id', 'designation_id', 'employee_id', 'biometric_id',
+    'is_active', 'is_staff', 'is_superuser',
+)
 
 
 class CustomJWTAuthentication(JWTAuthentication):
@@ -24,3 +42,81 @@ class CustomJWTAuthentication(JWTAuthentication):
             if request.path in ['/api/auth/login/', '/api/auth/register/']:
                 return None
             raise
+
+
+def _user_cache_key(user_id):
+    return f'{USER_CACHE_PREFIX}:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    """Drop the cached auth row; called on user save/delete"""
+    try:
+        cache.delete(_user_cache_key(user_id))
+    except Exception as e:
+        logger.warning(f"Could not invalidate cached user {user_id}: {e}")
+
+
+def hydrate_cached_user(values):
+    """
+    CustomUser from a CACHED_USER_FIELDS row. from_db() assigns values in
+    concrete-field order, so field names and values are passed in that order.
+    """
+    from .models import CustomUser
+
+    field_names = [field.attname for field in CustomUser._meta.concrete_fields if field.attname in values]
+    return CustomUser.from_db('default', field_names, [values[name] for name in field_names])
+
+
+class ScopedRefreshToken(RefreshToken):
+    """
+    Refresh token carrying role, office and active flag as signed claims (copied
+    into every access token), so clients can read them without a profile call and
+    deactivated accounts are refused before any lookup.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['role'] = user.role
+        token['office_id'] = str(user.office_id) if user.office_id else None
+        token['is_active'] = user.is_active
+        return token
+
+
+class CachedUserJWTAuthentication(CustomJWTAuthentication):
+    """
+    JWT authentication that hydrates request.user from a short-lived cache
+    instead of selecting the full CustomUser row on every call.
+
+    The user is a real CustomUser built with from_db() from CACHED_USER_FIELDS,
+    so it works in filters, comparisons and saves; other columns are deferred.
+    The cache entry (AUTH_USER_CACHE_TTL seconds, 0 disables it) is refilled
+    from the database on a miss and dropped whenever the user is saved or deleted.
+    Current data always wins over the token's claims.
+    """
+
+    def get_user(self, validated_token):
+        from .models import CustomUser
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        if validated_token.get('is_active') is False:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+
+        ttl = getattr(settings, 'AUTH_USER_CACHE_TTL', 60)
+        key = _user_cache_key(user_id)
+        values = cache.get(key) if ttl else None
+        if values is None:
+            values = CustomUser.objects.filter(pk=user_id).values(*CACHED_USER_FIELDS).first()
+            if values is None:
+                raise AuthenticationFailed('User not found', code='user_not_found')
+            if ttl:
+                cache.set(key, values, ttl)
+
+        if not values['is_active']:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+
+        return hydrate_cached_user(values)
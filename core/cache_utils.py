@@ -0,0 +1,17 @@
+"""
+Cache Utilities
+Whether CACHES['default'] is shared by every process of the deployment
+"""
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def cache_is_shared():
+    """
+    True when writes and deletes made by one process (web workers, the fetch
+    daemons, Celery) are seen by all others. The default LocMem cache is
+    per-process: anything invalidated through it must also expire quickly.
+    """
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
@@ -0,0 +1,210 @@
+"""
+Conditional GET
+ETag validators for read-mostly list endpoints. With a shared cache the tag comes
+from per-model version counters (no query before a 304); with a per-process cache
+(LocMem) it comes from one (latest change, row count) aggregate per table, since
+bumps made by other workers, the fetch daemons and the push vhost never reach it.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import HttpResponseNotModified
+from django.utils import timezone
+from django.utils.http import parse_etags
+
+from .access_scope import get_access_scope
+from .cache_utils import cache_is_shared
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'resource_version:{label}'
+
+_metrics_lock = threading.Lock()
+_metrics = {}
+
+
+def _version_key(model):
+    return VERSION_KEY.format(label=model._meta.label_lower)
+
+
+def bump_model_version(model):
+    """
+    Invalidate every ETag built from `model`. Called from post_save/post_delete
+    and by code paths that write through QuerySet.update() or bulk_create().
+    """
+    key = _version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # No counter yet (or evicted): start from the clock so it can't repeat an old value
+        cache.set(key, int(time.time() * 1000), None)
+    except Exception as e:
+        logger.warning(f"Could not bump resource version for {model._meta.label}: {e}")
+
+
+def model_versions(models):
+    """Current version of each model, in order; missing counters are created"""
+    keys = [_version_key(model) for model in models]
+    try:
+        found = cache.get_many(keys)
+    except Exception as e:
+        logger.warning(f"Could not read resource versions: {e}")
+        return None
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            version = int(time.time() * 1000)
+            # add(): concurrent first readers agree on one version
+            if not cache.add(key, version, None):
+                version = cache.get(key, version)
+        versions.append(version)
+    return versions
+
+
+def _timestamp_field(model):
+    field_names = {field.name for field in model._meta.concrete_fields}
+    for name in ('updated_at', 'created_at'):
+        if name in field_names:
+            return name
+    return None
+
+
+def db_versions(sources):
+    """
+    '<latest change>:<row count>' per source, one aggregate query each. A source
+    is a queryset (latest updated_at, else created_at) or a (queryset, field) pair.
+    None when a source has no timestamp field or the database can't be read.
+    """
+    versions = []
+    for source in sources:
+        queryset, field = source if isinstance(source, tuple) else (source, _timestamp_field(source.model))
+        if field is None:
+            return None
+        try:
+            result = queryset.order_by().aggregate(latest=Max(field), rows=Count('pk'))
+        except Exception as e:
+            logger.warning(f"Could not read resource version of {queryset.model._meta.label}: {e}")
+            return None
+        latest = result['latest'].isoformat() if result['latest'] else '-'
+        versions.append(f"{latest}:{result['rows']}")
+    return versions
+
+
+def etag_matches(etag, if_none_match):
+    """
+    Weak comparison, as If-None-Match requires: the compression middleware
+    marks tags of compressed bodies W/
+    """
+    if not if_none_match:
+        return False
+    tags = parse_etags(if_none_match)
+    if '*' in tags:
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in tags}
+
+
+def _opaque(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def _record(resource, hit):
+    with _metrics_lock:
+        counters = _metrics.setdefault(resource, {'requests': 0, 'not_modified': 0})
+        counters['requests'] += 1
+        if hit:
+            counters['not_modified'] += 1
+
+
+def conditional_get_metrics():
+    """Per-resource request / 304 counts and hit rate for this worker process"""
+    with _metrics_lock:
+        snapshot = {resource: dict(counters) for resource, counters in _metrics.items()}
+    for counters in snapshot.values():
+        counters['hit_rate'] = round(counters['not_modified'] / counters['requests'], 4) if counters['requests'] else 0.0
+    return snapshot
+
+
+class NotModified(Exception):
+    """Raised from initial() to skip the handler; turned into a 304 by handle_exception()"""
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETag / If-None-Match handling to a viewset's read actions.
+
+    The tag hashes the versions of `conditional_models` (cache counters bumped by
+    signals, or database aggregates without a shared cache), the requesting user's
+    scope, the path and query string, the negotiated format and today's date (for
+    day-relative figures). Authentication, permissions and throttling still run;
+    the queryset and serializer do not on a 304.
+    """
+    conditional_models = ()
+    conditional_actions = ('list', 'retrieve')
+
+    def get_conditional_models(self):
+        return self.conditional_models
+
+    def get_conditional_sources(self):
+        """
+        What db_versions() aggregates when the counters aren't shared: every row of
+        each conditional model by default. Override to narrow big tables to the rows
+        the action shows; return None to skip conditional GET for the request.
+        """
+        return [model._default_manager.all() for model in self.get_conditional_models()]
+
+    def get_conditional_etag(self, request):
+        if cache_is_shared():
+            versions = model_versions(self.get_conditional_models())
+        else:
+            sources = self.get_conditional_sources()
+            versions = db_versions(sources) if sources is not None else None
+        if versions is None:
+            return None
+        scope = get_access_scope(request)
+        parts = [
+            self.__class__.__name__,
+            self.action,
+            ','.join(str(version) for version in versions),
+            f'{scope.user_id}:{scope.role}:{scope.office_id}:{scope.is_superuser}',
+            # A manager's reach changes with Office.managers, which no version covers
+            ','.join(sorted(str(office_id) for office_id in scope.office_ids)),
+            request.path,
+            '&'.join(sorted(f'{key}={value}' for key, values in request.query_params.lists() for value in values)),
+            getattr(request, 'accepted_media_type', '') or '',
+            timezone.localdate().isoformat(),
+        ]
+        return '"%s"' % hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:20]
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._conditional_etag = None
+        if request.method not in ('GET', 'HEAD') or self.action not in self.conditional_actions:
+            return
+        self._conditional_etag = self.get_conditional_etag(request)
+        if self._conditional_etag is None:
+            return
+        hit = etag_matches(self._conditional_etag, request.headers.get('If-None-Match'))
+        _record(self.__class__.__name__, hit)
+        if hit:
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return HttpResponseNotModified()
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = getattr(self, '_conditional_etag', None)
+        if etag and response.status_code in (200, 304):
+            response['ETag'] = etag
+            # Clients keep their copy but must revalidate
+            response['Cache-Control'] = 'private, no-cache'
+            response['Vary'] = 'Authorization, Accept'
+        return response
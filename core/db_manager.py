@@ -11,6 +11,8 @@ from contextlib import contextmanager
 from django.db import connection, connections, close_old_connections
 from django.conf import settings
 
+from .db_pool.pool import close_idle_pooled_connections, pool_metrics, pooled_connection
+
 logger = logging.getLogger(__name__)
 
 class DatabaseConnectionManager:
@@ -44,42 +46,34 @@ class DatabaseConnectionManager:
             return False
     
     def close_idle_connections(self):
-        """Close idle database connections"""
+        """
+        Release idle database connections.
+        Persistent (CONN_MAX_AGE) connections are only closed once expired or broken,
+        and pooled connections stay in the pool: force-closing them would cost a new
+        connection against the hourly limit on the next query.
+        """
         try:
             with self._lock:
-                # Use Django's built-in function to close old connections
                 close_old_connections()
-                
-                # Also close Django's default connection if it's been open too long
-                if hasattr(connection, 'connection') and connection.connection:
+                if getattr(connection, 'is_pooled', False) and not connection.in_atomic_block:
+                    # Returns this thread's connection to the pool
                     connection.close()
-                    
-            logger.info("Closed idle database connections")
+            logger.debug("Released idle database connections")
         except Exception as e:
             logger.error(f"Error closing idle connections: {e}")
     
     @contextmanager
     def managed_connection(self):
-        """Context manager for database connections"""
+        """Context manager for database connections (a pooled unit of work)"""
         start_time = time.time()
         try:
-            # Close old connections before starting
-            close_old_connections()
-            
-            # Check connection health before use
-            if not self.check_connection_health():
-                self.close_idle_connections()
-                close_old_connections()
-            
-            yield connection
-            
+            # Health is checked by the pool on checkout, no per-call SELECT 1
+            with pooled_connection():
+                yield connection
         except Exception as e:
             logger.error(f"Database operation failed: {e}")
             raise
         finally:
-            # Close connections after use
-            close_old_connections()
-            
             # Log connection usage
             duration = time.time() - start_time
             if duration > 5:  # Log slow queries
@@ -108,10 +102,16 @@ class DatabaseConnectionManager:
                     conn = connections[conn_name]
                     if hasattr(conn, 'connection') and conn.connection:
                         conn.close()
+                # Pooled connections go back to the pool on close(); drop the idle ones too
+                close_idle_pooled_connections()
                         
             logger.info("Reset all database connections")
         except Exception as e:
             logger.error(f"Error resetting connections: {e}")
+    
+    def get_pool_metrics(self):
+        """Pool and hourly connection budget metrics for this process"""
+        return pool_metrics()
 
 # Global instance
 db_manager = DatabaseConnectionManager()
@@ -0,0 +1,7 @@
+"""
+Pooled MySQL database engine.
+
+Use ENGINE = 'core.db_pool' with an optional POOL dict in the DATABASES entry
+(see pool.DEFAULT_POOL_OPTIONS). Physical connections are kept in a bounded
+per-process pool instead of being opened per thread/request.
+"""
@@ -0,0 +1,51 @@
+"""
+MySQL backend whose connect/close check connections out of and back into
+the per-process pool (core.db_pool.pool).
+"""
+
+import logging
+
+from django.db.backends.mysql.base import Database
+from django.db.backends.mysql.base import DatabaseWrapper as MySQLDatabaseWrapper
+
+from .pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseWrapper(MySQLDatabaseWrapper):
+    is_pooled = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._reused_connection = False
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, super().get_new_connection, self.settings_dict.get('POOL'))
+
+    def get_new_connection(self, conn_params):
+        try:
+            raw, self._reused_connection = self.pool.checkout(conn_params)
+        except TimeoutError as e:
+            raise Database.OperationalError(2003, str(e))
+        return raw
+
+    def init_connection_state(self):
+        # Session variables set on first connect survive in a pooled connection
+        if not self._reused_connection:
+            super().init_connection_state()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        raw = self.connection
+        # A connection closed mid-transaction or broken by an error is not reused;
+        # a benign error (e.g. IntegrityError) leaves it usable, so ping before dropping it
+        discard = self.in_atomic_block or (self.errors_occurred and not self.is_usable())
+        if not discard and not self.autocommit:
+            try:
+                raw.rollback()
+            except Exception:
+                discard = True
+        self.pool.release(raw, discard=discard)
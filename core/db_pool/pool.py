@@ -0,0 +1,349 @@
+"""
+Bounded MySQL connection pool with an hourly connection budget.
+
+The hosted MySQL caps max_connections_per_hour, so a physical connection is
+the scarce resource: the pool keeps a few per worker process, hands them to
+whichever thread needs one and only pings a connection when it has been idle
+long enough to possibly be dead.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_OPTIONS = {
+    'MAX_SIZE': 4,                # Physical connections per worker process
+    'CHECKOUT_TIMEOUT': 10,       # Seconds to wait for a free connection when the pool is full
+    'HEALTH_CHECK_AFTER': 30,     # Ping on checkout only if idle for longer than this
+    'MAX_IDLE': 300,              # Drop idle connections before MySQL's wait_timeout does
+    'MAX_LIFETIME': 3600,         # Recycle connections after this many seconds (skipped near the budget)
+    'HOURLY_BUDGET': 500,         # max_connections_per_hour granted by the host
+    'ALERT_RATIO': 0.8,           # Warn once per hour when this share of the budget is used
+}
+
+BUDGET_CACHE_PREFIX = 'db_connection_budget'
+
+
+class ConnectionBudget:
+    """
+    Counts new physical connections per clock hour.
+
+    The local count covers this process; the shared count goes through the
+    cache so every worker using the same cache sees the total.
+    """
+
+    def __init__(self, alias, hourly_budget, alert_ratio):
+        self.alias = alias
+        self.hourly_budget = hourly_budget
+        self.alert_ratio = alert_ratio
+        self._lock = threading.Lock()
+        self._hour = None
+        self._local_count = 0
+        self._alerted = set()
+
+    def _current_hour(self):
+        return datetime.now().strftime('%Y%m%d%H')
+
+    def _cache_key(self, hour):
+        return f'{BUDGET_CACHE_PREFIX}:{self.alias}:{hour}'
+
+    def record_connect(self):
+        hour = self._current_hour()
+        with self._lock:
+            if hour != self._hour:
+                self._hour, self._local_count, self._alerted = hour, 0, set()
+            self._local_count += 1
+
+        shared = self._incr_shared(hour)
+        used = max(shared, self._local_count)
+        self._maybe_alert(hour, used)
+        return used
+
+    def _incr_shared(self, hour):
+        key = self._cache_key(hour)
+        try:
+            cache.add(key, 0, 60 * 60 * 2)
+            return cache.incr(key)
+        except Exception:
+            # Cache down: fall back to this process's own count
+            return self._local_count
+
+    def used(self):
+        hour = self._current_hour()
+        try:
+            shared = cache.get(self._cache_key(hour)) or 0
+        except Exception:
+            shared = 0
+        local = self._local_count if self._hour == hour else 0
+        return max(shared, local)
+
+    def near_limit(self):
+        return self.hourly_budget and self.used() >= self.hourly_budget * self.alert_ratio
+
+    def _maybe_alert(self, hour, used):
+        if not self.hourly_budget:
+            return
+        level = None
+        if used >= self.hourly_budget:
+            level = 'exhausted'
+        elif used >= self.hourly_budget * self.alert_ratio:
+            level = 'warning'
+        if level is None or level in self._alerted:
+            return
+        self._alerted.add(level)
+        message = (
+            f"DB connection budget for '{self.alias}' {level}: "
+            f"{used}/{self.hourly_budget} new connections this hour"
+        )
+        if level == 'exhausted':
+            logger.error(message)
+        else:
+            logger.warning(message)
+
+    def snapshot(self):
+        used = self.used()
+        return {
+            'hour': self._current_hour(),
+            'hourly_budget': self.hourly_budget,
+            'used_this_hour': used,
+            'used_this_hour_local': self._local_count if self._hour == self._current_hour() else 0,
+            'remaining': max(self.hourly_budget - used, 0) if self.hourly_budget else None,
+        }
+
+
+class _PooledConnection:
+    __slots__ = ('raw', 'created_at', 'last_used')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """Process-wide bounded pool of raw DB-API connections for one alias"""
+
+    def __init__(self, alias, connect, options=None):
+        self.alias = alias
+        self._connect = connect
+        self.options = dict(DEFAULT_POOL_OPTIONS, **(options or {}))
+        self.budget = ConnectionBudget(alias, self.options['HOURLY_BUDGET'], self.options['ALERT_RATIO'])
+        self._condition = threading.Condition()
+        self._idle = deque()
+        self._in_use = {}
+        self.stats = {
+            'checkouts': 0,
+            'reused': 0,
+            'opened': 0,
+            'closed': 0,
+            'health_checks': 0,
+            'health_check_failures': 0,
+            'waits': 0,
+            'timeouts': 0,
+        }
+
+    @property
+    def size(self):
+        return len(self._idle) + len(self._in_use)
+
+    def _expired(self, pooled, now):
+        if now - pooled.last_used > self.options['MAX_IDLE']:
+            return True
+        # Near the hourly budget a reconnect costs more than an old connection
+        if now - pooled.created_at > self.options['MAX_LIFETIME'] and not self.budget.near_limit():
+            return True
+        return False
+
+    def _healthy(self, pooled, now):
+        if now - pooled.last_used <= self.options['HEALTH_CHECK_AFTER']:
+            return True
+        self.stats['health_checks'] += 1
+        try:
+            pooled.raw.ping()
+            return True
+        except Exception as e:
+            self.stats['health_check_failures'] += 1
+            logger.info(f"Discarding dead pooled connection for '{self.alias}': {e}")
+            return False
+
+    def _discard(self, pooled):
+        self.stats['closed'] += 1
+        try:
+            pooled.raw.close()
+        except Exception:
+            pass
+
+    def checkout(self, conn_params):
+        """Return (raw_connection, reused)"""
+        deadline = time.monotonic() + self.options['CHECKOUT_TIMEOUT']
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                while self._idle:
+                    pooled = self._idle.pop()  # Most recently used first: least likely to be stale
+                    if self._expired(pooled, now) or not self._healthy(pooled, now):
+                        self._discard(pooled)
+                        continue
+                    self._in_use[id(pooled.raw)] = pooled
+                    self.stats['checkouts'] += 1
+                    self.stats['reused'] += 1
+                    return pooled.raw, True
+
+                if self.size < self.options['MAX_SIZE']:
+                    # Reserve the slot, connect outside the lock
+                    placeholder = object()
+                    self._in_use[id(placeholder)] = placeholder
+                    break
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    self.stats['timeouts'] += 1
+                    raise TimeoutError(
+                        f"No free '{self.alias}' connection after {self.options['CHECKOUT_TIMEOUT']}s "
+                        f"(pool size {self.options['MAX_SIZE']})"
+                    )
+                self.stats['waits'] += 1
+                self._condition.wait(remaining)
+
+        try:
+            raw = self._connect(conn_params)
+        except Exception:
+            with self._condition:
+                self._in_use.pop(id(placeholder), None)
+                self._condition.notify()
+            raise
+
+        self.budget.record_connect()
+        with self._condition:
+            self._in_use.pop(id(placeholder), None)
+            self._in_use[id(raw)] = _PooledConnection(raw)
+            self.stats['checkouts'] += 1
+            self.stats['opened'] += 1
+        return raw, False
+
+    def release(self, raw, discard=False):
+        """Return a connection to the pool (or close it when discard=True or expired)"""
+        with self._condition:
+            pooled = self._in_use.pop(id(raw), None)
+            if pooled is None:
+                # Not ours (e.g. inherited across fork); just close it
+                discard, pooled = True, _PooledConnection(raw)
+            pooled.last_used = time.monotonic()
+            if discard or self._expired(pooled, pooled.last_used):
+                self._discard(pooled)
+            else:
+                self._idle.append(pooled)
+            self._condition.notify()
+
+    def close_idle(self):
+        """Close every idle connection (in-use ones are returned normally)"""
+        with self._condition:
+            while self._idle:
+                self._discard(self._idle.pop())
+
+    def reset_after_fork(self):
+        # The parent's sockets are shared with the child: forget them without COM_QUIT
+        self._condition = threading.Condition()
+        self._idle.clear()
+        self._in_use.clear()
+
+    def snapshot(self):
+        with self._condition:
+            idle, in_use = len(self._idle), len(self._in_use)
+        checkouts = self.stats['checkouts']
+        return {
+            'alias': self.alias,
+            'pid': os.getpid(),
+            'pooled': True,
+            'max_size': self.options['MAX_SIZE'],
+            'idle': idle,
+            'in_use': in_use,
+            'reuse_ratio': round(self.stats['reused'] / checkouts, 3) if checkouts else None,
+            **self.stats,
+            'budget': self.budget.snapshot(),
+        }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, connect, options=None):
+    pool = _pools.get(alias)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(alias)
+            if pool is None:
+                pool = _pools[alias] = ConnectionPool(alias, connect, options)
+    return pool
+
+
+_unpooled_budgets = {}
+
+
+def record_unpooled_connection(alias):
+    """Budget accounting for aliases on a plain engine (called from connection_created)"""
+    budget = _unpooled_budgets.get(alias)
+    if budget is None:
+        from django.conf import settings
+
+        options = dict(DEFAULT_POOL_OPTIONS, **(settings.DATABASES.get(alias, {}).get('POOL') or {}))
+        budget = _unpooled_budgets.setdefault(
+            alias, ConnectionBudget(alias, options['HOURLY_BUDGET'], options['ALERT_RATIO'])
+        )
+    budget.record_connect()
+
+
+def pool_metrics():
+    """Snapshot of every pool in this process, plus budgets of unpooled aliases"""
+    metrics = [pool.snapshot() for pool in list(_pools.values())]
+    metrics.extend(
+        {'alias': alias, 'pid': os.getpid(), 'pooled': False, 'budget': budget.snapshot()}
+        for alias, budget in list(_unpooled_budgets.items())
+    )
+    return metrics
+
+
+def close_idle_pooled_connections():
+    for pool in list(_pools.values()):
+        pool.close_idle()
+
+
+def _reset_pools_after_fork():
+    for pool in _pools.values():
+        pool.reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+
+@contextmanager
+def pooled_connection(alias='default'):
+    """
+    Unit of work for long-running daemons (fetch services, push listeners).
+
+    Outside a request Django never releases a thread's connection; this hands
+    it back at the end of each cycle. With the pooled engine that returns it to
+    the pool (no reconnect next cycle); with plain engines it closes only if
+    CONN_MAX_AGE has expired or the connection errored.
+    """
+    from django.db import close_old_connections, connections
+
+    close_old_connections()
+    try:
+        yield connections[alias]
+    finally:
+        connection = connections[alias]
+        if getattr(connection, 'is_pooled', False) and not connection.in_atomic_block:
+            connection.close()
+        else:
+            close_old_connections()
@@ -0,0 +1,256 @@
+"""
+Database Routers
+Sends designated read-only report/dashboard reads to the `reporting` alias
+(a MySQL replica in production, a local snapshot in development)
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .cache_utils import cache_is_shared
+
+logger = logging.getLogger(__name__)
+
+PIN_CACHE_PREFIX = 'db_primary_pin'
+PIN_COOKIE_NAME = 'db_primary_pin'
+PIN_COOKIE_SALT = 'core.db_routers.primary_pin'
+PIN_COOKIE_MAX_AGE = 60 * 5  # Upper bound on a pin, whatever the replica lag
+
+
+class _RoutingState:
+    """Per-request (or per-command) routing flags"""
+    __slots__ = ('reporting', 'pinned', 'wrote')
+
+    def __init__(self):
+        self.reporting = False
+        self.pinned = False
+        self.wrote = False
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+# Replica health is per process: {alias: (checked_at, lag_seconds or None)}
+_lag_checks = {}
+_lag_lock = threading.Lock()
+
+
+def reporting_alias():
+    """The configured reporting alias, or None when reads should stay on the primary"""
+    alias = getattr(settings, 'REPORTING_DB_ALIAS', 'reporting')
+    if alias and alias != DEFAULT_DB_ALIAS and alias in settings.DATABASES:
+        return alias
+    return None
+
+
+def _query_replica_lag(alias):
+    """Seconds behind the source; 0 when the alias is not a replica; None when unusable"""
+    connection = connections[alias]
+    if connection.vendor != 'mysql':
+        # A local snapshot is stale by design
+        return 0
+    with connection.cursor() as cursor:
+        for statement in ('SHOW REPLICA STATUS', 'SHOW SLAVE STATUS'):
+            try:
+                cursor.execute(statement)
+                break
+            except Exception:
+                continue  # MySQL < 8.0.22 / MariaDB only know SHOW SLAVE STATUS
+        else:
+            raise RuntimeError('replica status is not available')
+        row = cursor.fetchone()
+        if row is None:
+            return 0  # Not replicating (e.g. a restored snapshot or a proxy in front of the primary)
+        columns = [column[0] for column in cursor.description]
+        status = dict(zip(columns, row))
+    lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+    # NULL means the replication threads are stopped: the data is of unknown age
+    return None if lag is None else int(lag)
+
+
+def replica_lag(alias):
+    """Cached replication lag of `alias` (re-checked every REPORTING_LAG_CHECK_INTERVAL seconds)"""
+    interval = getattr(settings, 'REPORTING_LAG_CHECK_INTERVAL', 15)
+    now = time.monotonic()
+    checked = _lag_checks.get(alias)
+    if checked and now - checked[0] < interval:
+        return checked[1]
+
+    with _lag_lock:
+        checked = _lag_checks.get(alias)
+        if checked and now - checked[0] < interval:
+            return checked[1]
+        try:
+            lag = _query_replica_lag(alias)
+        except Exception as e:
+            logger.warning(f"Reporting database '{alias}' unavailable, reading from primary: {e}")
+            lag = None
+        if lag is not None and lag > getattr(settings, 'REPORTING_MAX_LAG_SECONDS', 30):
+            logger.warning(f"Reporting database '{alias}' is {lag}s behind, reading from primary")
+        _lag_checks[alias] = (now, lag)
+        return lag
+
+
+def reporting_available(alias):
+    max_lag = getattr(settings, 'REPORTING_MAX_LAG_SECONDS', 30)
+    if max_lag is None:
+        return True
+    lag = replica_lag(alias)
+    return lag is not None and lag <= max_lag
+
+
+class ReportingRouter:
+    """
+    Reads inside reporting_reads() go to the reporting alias unless the request
+    has written (or its user wrote recently), the replica lags more than
+    REPORTING_MAX_LAG_SECONDS, or it cannot be reached. Everything else,
+    and every write, uses the default database.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.reporting or state.pinned or state.wrote:
+            return None
+        alias = reporting_alias()
+        if alias and reporting_available(alias):
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == reporting_alias():
+            # A replica gets its schema from the primary; a snapshot is migrated on purpose
+            return bool(settings.DATABASES[db].get('REPORTING_SNAPSHOT', False))
+        return None
+
+
+@contextmanager
+def track_request_writes():
+    """Fresh routing state for one request; yields it so the caller can see whether it wrote"""
+    token = _state.set(_RoutingState())
+    try:
+        yield _state.get()
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def reporting_reads():
+    """Route reads in this block to the reporting database (writes still go to the primary)"""
+    state = _state.get()
+    token = None
+    if state is None:
+        state = _RoutingState()
+        token = _state.set(state)
+    previous = state.reporting
+    state.reporting = True
+    try:
+        yield state
+    finally:
+        state.reporting = previous
+        if token is not None:
+            _state.reset(token)
+
+
+def _pin_key(user_id):
+    return f'{PIN_CACHE_PREFIX}:{user_id}'
+
+
+def pin_user_to_primary(user, response=None):
+    """
+    Read-your-writes: after a mutation the user's reports read from the primary
+    for REPORTING_PIN_SECONDS, or longer if the replica currently lags more.
+
+    The pin travels with the client as a signed cookie on `response`, so the
+    next request sees it whichever worker serves it; with a shared cache it is
+    also stored there for clients that don't send cookies.
+    """
+    if not reporting_alias():
+        return
+    seconds = getattr(settings, 'REPORTING_PIN_SECONDS', 10)
+    lag = _lag_checks.get(reporting_alias(), (None, None))[1]
+    if lag:
+        seconds = max(seconds, lag + 1)
+    seconds = min(int(seconds), PIN_COOKIE_MAX_AGE)
+
+    if response is not None:
+        response.set_signed_cookie(
+            PIN_COOKIE_NAME, str(user.pk), salt=PIN_COOKIE_SALT, max_age=seconds,
+            httponly=True, samesite='Lax', secure=getattr(settings, 'SESSION_COOKIE_SECURE', False),
+        )
+    if cache_is_shared():
+        try:
+            cache.set(_pin_key(user.pk), True, seconds)
+        except Exception as e:
+            logger.warning(f"Could not pin user {user.pk} to primary database: {e}")
+
+
+def user_pinned_to_primary(user, request=None):
+    if not user or not user.is_authenticated:
+        return False
+    if request is not None:
+        pinned_user = request.get_signed_cookie(
+            PIN_COOKIE_NAME, default=None, salt=PIN_COOKIE_SALT, max_age=PIN_COOKIE_MAX_AGE
+        )
+        if pinned_user == str(user.pk):
+            return True
+    if not cache_is_shared():
+        return False
+    try:
+        return bool(cache.get(_pin_key(user.pk)))
+    except Exception:
+        return False
+
+
+def _apply_user_pin(state, request):
+    # DRF's Request proxies COOKIES and get_signed_cookie to the Django request
+    if user_pinned_to_primary(getattr(request, 'user', None), request):
+        state.pinned = True
+
+
+class ReportingReadMixin:
+    """
+    For read-only APIViews/ViewSets: GET/HEAD requests read from the
+    reporting database. Add before the view base class.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return super().dispatch(request, *args, **kwargs)
+        with reporting_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        state = _state.get()
+        if state is not None and state.reporting:
+            # request.user is only known once DRF has authenticated the request
+            _apply_user_pin(state, request)
+
+
+def reporting_view(view_func):
+    """Function-view counterpart of ReportingReadMixin; place below @api_view/@permission_classes"""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view_func(request, *args, **kwargs)
+        with reporting_reads() as state:
+            _apply_user_pin(state, request)
+            return view_func(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,256 @@
+"""
+Document Rendering
+Compiled document templates, the inlined company logo and a content-hash PDF cache
+"""
+
+import base64
+import hashlib
+import logging
+import mimetypes
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.template import Context, Template
+from django.template.loader import get_template
+
+from . import pdf_engine
+from .file_serving import private_media_root
+
+logger = logging.getLogger(__name__)
+
+PDF_WRAPPER_TEMPLATE = 'documents/pdf_wrapper.html'
+PDF_CACHE_DIR = 'pdf_cache'
+# Bump when the renderer or its options change so old cache entries stop matching
+PDF_CACHE_VERSION = '1'
+PDF_CACHE_MAX_AGE = 60 * 60 * 24 * 7  # Entries unused for a week are pruned
+PDF_CACHE_MAX_FILES = 2000
+PDF_CACHE_PRUNE_INTERVAL = 60 * 10  # Seconds between prunes in one process
+MAX_COMPILED_TEMPLATES = 128
+
+# Process-local: compiled Template objects are not worth pickling into the cache
+_compiled_templates = {}
+_logo = {}
+_last_prune = {'at': 0.0}
+
+
+def compile_template(key, source):
+    """Compiled Django template for `source`, compiled once per process per key"""
+    template = _compiled_templates.get(key)
+    if template is None:
+        if len(_compiled_templates) >= MAX_COMPILED_TEMPLATES:
+            _compiled_templates.clear()
+        template = Template(source)
+        _compiled_templates[key] = template
+    return template
+
+
+def get_builtin_template(name, source_factory):
+    """Compiled built-in template (e.g. the salary slip); source_factory is only called on a miss"""
+    key = ('builtin', name)
+    template = _compiled_templates.get(key)
+    if template is None:
+        template = compile_template(key, source_factory())
+    return template
+
+
+def get_document_template(document_template):
+    """
+    Compiled DocumentTemplate. Keyed by id + updated_at, so editing a template
+    recompiles it on next use and older versions simply stop being looked up.
+    """
+    key = ('document_template', document_template.id, document_template.updated_at)
+    return compile_template(key, document_template.template_content)
+
+
+def render_template(template, context):
+    return template.render(Context(context))
+
+
+def _logo_candidates():
+    candidates = [
+        os.path.join(settings.MEDIA_ROOT, 'documents', 'companylogo.png'),
+        os.path.join(settings.MEDIA_ROOT, 'companylogo.png'),
+        os.path.join(settings.MEDIA_ROOT, 'logo.png'),
+    ]
+    if getattr(settings, 'STATIC_ROOT', None):
+        candidates.append(os.path.join(settings.STATIC_ROOT, 'images', 'logo.png'))
+    return candidates
+
+
+def get_logo_data_uri():
+    """
+    The company logo as a data URI, resolved and encoded once per process.
+    Returns '' when no logo file exists; call invalidate_logo_cache() after replacing it.
+    """
+    if 'data_uri' in _logo:
+        return _logo['data_uri']
+
+    data_uri = ''
+    for logo_file in _logo_candidates():
+        if os.path.exists(logo_file):
+            try:
+                with open(logo_file, 'rb') as handle:
+                    encoded = base64.b64encode(handle.read()).decode('ascii')
+                mime_type = mimetypes.guess_type(logo_file)[0] or 'image/png'
+                data_uri = f"data:{mime_type};base64,{encoded}"
+                logger.info(f"Company logo loaded from {logo_file}")
+                break
+            except OSError as e:
+                logger.warning(f"Could not read company logo {logo_file}: {e}")
+    if not data_uri:
+        logger.warning("Company logo not found, using text header")
+
+    _logo['data_uri'] = data_uri
+    return data_uri
+
+
+def invalidate_logo_cache():
+    _logo.clear()
+
+
+def inline_logo(html, logo_url):
+    """Swap the public logo URL for the cached data URI so the PDF renderer never fetches it"""
+    data_uri = get_logo_data_uri()
+    if data_uri and logo_url and logo_url in html:
+        return html.replace(logo_url, data_uri)
+    return html
+
+
+def company_info():
+    return {
+        'company_name': getattr(settings, 'COMPANY_NAME', 'Your Company Name'),
+        'company_address': getattr(settings, 'COMPANY_ADDRESS', 'Company Address, City, State, ZIP'),
+        'company_phone': getattr(settings, 'COMPANY_PHONE', '+1 (555) 123-4567'),
+        'company_email': getattr(settings, 'COMPANY_EMAIL', 'info@company.d0s369.co.in'),
+        'company_website': getattr(settings, 'COMPANY_WEBSITE', 'https://company.d0s369.co.in'),
+    }
+
+
+def render_document_pdf_html(document):
+    """Full printable HTML for a GeneratedDocument (header, content and footer)"""
+    employee = document.employee
+    generated_at = getattr(document, 'generated_at', None)
+    context = {
+        'title': document.title,
+        'content': document.content,
+        'logo_src': get_logo_data_uri(),
+        'employee_id': employee.employee_id if employee.employee_id else str(employee.id)[:8].upper(),
+        'generated_date': generated_at.strftime('%B %d, %Y') if generated_at else 'N/A',
+        'generated_at': generated_at.strftime('%B %d, %Y at %I:%M %p') if generated_at else 'N/A',
+        **company_info(),
+    }
+    return get_template(PDF_WRAPPER_TEMPLATE).render(context)
+
+
+def pdf_cache_dir():
+    """Rendered PDFs hold salary and personal data: kept outside MEDIA_ROOT, never published"""
+    return os.path.join(private_media_root(), PDF_CACHE_DIR)
+
+
+def _pdf_cache_path(digest):
+    return os.path.join(pdf_cache_dir(), digest[:2], f'{digest}.pdf')
+
+
+def prune_pdf_cache(max_age=None, max_files=None):
+    """
+    Delete cached PDFs not used for max_age seconds, then the least recently used
+    ones beyond max_files. Returns the number of files removed.
+    """
+    max_age = max_age or getattr(settings, 'PDF_CACHE_MAX_AGE', PDF_CACHE_MAX_AGE)
+    max_files = max_files or getattr(settings, 'PDF_CACHE_MAX_FILES', PDF_CACHE_MAX_FILES)
+
+    entries = []
+    for root, _, files in os.walk(pdf_cache_dir()):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                entries.append((os.stat(path).st_mtime, path))
+            except OSError:
+                continue
+
+    cutoff = time.time() - max_age
+    entries.sort()
+    expired = [path for mtime, path in entries if mtime < cutoff]
+    kept = len(entries) - len(expired)
+    if kept > max_files:
+        expired.extend(path for _, path in entries[len(expired):len(expired) + kept - max_files])
+
+    removed = 0
+    for path in expired:
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    if removed:
+        logger.info(f"Pruned {removed} cached PDFs")
+    return removed
+
+
+def _maybe_prune_pdf_cache():
+    now = time.monotonic()
+    if _last_prune['at'] and now - _last_prune['at'] < PDF_CACHE_PRUNE_INTERVAL:
+        return
+    _last_prune['at'] = now
+    try:
+        prune_pdf_cache()
+    except Exception as e:
+        logger.warning(f"Could not prune PDF cache: {e}")
+
+
+def pdf_content_hash(html):
+    return hashlib.sha256(f'{PDF_CACHE_VERSION}\n{html}'.encode('utf-8')).hexdigest()
+
+
+def _write_pdf(html):
+    weasyprint = pdf_engine.get_weasyprint()
+    if weasyprint is None:
+        raise RuntimeError('WeasyPrint is not available')
+
+    html_doc = weasyprint.HTML(string=html)
+    font_config = pdf_engine.get_font_config()
+    try:
+        return html_doc.write_pdf(optimize_images=True, font_config=font_config)
+    except TypeError as e:
+        # Older WeasyPrint/pydyf combinations reject the extra options
+        logger.warning(f"WeasyPrint version compatibility issue: {e}")
+        return html_doc.write_pdf(font_config=font_config)
+
+
+def render_pdf(html):
+    """
+    PDF bytes for `html`. Identical HTML is rendered once: the result is stored
+    under PRIVATE_MEDIA_ROOT/pdf_cache/ by content hash and served from there
+    afterwards. Entries are pruned by last use and count (prune_pdf_cache).
+    """
+    digest = pdf_content_hash(html)
+    cache_path = _pdf_cache_path(digest)
+    try:
+        with open(cache_path, 'rb') as cached:
+            logger.info(f"PDF cache hit {digest[:12]}")
+            pdf_content = cached.read()
+        try:
+            os.utime(cache_path)  # mtime tracks last use for pruning
+        except OSError:
+            pass
+        return pdf_content
+    except FileNotFoundError:
+        pass
+
+    pdf_content = _write_pdf(html)
+    if not pdf_content.startswith(b'%PDF') or len(pdf_content) <= 100:
+        raise ValueError('Generated PDF is invalid')
+
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        # Write then rename so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(pdf_content)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Could not store PDF in cache: {e}")
+    _maybe_prune_pdf_cache()
+    return pdf_content
@@ -4,79 +4,26 @@ from rest_framework import status, viewsets, permissions
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.template import Template, Context
 from django.http import HttpResponse, JsonResponse
 from django.core.mail import send_mail
 from django.conf import settings
 import logging
 from datetime import datetime, date
 from django.utils.dateparse import parse_date
-# WeasyPrint availability will be checked when needed
-WEASYPRINT_AVAILABLE = None
-PDF_CONSTRUCTOR_ARGS = None
-
 from io import BytesIO
 
-def check_weasyprint_availability():
-    global WEASYPRINT_AVAILABLE, PDF_CONSTRUCTOR_ARGS, weasyprint, HTML
-
-    if WEASYPRINT_AVAILABLE is not None:
-        return WEASYPRINT_AVAILABLE
-
-    try:
-        import weasyprint as wp
-        from weasyprint import HTML as HTMLClass
-        import pydyf
-
-        # Assign to global namespace
-        weasyprint = wp
-        HTML = HTMLClass
-
-        WEASYPRINT_AVAILABLE = True
-        logger = logging.getLogger(__name__)
-
-        logger.info(f"WeasyPrint version: {weasyprint.__version__}")
-        logger.info(f"pydyf version: {pydyf.__version__}")
-
-        PDF_CONSTRUCTOR_ARGS = 0
-
-    except Exception as e:
-        WEASYPRINT_AVAILABLE = False
-        PDF_CONSTRUCTOR_ARGS = -1
-        logger.error(f"WeasyPrint not available: {e}")
-
-    # Fix: Monkeypatch pydyf.PDF to handle arguments
-    if WEASYPRINT_AVAILABLE:
-        try:
-            import pydyf
-            original_pdf_init = pydyf.PDF.__init__
-
-            def patched_pdf_init(self, *args, **kwargs):
-                try:
-                    original_pdf_init(self, *args, **kwargs)
-                except TypeError:
-                    # If arguments fail, try without them (old pydyf version)
-                    original_pdf_init(self)
-                    # Manually set attributes that WeasyPrint expects but old pydyf doesn't accept in init
-                    if args and len(args) > 0:
-                        self.version = args[0] if isinstance(args[0], bytes) else str(args[0]).encode('ascii')
-                    else:
-                        self.version = b'1.7' # Default expected by WeasyPrint
-            
-            pydyf.PDF.__init__ = patched_pdf_init
-            logger.info("Patched pydyf.PDF.__init__ for compatibility")
-        except Exception as patch_error:
-            logger.warning(f"Failed to patch pydyf: {patch_error}")
-
-    return WEASYPRINT_AVAILABLE
-
-
 from .models import (
     CustomUser, DocumentTemplate, GeneratedDocument, Office
 )
 from .serializers import (
     DocumentTemplateSerializer, GeneratedDocumentSerializer, DocumentGenerationSerializer
 )
+from .file_serving import has_pdf_header, serve_file
+from . import pdf_engine
+from .document_rendering import (
+    get_builtin_template, get_document_template, inline_logo, render_document_pdf_html, render_pdf,
+    render_template
+)
 
 logger = logging.getLogger(__name__)
 
@@ -122,51 +69,16 @@ class GeneratedDocumentViewSet(viewsets.ModelViewSet):
         document = self.get_object()
         logger.info(f"Download PDF request for document {document.id}: {document.title}")
         
-        # Debug: Check document state
-        logger.info(f"Document PDF file field: {document.pdf_file}")
+        # Serve the stored PDF from disk without reading it into memory
         if document.pdf_file:
-            logger.info(f"PDF file name: {document.pdf_file.name}")
-            logger.info(f"PDF file size: {document.pdf_file.size}")
-            logger.info(f"PDF file URL: {document.pdf_file.url}")
-        
-        # Debug: Check MEDIA_ROOT setting
-        from django.conf import settings
-        logger.info(f"MEDIA_ROOT: {settings.MEDIA_ROOT}")
-        logger.info(f"MEDIA_URL: {settings.MEDIA_URL}")
-        
-        # Check if PDF file exists and is valid
-        if document.pdf_file and document.pdf_file.size > 0:
             try:
-                import os
-                logger.info(f"PDF file exists in database: {document.pdf_file.name}, size: {document.pdf_file.size}")
-                logger.info(f"PDF file path: {document.pdf_file.path}")
-                # Check if the file actually exists on disk
-                if os.path.exists(document.pdf_file.path):
+                if has_pdf_header(document.pdf_file.path):
                     filename = self.generate_document_filename(document)
-                    logger.info(f"Reading PDF file content...")
-                    
-                    # Check file permissions
-                    import stat
-                    file_stat = os.stat(document.pdf_file.path)
-                    logger.info(f"File permissions: {stat.filemode(file_stat.st_mode)}")
-                    logger.info(f"File size on disk: {file_stat.st_size} bytes")
-                    
-                    pdf_content = document.pdf_file.read()
-                    logger.info(f"PDF content size: {len(pdf_content)} bytes")
-                    logger.info(f"PDF content starts with: {pdf_content[:10]}")
-                    
-                    # Verify it's actually a PDF by checking the header
-                    if pdf_content.startswith(b'%PDF'):
-                        response = HttpResponse(pdf_content, content_type='application/pdf')
-                        response['Content-Disposition'] = f'attachment; filename="{filename}.pdf"'
-                        response['Content-Length'] = len(pdf_content)
-                        return response
-                    else:
-                        logger.warning(f"PDF file for document {document.id} is corrupted, regenerating...")
-                else:
-                    logger.warning(f"PDF file for document {document.id} does not exist on disk: {document.pdf_file.path}")
-                    logger.warning(f"Cleaning up orphaned files and regenerating...")
-                    self.cleanup_orphaned_files(document)
+                    return serve_file(request, document.pdf_file.path, f"{filename}.pdf", content_type='application/pdf')
+                logger.warning(f"PDF file for document {document.id} is corrupted, regenerating...")
+            except FileNotFoundError:
+                logger.warning(f"PDF file for document {document.id} does not exist on disk, regenerating...")
+                self.cleanup_orphaned_files(document)
             except Exception as e:
                 logger.error(f"Error reading existing PDF file for document {document.id}: {e}")
                 import traceback
@@ -181,357 +93,16 @@ class GeneratedDocumentViewSet(viewsets.ModelViewSet):
                 }, status=500)
         
         # If no valid PDF file, generate one on-demand (works on VPS hosting)
-        if WEASYPRINT_AVAILABLE:
+        if pdf_engine.is_available():
             try:
                 logger.info(f"Generating PDF for document {document.id}")
-                logger.info(f"Using WeasyPrint version: {weasyprint.__version__}")
                 
                 # Generate proper filename
                 filename = self.generate_document_filename(document)
                 
-                # Get company logo path and information
-                logo_path = ""
-                company_name = "Your Company Name"
-                company_address = "Company Address, City, State, ZIP"
-                
-                try:
-                    import os
-                    from django.conf import settings
-                    
-                    # Try different logo locations
-                    logo_locations = [
-                        os.path.join(settings.MEDIA_ROOT, 'documents', 'companylogo.png'),
-                        os.path.join(settings.MEDIA_ROOT, 'companylogo.png'),
-                        os.path.join(settings.MEDIA_ROOT, 'logo.png'),
-                        os.path.join(settings.STATIC_ROOT, 'images', 'logo.png') if hasattr(settings, 'STATIC_ROOT') else None
-                    ]
-                    
-                    for logo_file in logo_locations:
-                        if logo_file and os.path.exists(logo_file):
-                            logo_path = f"file://{logo_file}"
-                            logger.info(f"Company logo found: {logo_path}")
-                            break
-                    
-                    if not logo_path:
-                        logger.warning("Company logo not found, using text header")
-                    
-                    # Get company information from settings or use defaults
-                    company_name = getattr(settings, 'COMPANY_NAME', 'Your Company Name')
-                    company_address = getattr(settings, 'COMPANY_ADDRESS', 'Company Address, City, State, ZIP')
-                    company_phone = getattr(settings, 'COMPANY_PHONE', '+1 (555) 123-4567')
-                    company_email = getattr(settings, 'COMPANY_EMAIL', 'info@company.d0s369.co.in')
-                    company_website = getattr(settings, 'COMPANY_WEBSITE', 'https://company.d0s369.co.in')
-                    
-                except Exception as e:
-                    logger.warning(f"Could not load company information: {e}")
-                
-                # Get employee ID from user
-                employee_id = document.employee.employee_id if document.employee.employee_id else str(document.employee.id)[:8].upper()
-                
-                # Enhance the document content with professional, compact CSS for A4 printing
-                html_content = f"""
-                <!DOCTYPE html>
-                <html>
-                <head>
-                    <meta charset="utf-8">
-                    <title>{document.title}</title>
-                    <style>
-                        @page {{
-                            margin: 0.4in;
-                            size: A4;
-                        }}
-                        
-                        * {{
-                            box-sizing: border-box;
-                        }}
-                        
-                        body {{
-                            font-family: 'Arial', 'Helvetica', sans-serif;
-                            font-size: 10pt;
-                            line-height: 1.2;
-                            color: #000000;
-                            margin: 0;
-                            padding: 0;
-                            background: white;
-                        }}
-                        
-                        .document-container {{
-                            max-width: 100%;
-                            margin: 0 auto;
-                        }}
-                        
-                        .header {{
-                            text-align: center;
-                            margin-bottom: 15px;
-                            border-bottom: 1px solid #000;
-                            padding-bottom: 10px;
-                        }}
-                        
-                        .company-logo {{
-                            max-height: 50px;
-                            max-width: 150px;
-                            margin-bottom: 8px;
-                        }}
-                        
-                        .company-name {{
-                            font-size: 14pt;
-                            font-weight: bold;
-                            color: #000000;
-                            margin: 3px 0;
-                            text-transform: uppercase;
-                            letter-spacing: 1px;
-                        }}
-                        
-                        .company-address {{
-                            font-size: 8pt;
-                            color: #000000;
-                            margin: 2px 0;
-                            line-height: 1.1;
-                        }}
-                        
-                        .company-contact {{
-                            font-size: 7pt;
-                            color: #000000;
-                            margin: 2px 0;
-                        }}
-                        
-                        .document-title {{
-                            font-size: 12pt;
-                            font-weight: bold;
-                            color: #000000;
-                            text-align: center;
-                            margin: 8px 0 5px 0;
-                            text-transform: uppercase;
-                            letter-spacing: 1px;
-                        }}
-                        
-                        .employee-header {{
-                            display: flex;
-                            justify-content: space-between;
-                            margin: 5px 0;
-                            font-size: 9pt;
-                            border-bottom: 1px solid #000;
-                            padding-bottom: 8px;
-                        }}
-                        
-                        .employee-id {{
-                            font-weight: bold;
-                            color: #000000;
-                        }}
-                        
-                        .document-date {{
-                            color: #000000;
-                        }}
-                        
-                        h1, h2, h3, h4, h5, h6 {{
-                            color: #000000;
-                            margin-top: 10px;
-                            margin-bottom: 5px;
-                            page-break-after: avoid;
-                        }}
-                        
-                        h1 {{
-                            font-size: 12pt;
-                            font-weight: bold;
-                        }}
-                        
-                        h2 {{
-                            font-size: 11pt;
-                            font-weight: bold;
-                        }}
-                        
-                        h3 {{
-                            font-size: 10pt;
-                            font-weight: bold;
-                        }}
-                        
-                        p {{
-                            margin: 4px 0;
-                            text-align: justify;
-                            font-size: 9pt;
-                            line-height: 1.2;
-                        }}
-                        
-                        .content {{
-                            margin: 10px 0;
-                        }}
-                        
-                        .footer {{
-                            margin-top: 20px;
-                            padding-top: 8px;
-                            border-top: 1px solid #000;
-                            font-size: 7pt;
-                            color: #000000;
-                            text-align: center;
-                        }}
-                        
-                        table {{
-                            width: 100%;
-                            border-collapse: collapse;
-                            margin: 8px 0;
-                            font-size: 9pt;
-                            border: 1px solid #000;
-                        }}
-                        
-                        th, td {{
-                            border: 1px solid #000;
-                            padding: 4px 6px;
-                            text-align: left;
-                            vertical-align: top;
-                        }}
-                        
-                        th {{
-                            background-color: #f0f0f0;
-                            font-weight: bold;
-                            font-size: 9pt;
-                            color: #000000;
-                        }}
-                        
-                        .salary-table {{
-                            margin: 5px 0;
-                        }}
-                        
-                        .salary-table th {{
-                            background-color: #e0e0e0;
-                            text-align: center;
-                            font-weight: bold;
-                        }}
-                        
-                        .salary-table td {{
-                            text-align: right;
-                        }}
-                        
-                        .salary-table .label {{
-                            text-align: left;
-                            font-weight: bold;
-                        }}
-                        
-                        .signature-section {{
-                            margin-top: 20px;
-                            page-break-inside: avoid;
-                        }}
-                        
-                        .signature-line {{
-                            border-bottom: 1px solid #000;
-                            width: 150px;
-                            margin: 10px 0 3px 0;
-                        }}
-                        
-                        .employee-info {{
-                            display: flex;
-                            justify-content: space-between;
-                            margin: 8px 0;
-                            font-size: 9pt;
-                        }}
-                        
-                        .employee-info div {{
-                            flex: 1;
-                            margin: 0 5px;
-                        }}
-                        
-                        .date-info {{
-                            text-align: right;
-                            font-size: 8pt;
-                            color: #000000;
-                            margin: 5px 0;
-                        }}
-                        
-                        /* Compact spacing for A4 */
-                        .compact {{
-                            margin: 3px 0;
-                        }}
-                        
-                        .compact p {{
-                            margin: 2px 0;
-                        }}
-                        
-                        .text-center {{
-                            text-align: center;
-                        }}
-                        
-                        .text-right {{
-                            text-align: right;
-                        }}
-                        
-                        .text-bold {{
-                            font-weight: bold;
-                        }}
-                        
-                        .mt-10 {{
-                            margin-top: 10px;
-                        }}
-                        
-                        .mb-5 {{
-                            margin-bottom: 5px;
-                        }}
-                        
-                        @media print {{
-                            body {{ margin: 0; }}
-                            .no-print {{ display: none; }}
-                            @page {{ margin: 0.4in; }}
-                        }}
-                    </style>
-                </head>
-                <body>
-                    <div class="document-container">
-                        <div class="header">
-                            {f'<img src="{logo_path}" alt="Company Logo" class="company-logo">' if logo_path else ''}
-                            <div class="company-name">{company_name}</div>
-                            <div class="company-address">{company_address}</div>
-                            <div class="company-contact">
-                                Phone: {company_phone} | Email: {company_email} | Website: {company_website}
-                            </div>
-                        </div>
-                        
-                        <div class="document-title">{document.title}</div>
-                        
-                        <div class="employee-header">
-                            <div class="employee-id">Employee ID: {employee_id}</div>
-                            <div class="document-date">Date: {document.generated_at.strftime('%B %d, %Y') if hasattr(document, 'generated_at') and document.generated_at else 'N/A'}</div>
-                        </div>
-                        
-                        <div class="content compact">
-                            {document.content}
-                        </div>
-                        
-                        <div class="footer">
-                            <p>This document was generated on {document.generated_at.strftime('%B %d, %Y at %I:%M %p') if hasattr(document, 'generated_at') and document.generated_at else 'N/A'}</p>
-                            <p>Employee Management System</p>
-                        </div>
-                    </div>
-                </body>
-                </html>
-                """
-                
-                # Use WeasyPrint to generate PDF with high quality settings
-                pdf_buffer = BytesIO()
-                
-                # Create WeasyPrint HTML object with better configuration
-                html_doc = weasyprint.HTML(string=html_content)
-                
-                # Generate PDF with version-compatible settings
-                try:
-                    # Try with newer WeasyPrint parameters first
-                    html_doc.write_pdf(
-                        pdf_buffer,
-                        stylesheets=None,  # We're using inline styles
-                        optimize_images=True
-                    )
-                except TypeError as e:
-                    if "PDF.__init__()" in str(e):
-                        logger.warning(f"WeasyPrint version compatibility issue: {e}")
-                        # Fallback to basic PDF generation without advanced options
-                        pdf_buffer = BytesIO()  # Reset buffer
-                        html_doc.write_pdf(pdf_buffer)
-                    else:
-                        raise e
-                except Exception as e:
-                    logger.error(f"Unexpected error in PDF generation: {e}")
-                    # Try basic PDF generation as last resort
-                    pdf_buffer = BytesIO()  # Reset buffer
-                    html_doc.write_pdf(pdf_buffer)
-                pdf_buffer.seek(0)
-                pdf_content = pdf_buffer.getvalue()
+                # The wrapper template is compiled once and identical HTML is served from the PDF cache
+                html_content = render_document_pdf_html(document)
+                pdf_content = render_pdf(html_content)
                 
                 # Verify the generated PDF
                 if pdf_content.startswith(b'%PDF') and len(pdf_content) > 100:
@@ -1919,27 +1490,109 @@ class DocumentGenerationViewSet(viewsets.ViewSet):
         ]
     
     def get_logo_url(self):
-        """Get the company logo URL"""
+        """Get the company logo URL (PDF rendering swaps it for the cached data URI)"""
         from django.conf import settings
-        import os
         
-        # Check if logo file exists
-        logo_path = os.path.join(settings.MEDIA_ROOT, 'documents', 'companylogo.png')
-        if os.path.exists(logo_path):
-            # Use production domain
-            domain = "https://company.d0s369.co.in"
-            # Return absolute URL for the logo
-            return f"{domain}{settings.MEDIA_URL}documents/companylogo.png"
-        else:
-            # Return a placeholder or default logo
-            domain = "https://company.d0s369.co.in"
-            return f"{domain}{settings.MEDIA_URL}documents/companylogo.png"
+        # Use production domain
+        domain = "https://company.d0s369.co.in"
+        return f"{domain}{settings.MEDIA_URL}documents/companylogo.png"
+    
+    def get_salary_slip_context(self, employee, data):
+        """Template context for a salary slip (also used by the batch slip job)"""
+        # Get salary slip data from frontend
+        basic_salary = float(data.get('basic_salary', 0))
+        extra_days_pay = float(data.get('extra_days_pay', 0))
+        total_gross_salary = float(data.get('total_gross_salary', 0))
+        net_salary = float(data.get('net_salary', 0))
+        total_salary = float(data.get('total_salary', 0))
+        
+        # Get additional fields
+        total_days = data.get('total_days', 0)
+        worked_days = data.get('worked_days', 0)
+        per_day_pay = float(data.get('per_day_pay', 0))
+        gross_salary = float(data.get('gross_salary', 0))
+        absent_days = data.get('absent_days', 0)
+        total_deductions = float(data.get('total_deductions', 0))
+        final_salary = float(data.get('final_salary', 0))
+        basic_pay = float(data.get('basic_pay', 0))
+        
+        # Format salary month and year
+        salary_month = data.get('salary_month', '')
+        salary_year = data.get('salary_year', '')
+        
+        # Get employee details from data or fallback to employee object
+        # Handle different field name variations from frontend
+        employee_name = (data.get('employee_name') or 
+                       data.get('full_name') or 
+                       employee.get_full_name())
+        employee_id_display = (data.get('employee_id_number') or 
+                              data.get('employee_employee_id') or 
+                              data.get('employee_id') or 
+                              employee.employee_id if employee.employee_id else str(employee.id)[:8].upper())
+        employee_designation = (data.get('employee_designation') or 
+                              data.get('designation') or 
+                              employee.designation or 'Not specified')
+        employee_department = (data.get('employee_department') or 
+                             data.get('department') or 
+                             str(getattr(employee, 'department', 'Not specified')))
+        office_name = (data.get('employee_office') or 
+                     data.get('office_name') or 
+                     getattr(employee.office, 'name', 'Not specified') if hasattr(employee, 'office') and employee.office else 'Not specified')
+        
+        # Get bank details from data or employee object
+        bank_name = data.get('bank_name', getattr(employee, 'bank_name', 'Not specified'))
+        account_number = data.get('account_number', getattr(employee, 'account_number', 'Not specified'))
+        ifsc_code = data.get('ifsc_code', getattr(employee, 'ifsc_code', 'Not specified'))
+        
+        # Get other employee details
+        address = data.get('address', getattr(employee, 'address', 'Not specified'))
+        pan_number = data.get('pan_number', getattr(employee, 'pan_number', 'Not specified'))
+        aadhar_number = data.get('aadhar_number', getattr(employee, 'aadhar_number', 'Not specified'))
+        uan_number = data.get('uan_number', getattr(employee, 'uan_number', 'Not specified'))
+        esi_number = data.get('esi_number', getattr(employee, 'esi_number', 'Not specified'))
+        pf_number = data.get('pf_number', getattr(employee, 'pf_number', 'Not specified'))
+        
+        
+        context = {
+            'employee_name': employee_name,
+            'employee_id': employee_id_display,
+            'employee_designation': employee_designation,
+            'employee_department': employee_department,
+            'office_name': office_name,
+            'bank_name': bank_name,
+            'account_number': account_number,
+            'ifsc_code': ifsc_code,
+            'address': address,
+            'pan_number': pan_number,
+            'aadhar_number': aadhar_number,
+            'uan_number': uan_number,
+            'esi_number': esi_number,
+            'pf_number': pf_number,
+            'salary_month': salary_month,
+            'salary_year': salary_year,
+            'basic_salary': self.format_currency(basic_salary),
+            'extra_days_pay': self.format_currency(extra_days_pay),
+            'total_salary': self.format_currency(total_salary),
+            'net_salary': self.format_currency(net_salary),
+            'total_gross_salary': self.format_currency(total_gross_salary),
+            'gross_salary': self.format_currency(gross_salary),
+            'per_day_pay': self.format_currency(per_day_pay),
+            'basic_pay': self.format_currency(basic_pay),
+            'final_salary': self.format_currency(final_salary),
+            'total_deductions': self.format_currency(total_deductions),
+            'total_days': total_days,
+            'worked_days': worked_days,
+            'absent_days': absent_days,
+            'logo_url': self.get_logo_url(),
+            'current_date': datetime.now().strftime('%d/%m/%Y')
+        }
+        return context
     
     def generate_document_content(self, employee, document_type, data):
         """Generate document content using template"""
         
         if document_type == 'offer_letter':
-            template_content = self.get_offer_letter_template()
+            template = get_builtin_template('offer_letter', self.get_offer_letter_template)
             
             # Format start date
             start_date_str = data.get('start_date', '')
@@ -1966,7 +1619,7 @@ class DocumentGenerationViewSet(viewsets.ViewSet):
             }
             
         elif document_type == 'salary_increment':
-            template_content = self.get_salary_increment_template()
+            template = get_builtin_template('salary_increment', self.get_salary_increment_template)
             
             # Try to get increment record for auto-fetching data
             increment_record = None
@@ -2041,102 +1694,21 @@ class DocumentGenerationViewSet(viewsets.ViewSet):
             }
         
         elif document_type == 'salary_slip':
-            template_content = self.get_salary_slip_template()
-            
-            # Get salary slip data from frontend
-            basic_salary = float(data.get('basic_salary', 0))
-            extra_days_pay = float(data.get('extra_days_pay', 0))
-            total_gross_salary = float(data.get('total_gross_salary', 0))
-            net_salary = float(data.get('net_salary', 0))
-            total_salary = float(data.get('total_salary', 0))
-            
-            # Get additional fields
-            total_days = data.get('total_days', 0)
-            worked_days = data.get('worked_days', 0)
-            per_day_pay = float(data.get('per_day_pay', 0))
-            gross_salary = float(data.get('gross_salary', 0))
-            absent_days = data.get('absent_days', 0)
-            total_deductions = float(data.get('total_deductions', 0))
-            final_salary = float(data.get('final_salary', 0))
-            basic_pay = float(data.get('basic_pay', 0))
-            
-            # Format salary month and year
-            salary_month = data.get('salary_month', '')
-            salary_year = data.get('salary_year', '')
-            
-            # Get employee details from data or fallback to employee object
-            # Handle different field name variations from frontend
-            employee_name = (data.get('employee_name') or 
-                           data.get('full_name') or 
-                           employee.get_full_name())
-            employee_id_display = (data.get('employee_id_number') or 
-                                  data.get('employee_employee_id') or 
-                                  data.get('employee_id') or 
-                                  employee.employee_id if employee.employee_id else str(employee.id)[:8].upper())
-            employee_designation = (data.get('employee_designation') or 
-                                  data.get('designation') or 
-                                  employee.designation or 'Not specified')
-            employee_department = (data.get('employee_department') or 
-                                 data.get('department') or 
-                                 str(getattr(employee, 'department', 'Not specified')))
-            office_name = (data.get('employee_office') or 
-                         data.get('office_name') or 
-                         getattr(employee.office, 'name', 'Not specified') if hasattr(employee, 'office') and employee.office else 'Not specified')
-            
-            # Get bank details from data or employee object
-            bank_name = data.get('bank_name', getattr(employee, 'bank_name', 'Not specified'))
-            account_number = data.get('account_number', getattr(employee, 'account_number', 'Not specified'))
-            ifsc_code = data.get('ifsc_code', getattr(employee, 'ifsc_code', 'Not specified'))
-            
-            # Get other employee details
-            address = data.get('address', getattr(employee, 'address', 'Not specified'))
-            pan_number = data.get('pan_number', getattr(employee, 'pan_number', 'Not specified'))
-            aadhar_number = data.get('aadhar_number', getattr(employee, 'aadhar_number', 'Not specified'))
-            uan_number = data.get('uan_number', getattr(employee, 'uan_number', 'Not specified'))
-            esi_number = data.get('esi_number', getattr(employee, 'esi_number', 'Not specified'))
-            pf_number = data.get('pf_number', getattr(employee, 'pf_number', 'Not specified'))
-            
-            
-            context = {
-                'employee_name': employee_name,
-                'employee_id': employee_id_display,
-                'employee_designation': employee_designation,
-                'employee_department': employee_department,
-                'office_name': office_name,
-                'bank_name': bank_name,
-                'account_number': account_number,
-                'ifsc_code': ifsc_code,
-                'address': address,
-                'pan_number': pan_number,
-                'aadhar_number': aadhar_number,
-                'uan_number': uan_number,
-                'esi_number': esi_number,
-                'pf_number': pf_number,
-                'salary_month': salary_month,
-                'salary_year': salary_year,
-                'basic_salary': self.format_currency(basic_salary),
-                'extra_days_pay': self.format_currency(extra_days_pay),
-                'total_salary': self.format_currency(total_salary),
-                'net_salary': self.format_currency(net_salary),
-                'total_gross_salary': self.format_currency(total_gross_salary),
-                'gross_salary': self.format_currency(gross_salary),
-                'per_day_pay': self.format_currency(per_day_pay),
-                'basic_pay': self.format_currency(basic_pay),
-                'final_salary': self.format_currency(final_salary),
-                'total_deductions': self.format_currency(total_deductions),
-                'total_days': total_days,
-                'worked_days': worked_days,
-                'absent_days': absent_days,
-                'logo_url': self.get_logo_url(),
-                'current_date': datetime.now().strftime('%d/%m/%Y')
-            }
+            template = get_builtin_template('salary_slip', self.get_salary_slip_template)
+            context = self.get_salary_slip_context(employee, data)
         
         else:
             raise ValueError(f"Unsupported document type: {document_type}")
         
-        # Render template
-        template = Template(template_content)
-        rendered_content = template.render(Context(context))
+        # An explicitly chosen DocumentTemplate replaces the built-in layout
+        template_id = data.get('template_id')
+        if template_id:
+            document_template = DocumentTemplate.objects.filter(id=template_id, document_type=document_type).first()
+            if document_template:
+                template = get_document_template(document_template)
+        
+        # Render template (compiled once per process)
+        rendered_content = render_template(template, context)
         
         return rendered_content
     
@@ -2293,14 +1865,11 @@ class DocumentGenerationViewSet(viewsets.ViewSet):
             )
             
             # Generate file based on document type
-            if check_weasyprint_availability():
+            if pdf_engine.is_available():
                 # Generate PDF for other document types
                 try:
-                    import weasyprint
                     logger.info(f"Generating PDF for document {generated_doc.id}")
-                    pdf_buffer = BytesIO()
-                    weasyprint.HTML(string=content).write_pdf(pdf_buffer)
-                    pdf_buffer.seek(0)
+                    pdf_buffer = BytesIO(render_pdf(inline_logo(content, self.get_logo_url())))
                     
                     # Save PDF file
                     filename = f"{title.replace(' ', '_')}_{generated_doc.id}.pdf"
@@ -2333,8 +1902,119 @@ class DocumentGenerationViewSet(viewsets.ViewSet):
                 {'error': 'Failed to generate document'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-    
-    
+
+    @action(detail=False, methods=['post'])
+    def batch_salary_slips(self, request):
+        """Start a background job generating salary slips for a whole month"""
+        from .salary_slip_batch import OUTPUT_CHOICES, OUTPUT_ZIP, launch_batch_process, set_batch_progress
+        from .tasks import generate_salary_slips_task
+        import uuid
+
+        user = request.user
+        if user.role not in ['admin', 'manager', 'accountant']:
+            return Response(
+                {'error': 'You do not have permission to generate salary slips'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        try:
+            salary_month = datetime.strptime(str(request.data.get('salary_month', ''))[:7], '%Y-%m').date()
+        except ValueError:
+            return Response(
+                {'error': 'salary_month is required (YYYY-MM)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        output = request.data.get('output', OUTPUT_ZIP)
+        if output not in OUTPUT_CHOICES:
+            return Response(
+                {'error': f"output must be one of: {', '.join(OUTPUT_CHOICES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        office_id = request.data.get('office_id')
+        if user.role == 'manager':
+            # Managers can only generate slips for their own office
+            office_id = str(user.office_id) if user.office_id else None
+            if not office_id:
+                return Response({'error': 'Manager has no office assigned'}, status=status.HTTP_403_FORBIDDEN)
+
+        employee_ids = request.data.get('employee_ids') or None
+        job_id = str(uuid.uuid4())
+        set_batch_progress(
+            job_id, status='queued', total=0, done=0, failed=0,
+            salary_month=salary_month.strftime('%Y-%m'), output=output, requested_by=str(user.id)
+        )
+        task_kwargs = {
+            'office_id': office_id,
+            'employee_ids': [str(employee_id) for employee_id in employee_ids] if employee_ids else None,
+            'output': output,
+            'requested_by_id': str(user.id),
+        }
+        try:
+            generate_salary_slips_task.delay(job_id, salary_month.isoformat(), **task_kwargs)
+        except Exception as e:
+            # Never render the batch in the web worker: hand it to a detached management command
+            logger.warning(f"Could not queue salary slip batch {job_id}, starting generate_salary_slips: {e}")
+            try:
+                launch_batch_process(job_id, salary_month, **task_kwargs)
+            except OSError as launch_error:
+                logger.error(f"Could not start salary slip batch {job_id}: {launch_error}")
+                set_batch_progress(job_id, status='failed', error='Batch generation is unavailable')
+                return Response(
+                    {'error': 'Salary slip generation is temporarily unavailable, please try again later'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE
+                )
+        return Response({'job_id': job_id, 'status': 'queued'}, status=status.HTTP_202_ACCEPTED)
+
+    def _batch_job_allowed(self, user, progress):
+        """Admins see every batch job; managers and accountants only the ones they started"""
+        if user.role == 'admin':
+            return True
+        return user.role in ['manager', 'accountant'] and progress.get('requested_by') == str(user.id)
+
+    def _batch_progress_response(self, request, progress):
+        data = dict(progress or {})
+        if data.get('file_name'):
+            data['download_url'] = f"{self.reverse_action('batch-salary-slips-download')}?job_id={data['job_id']}"
+        data.pop('requested_by', None)
+        return data
+
+    @action(detail=False, methods=['get'])
+    def batch_salary_slips_status(self, request):
+        """Progress of a batch salary slip job (?job_id=)"""
+        from .salary_slip_batch import get_batch_progress
+
+        job_id = request.query_params.get('job_id')
+        if not job_id:
+            return Response({'error': 'job_id parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        progress = get_batch_progress(job_id)
+        if progress is None or not self._batch_job_allowed(request.user, progress):
+            return Response({'error': 'Unknown or expired job'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self._batch_progress_response(request, progress))
+
+    @action(detail=False, methods=['get'])
+    def batch_salary_slips_download(self, request):
+        """Download the ZIP of a completed batch salary slip job (?job_id=)"""
+        import os
+        from .salary_slip_batch import batch_zip_path, get_batch_progress
+
+        job_id = request.query_params.get('job_id')
+        if not job_id:
+            return Response({'error': 'job_id parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        progress = get_batch_progress(job_id)
+        if progress is None or not self._batch_job_allowed(request.user, progress):
+            return Response({'error': 'Unknown or expired job'}, status=status.HTTP_404_NOT_FOUND)
+        zip_path = batch_zip_path(progress)
+        if zip_path is None:
+            return Response({'error': 'Job has no ZIP to download'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            return serve_file(request, zip_path, os.path.basename(zip_path), content_type='application/zip')
+        except FileNotFoundError:
+            return Response({'error': 'ZIP file has expired'}, status=status.HTTP_404_NOT_FOUND)
+
     @action(detail=False, methods=['get'], url_path='employees')
     def get_employees(self, request):
         """Get list of employees for document generation"""
@@ -0,0 +1,128 @@
+"""
+Employee Directory
+Compact user list for dropdowns, served from a versioned cache snapshot with an ETag.
+With a shared cache the version is a counter bumped by signals; with a per-process
+cache (LocMem) bumps from other workers never arrive, so it is derived from the
+latest updated_at and row count of users, offices and departments.
+"""
+
+import hashlib
+import json
+import logging
+import time
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .cache_utils import cache_is_shared
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'employee_directory:version'
+SNAPSHOT_KEY = 'employee_directory:snapshot:{version}'
+SNAPSHOT_TTL = 60 * 60 * 24
+
+DIRECTORY_FIELDS = (
+    'id', 'first_name', 'last_name', 'username', 'employee_id',
+    'office_id', 'office__name', 'department_id', 'department__name', 'role', 'is_active',
+)
+
+
+def _database_version():
+    from .conditional import db_versions
+    from .models import CustomUser, Department, Office
+
+    versions = db_versions([CustomUser.objects.all(), Office.objects.all(), Department.objects.all()])
+    if versions is None:
+        return None
+    return 'db-' + hashlib.sha1('|'.join(versions).encode('utf-8')).hexdigest()[:16]
+
+
+def _current_version():
+    if not cache_is_shared():
+        version = _database_version()
+        if version is not None:
+            return version
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = int(time.time() * 1000)
+        # add(): concurrent first readers agree on one version
+        if not cache.add(VERSION_KEY, version, None):
+            version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def invalidate_directory():
+    """New version: the next request rebuilds the snapshot (old ones age out of the cache)"""
+    try:
+        cache.set(VERSION_KEY, int(time.time() * 1000), None)
+    except Exception as e:
+        logger.warning(f"Could not invalidate employee directory: {e}")
+
+
+def _build_snapshot():
+    from .models import CustomUser
+
+    entries = []
+    for row in CustomUser.objects.order_by('first_name', 'last_name', 'username').values(*DIRECTORY_FIELDS):
+        name = f"{row['first_name']} {row['last_name']}".strip() or row['username']
+        entries.append({
+            'id': str(row['id']),
+            'name': name,
+            'employee_id': row['employee_id'],
+            'office_id': str(row['office_id']) if row['office_id'] else None,
+            'office_name': row['office__name'],
+            'department_id': str(row['department_id']) if row['department_id'] else None,
+            'department_name': row['department__name'],
+            'role': row['role'],
+            'is_active': row['is_active'],
+        })
+    body = json.dumps(entries, cls=DjangoJSONEncoder, separators=(',', ':')).encode('utf-8')
+    return {
+        'entries': entries,
+        'body': body,
+        'etag': hashlib.sha1(body).hexdigest()[:20],
+    }
+
+
+def get_snapshot():
+    """{'entries', 'body', 'etag'} for the current version, built at most once per version"""
+    version = _current_version()
+    key = SNAPSHOT_KEY.format(version=version)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = _build_snapshot()
+        cache.set(key, snapshot, SNAPSHOT_TTL)
+        logger.info(f"Employee directory snapshot rebuilt: {len(snapshot['entries'])} users")
+    return snapshot
+
+
+def _scope_variant(scope):
+    """None for full-directory roles, else (office ids, user id) for a manager's slice"""
+    if scope.is_admin or scope.is_accountant:
+        return None
+    return {str(office_id) for office_id in scope.office_ids}, str(scope.user_id)
+
+
+def directory_etag(scope, snapshot=None):
+    snapshot = snapshot or get_snapshot()
+    variant = _scope_variant(scope)
+    if variant is None:
+        return f'"{snapshot["etag"]}"'
+    office_ids, user_id = variant
+    digest = hashlib.sha1(','.join(sorted(office_ids) + [user_id]).encode('utf-8')).hexdigest()[:8]
+    return f'"{snapshot["etag"]}-{digest}"'
+
+
+def directory_body(scope, snapshot=None):
+    """JSON bytes of the entries the access scope may see (managers: their offices plus themselves)"""
+    snapshot = snapshot or get_snapshot()
+    variant = _scope_variant(scope)
+    if variant is None:
+        return snapshot['body']
+    office_ids, user_id = variant
+    entries = [
+        entry for entry in snapshot['entries']
+        if entry['office_id'] in office_ids or entry['id'] == user_id
+    ]
+    return json.dumps(entries, separators=(',', ':')).encode('utf-8')
@@ -0,0 +1,165 @@
+"""
+Stored File Serving
+Streams media files with Range/ETag support, or hands them to nginx/Apache
+"""
+
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import content_disposition_header, http_date
+
+FILE_SERVING_DJANGO = 'django'
+FILE_SERVING_X_ACCEL = 'x-accel'  # nginx: internal location mapped to MEDIA_ROOT
+FILE_SERVING_X_SENDFILE = 'x-sendfile'  # Apache mod_xsendfile / lighttpd
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class _RangeFile:
+    """Read-only view of `length` bytes of an open file starting at `start`"""
+
+    def __init__(self, handle, start, length):
+        self._handle = handle
+        self._remaining = length
+        handle.seek(start)
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._handle.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._handle.close()
+
+
+def private_media_root():
+    """Directory for generated files the web server must never publish (outside MEDIA_ROOT)"""
+    return str(getattr(settings, 'PRIVATE_MEDIA_ROOT', None) or os.path.join(settings.BASE_DIR, 'private_media'))
+
+
+def _under(path, root):
+    root = os.path.realpath(root)
+    return os.path.commonpath([os.path.realpath(path), root]) == root
+
+
+def file_etag(stat_result):
+    """Strong validator from mtime and size; no need to hash the contents"""
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    candidates = [candidate.strip() for candidate in header.split(',')]
+    return etag in candidates or f'W/{etag}' in candidates
+
+
+def _parse_range(header, size):
+    """(start, end) inclusive for a single byte range, None when absent/unsupported, False when unsatisfiable"""
+    match = _RANGE.match(header.strip()) if header else None
+    if not match:
+        return None  # Missing, malformed or multi-range: serve the whole file
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _offload_response(path, mode):
+    """Empty response that tells the front-end server to send the file itself"""
+    response = HttpResponse()
+    if mode == FILE_SERVING_X_ACCEL:
+        media_root = os.path.realpath(settings.MEDIA_ROOT)
+        relative = os.path.relpath(os.path.realpath(path), media_root).replace(os.sep, '/')
+        prefix = getattr(settings, 'FILE_SERVING_ACCEL_PREFIX', '/protected-media/').rstrip('/')
+        response['X-Accel-Redirect'] = f'{prefix}/{relative}'
+    else:
+        response['X-Sendfile'] = os.path.realpath(path)
+    return response
+
+
+def serve_file(request, path, filename, content_type=None, as_attachment=True):
+    """
+    Serve a file from disk without loading it into memory.
+
+    - ETag/Last-Modified come from one stat(); a matching If-None-Match gets a 304.
+    - In the default 'django' mode the file is streamed through FileResponse (the
+      WSGI server uses sendfile() when it can) and a single `Range: bytes=` request
+      gets a 206 partial response.
+    - With FILE_SERVING_MODE = 'x-accel' or 'x-sendfile' only headers are returned
+      and nginx/Apache stream the file, Range included; files outside MEDIA_ROOT
+      are still streamed by Django.
+
+    Raises FileNotFoundError when the file is missing.
+    """
+    stat_result = os.stat(path)
+    etag = file_etag(stat_result)
+    last_modified = http_date(stat_result.st_mtime)
+    content_type = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if _etag_matches(request.headers.get('If-None-Match'), etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['Last-Modified'] = last_modified
+        return response
+
+    mode = getattr(settings, 'FILE_SERVING_MODE', FILE_SERVING_DJANGO)
+    if mode in (FILE_SERVING_X_ACCEL, FILE_SERVING_X_SENDFILE) and not _under(path, settings.MEDIA_ROOT):
+        # The front-end server is only trusted with MEDIA_ROOT (nginx's internal location,
+        # XSendFilePath for Apache); private files are streamed here
+        mode = FILE_SERVING_DJANGO
+    if mode in (FILE_SERVING_X_ACCEL, FILE_SERVING_X_SENDFILE):
+        response = _offload_response(path, mode)
+        response['Content-Type'] = content_type
+    else:
+        size = stat_result.st_size
+        byte_range = None
+        if_range = request.headers.get('If-Range')
+        if not if_range or if_range.strip() == etag:
+            byte_range = _parse_range(request.headers.get('Range'), size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        handle = open(path, 'rb')
+        if byte_range:
+            start, end = byte_range
+            response = FileResponse(_RangeFile(handle, start, end - start + 1), content_type=content_type, status=206)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = end - start + 1
+        else:
+            response = FileResponse(handle, content_type=content_type)
+            response['Content-Length'] = size
+        response['Accept-Ranges'] = 'bytes'
+
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    return response
+
+
+def has_pdf_header(path):
+    """Cheap corruption check: read the first bytes instead of the whole file"""
+    with open(path, 'rb') as handle:
+        return handle.read(4) == b'%PDF'
@@ -3,16 +3,11 @@
 Control attendance service and provide alternatives
 """
 
-import os
 import sys
-import django
 import signal
 import psutil
 from django.core.management.base import BaseCommand
 
-# Setup Django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'attendance_system.settings')
-django.setup()
 
 class Command(BaseCommand):
     help = 'Control attendance service and provide alternatives'
@@ -5,9 +5,7 @@ Automatic Attendance Fetching Service
 Prevents duplicates and handles both historical and real-time data
 """
 
-import os
 import sys
-import django
 import logging
 import time
 import signal
@@ -20,11 +18,10 @@ from django.db import transaction, connection
 from django.conf import settings
 from django.core.cache import cache
 
-# Setup Django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'attendance_system.settings')
-django.setup()
 
+from core import metrics
 from core.models import Device, CustomUser, Attendance, Office, ESSLAttendanceLog
+from core.db_pool.pool import pooled_connection
 
 # Configure logging
 logging.basicConfig(
@@ -73,9 +70,11 @@ class AutoAttendanceService:
             
         logger.info("Starting automatic attendance fetching service...")
         self.running = True
+        metrics.register_collector(self.collect_metrics)
         
-        # Get all active devices
-        self.devices = list(Device.objects.filter(is_active=True))
+        # Get all active devices; the main thread then only sleeps, so hand the connection back
+        with pooled_connection():
+            self.devices = list(Device.objects.filter(is_active=True))
         logger.info(f"Found {len(self.devices)} active devices")
         
         # Initialize device connections and tracking
@@ -121,7 +120,8 @@ class AutoAttendanceService:
         
         while self.running:
             try:
-                with self.processing_lock:
+                # Hand the DB connection back after each cycle instead of holding it between sleeps
+                with self.processing_lock, pooled_connection():
                     self._fetch_all_devices()
                     
                 # Update stats
@@ -131,6 +131,7 @@ class AutoAttendanceService:
                 # Log periodic stats
                 if self.stats['total_fetches'] % 10 == 0:  # Every 10 fetches
                     self._log_stats()
+                metrics.registry.maybe_publish()
                     
                 time.sleep(self.interval)
                 
@@ -140,6 +141,7 @@ class AutoAttendanceService:
             except Exception as e:
                 logger.error(f"Error in service loop: {str(e)}")
                 self.stats['errors'] += 1
+                metrics.registry.maybe_publish()
                 time.sleep(self.interval)
                 
     def _fetch_all_devices(self):
@@ -201,7 +203,10 @@ class AutoAttendanceService:
                 return
                 
             # Get attendance data
+            started = time.perf_counter()
             attendance_logs = conn.get_attendance()
+            metrics.observe('attendance_device_rtt_seconds', time.perf_counter() - started,
+                            device=device.name, operation='fetch')
             if not attendance_logs:
                 logger.info(f"No new attendance data from {device.name}")
                 return
@@ -223,7 +228,10 @@ class AutoAttendanceService:
         """Connect to ZKTeco device"""
         try:
             zk = ZK(device.ip_address, port=device.port, timeout=10, force_udp=False, verbose=False)
+            started = time.perf_counter()
             conn = zk.connect()
+            metrics.observe('attendance_device_rtt_seconds', time.perf_counter() - started,
+                            device=device.name, operation='connect')
             if conn:
                 logger.info(f"Connected to ZKTeco device {device.name}")
                 return conn
@@ -281,6 +289,8 @@ class AutoAttendanceService:
         # Update stats
         self.stats['total_records'] += new_records
         self.stats['duplicates_prevented'] += duplicates
+        if new_records:
+            metrics.inc('attendance_punches_total', new_records, device=device.name, source='zkteco_fetch')
         
         logger.info(f"Processed {new_records} new records, prevented {duplicates} duplicates from {device.name}")
         
@@ -324,6 +334,7 @@ class AutoAttendanceService:
                 }
             )
             
+            wrote = created
             if created:
                 # First scan of the day - this is the check-in
                 logger.info(f"FIRST SCAN: Check-in for {user.get_full_name()} at {timestamp.strftime('%H:%M:%S')}")
@@ -341,12 +352,14 @@ class AutoAttendanceService:
                         old_checkin = attendance.check_in_time
                         attendance.check_in_time = timestamp
                         attendance.save()
+                        wrote = True
                         logger.info(f"EARLIER SCAN: Updated check-in for {user.get_full_name()} from {old_checkin.strftime('%H:%M:%S')} to {timestamp.strftime('%H:%M:%S')}")
                     elif timestamp > check_in_time:
                         # Later timestamp - update check-out time (last scan of the day)
                         if not attendance.check_out_time:
                             attendance.check_out_time = timestamp
                             attendance.save()
+                            wrote = True
                             logger.info(f"LAST SCAN: Check-out for {user.get_full_name()} at {timestamp.strftime('%H:%M:%S')}")
                         else:
                             # Make existing checkout time timezone-aware for comparison
@@ -358,6 +371,7 @@ class AutoAttendanceService:
                                 old_checkout = attendance.check_out_time
                                 attendance.check_out_time = timestamp
                                 attendance.save()
+                                wrote = True
                                 logger.info(f"LATER SCAN: Updated check-out for {user.get_full_name()} from {old_checkout.strftime('%H:%M:%S')} to {timestamp.strftime('%H:%M:%S')}")
                             else:
                                 # This scan is between check-in and check-out, log it but don't change times
@@ -367,8 +381,14 @@ class AutoAttendanceService:
                     attendance.check_in_time = timestamp
                     attendance.status = 'present'
                     attendance.save()
+                    wrote = True
                     logger.info(f"FIXED: Set check-in for {user.get_full_name()} at {timestamp.strftime('%H:%M:%S')} (was missing check-in)")
-                        
+
+            if wrote:
+                # Autocommit: the write above is committed by now; middle scans and
+                # re-fetched records changed nothing and would skew the lag
+                metrics.observe('attendance_ingest_lag_seconds', (timezone.now() - timestamp).total_seconds(),
+                                source='zkteco_fetch')
             return True
                 
         except Exception as e:
@@ -382,7 +402,10 @@ class AutoAttendanceService:
             from core.essl_service import essl_service
             
             # Get attendance data from ESSL device
+            started = time.perf_counter()
             attendance_data = essl_service.get_device_attendance(device)
+            metrics.observe('attendance_device_rtt_seconds', time.perf_counter() - started,
+                            device=device.name, operation='fetch')
             
             if attendance_data:
                 self._process_essl_attendance(device, attendance_data)
@@ -407,6 +430,8 @@ class AutoAttendanceService:
                 logger.error(f"Error processing ESSL attendance record: {str(e)}")
                 
         self.stats['total_records'] += new_records
+        if new_records:
+            metrics.inc('attendance_punches_total', new_records, device=device.name, source='essl_fetch')
         logger.info(f"Processed {new_records} new ESSL records from {device.name}")
         
     def _save_essl_attendance(self, device, record):
@@ -445,6 +470,7 @@ class AutoAttendanceService:
                 }
             )
             
+            wrote = created
             if created:
                 # First scan of the day - this is the check-in
                 logger.info(f"FIRST SCAN (ESSL): Check-in for {user.get_full_name()} at {timestamp.strftime('%H:%M:%S')}")
@@ -466,12 +492,14 @@ class AutoAttendanceService:
                         old_checkin = attendance.check_in_time
                         attendance.check_in_time = timestamp
                         attendance.save()
+                        wrote = True
                         logger.info(f" EARLIER SCAN (ESSL): Updated check-in for {user.get_full_name()} from {old_checkin.strftime('%H:%M:%S')} to {timestamp.strftime('%H:%M:%S')}")
                     elif timestamp > existing_checkin:
                         # Later timestamp - update check-out time (last scan of the day)
                         if not attendance.check_out_time:
                             attendance.check_out_time = timestamp
                             attendance.save()
+                            wrote = True
                             logger.info(f"LAST SCAN (ESSL): Check-out for {user.get_full_name()} at {timestamp.strftime('%H:%M:%S')}")
                         else:
                             # Make existing checkout time timezone-aware for comparison
@@ -483,6 +511,7 @@ class AutoAttendanceService:
                                 old_checkout = attendance.check_out_time
                                 attendance.check_out_time = timestamp
                                 attendance.save()
+                                wrote = True
                                 logger.info(f" LATER SCAN (ESSL): Updated check-out for {user.get_full_name()} from {old_checkout.strftime('%H:%M:%S')} to {timestamp.strftime('%H:%M:%S')}")
                             else:
                                 # This scan is between check-in and check-out, log it but don't change times
@@ -492,8 +521,12 @@ class AutoAttendanceService:
                     attendance.check_in_time = timestamp
                     attendance.status = 'present'
                     attendance.save()
+                    wrote = True
                     logger.info(f"FIXED (ESSL): Set check-in for {user.get_full_name()} at {timestamp.strftime('%H:%M:%S')} (was missing check-in)")
-                        
+
+            if wrote:
+                metrics.observe('attendance_ingest_lag_seconds', (timezone.now() - timestamp).total_seconds(),
+                                source='essl_fetch')
             return True
                 
         except Exception as e:
@@ -515,6 +548,16 @@ class AutoAttendanceService:
         """Get current service statistics"""
         return self.stats.copy()
 
+    def collect_metrics(self, registry):
+        """Metrics collector: exports self.stats"""
+        stats = self.stats
+        registry.set('attendance_fetch_cycles_total', stats['total_fetches'])
+        registry.set('attendance_fetch_records_total', stats['total_records'])
+        registry.set('attendance_fetch_duplicates_total', stats['duplicates_prevented'])
+        registry.set('attendance_fetch_errors_total', stats['errors'])
+        if stats['last_successful_fetch']:
+            registry.set('attendance_fetch_last_success_timestamp_seconds', stats['last_successful_fetch'].timestamp())
+
 # Global service instance
 auto_attendance_service = AutoAttendanceService()
 
@@ -4,9 +4,7 @@ Automatic ZKTeco Data Fetching Service
 Continuously fetches attendance data from all ZKTeco devices in the background
 """
 
-import os
 import sys
-import django
 import logging
 import time
 import signal
@@ -17,13 +15,11 @@ from django.utils import timezone
 from django.db import transaction
 from django.conf import settings
 
-# Setup Django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'attendance_system.settings')
-django.setup()
 
 from core.models import Device, CustomUser, Attendance, Office
 from core.zkteco_service import zkteco_service
-from core.db_manager import db_manager, with_db_connection
+from core.db_manager import db_manager
+from core.db_pool.pool import pooled_connection
 
 # Configure logging
 logging.basicConfig(
@@ -55,11 +51,12 @@ class AutoFetchService:
         logger.info("Starting automatic ZKTeco data fetching service...")
         self.running = True
         
-        # Get all active ZKTeco devices
-        self.devices = list(Device.objects.filter(
-            device_type='zkteco',
-            is_active=True
-        ))
+        # Get all active ZKTeco devices; the main thread then only sleeps, so hand the connection back
+        with pooled_connection():
+            self.devices = list(Device.objects.filter(
+                device_type='zkteco',
+                is_active=True
+            ))
         
         logger.info(f"Found {len(self.devices)} active ZKTeco devices")
         
@@ -85,7 +82,9 @@ class AutoFetchService:
         """Main service loop"""
         while self.running:
             try:
-                self._fetch_all_devices()
+                # One pooled unit of work per cycle: nothing is held between sleeps
+                with pooled_connection():
+                    self._fetch_all_devices()
                 time.sleep(self.interval)
             except KeyboardInterrupt:
                 logger.info("Received interrupt signal")
@@ -94,7 +93,6 @@ class AutoFetchService:
                 logger.error(f"Error in service loop: {str(e)}")
                 time.sleep(self.interval)
                 
-    @with_db_connection
     def _fetch_all_devices(self):
         """Fetch data from all devices"""
         current_time = timezone.now()
@@ -4,9 +4,7 @@ Improved Automatic ZKTeco Data Fetching Service
 24/7 background service that properly handles check-in and check-out times
 """
 
-import os
 import sys
-import django
 import logging
 import time
 import signal
@@ -17,11 +15,9 @@ from django.utils import timezone
 from django.db import transaction
 from django.conf import settings
 
-# Setup Django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'attendance_system.settings')
-django.setup()
 
 from core.models import Device, CustomUser, Attendance, Office
+from core.db_pool.pool import pooled_connection
 
 # Configure logging
 logging.basicConfig(
@@ -62,11 +58,12 @@ class ImprovedAutoFetchService:
         logger.info(" Starting improved automatic ZKTeco data fetching service...")
         self.running = True
         
-        # Get all active ZKTeco devices
-        self.devices = list(Device.objects.filter(
-            device_type='zkteco',
-            is_active=True
-        ))
+        # Get all active ZKTeco devices; the main thread then only sleeps, so hand the connection back
+        with pooled_connection():
+            self.devices = list(Device.objects.filter(
+                device_type='zkteco',
+                is_active=True
+            ))
         
         logger.info(f" Found {len(self.devices)} active ZKTeco devices")
         
@@ -346,7 +343,9 @@ class ImprovedAutoFetchService:
         
         while self.running:
             try:
-                self._fetch_all_devices()
+                # One pooled unit of work per cycle: nothing is held between sleeps
+                with pooled_connection():
+                    self._fetch_all_devices()
                 time.sleep(self.interval)
             except KeyboardInterrupt:
                 logger.info("Received interrupt signal")
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from core.attendance_scope import BATCH_SIZE, backfill_attendance_scope
+
+
+class Command(BaseCommand):
+    help = 'Re-sync the denormalized Attendance.office / user_active columns from each user'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='user_ids',
+            help='Only this user id (repeatable; default: all users)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Rows per UPDATE statement (default: {BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        result = backfill_attendance_scope(user_ids=options['user_ids'], batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f"Updated {result['updated']} attendance rows across {result['users']} users")
+        )
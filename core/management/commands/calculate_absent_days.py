@@ -1,8 +1,8 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from datetime import datetime, date, timedelta
+from datetime import datetime, date
 from core.models import Attendance, CustomUser, WorkingHoursSettings
-import calendar
+from core.month_calendar import get_month_calendar
 
 
 class Command(BaseCommand):
@@ -40,11 +40,13 @@ class Command(BaseCommand):
             self.style.SUCCESS(f'Calculating absent days for {target_date.strftime("%B %Y")}')
         )
 
-        # Get all working days in the month (Monday to Friday)
-        working_days = self.get_working_days(target_date.year, target_date.month)
+        # Get all working days in the month (Monday to Friday, holidays excluded)
+        month_calendar = get_month_calendar(target_date.year, target_date.month)
+        working_days = month_calendar.working_days
         
         # Get all active users
-        users = CustomUser.objects.filter(is_active=True)
+        users = CustomUser.objects.filter(is_active=True).select_related('office')
+        office_settings = {s.office_id: s for s in WorkingHoursSettings.objects.all()}
         
         total_absent_created = 0
         total_absent_updated = 0
@@ -56,20 +58,23 @@ class Command(BaseCommand):
             self.stdout.write(f'Processing user: {user.get_full_name()} ({user.office.name})')
             
             # Get working hours settings for the user's office
-            try:
-                settings = WorkingHoursSettings.objects.get(office=user.office)
-            except WorkingHoursSettings.DoesNotExist:
+            if user.office_id not in office_settings:
                 self.stdout.write(
                     self.style.WARNING(f'No working hours settings found for {user.office.name}')
                 )
                 continue
 
+            # Existing records for the month, keyed by date
+            existing_by_date = {
+                att.date: att for att in Attendance.objects.filter(
+                    user=user,
+                    date__range=[month_calendar.first_day, month_calendar.last_day]
+                )
+            }
+
             for working_day in working_days:
                 # Check if attendance record exists for this day
-                existing_attendance = Attendance.objects.filter(
-                    user=user,
-                    date=working_day
-                ).first()
+                existing_attendance = existing_by_date.get(working_day)
 
                 if existing_attendance:
                     # Update existing record if it's marked as absent but should be recalculated
@@ -108,23 +113,3 @@ class Command(BaseCommand):
                 f'Updated {total_absent_updated} existing records'
             )
         )
-
-    def get_working_days(self, year, month):
-        """Get all working days (Monday to Friday) in the given month"""
-        working_days = []
-        
-        # Get the first day of the month
-        first_day = date(year, month, 1)
-        
-        # Get the last day of the month
-        last_day = date(year, month, calendar.monthrange(year, month)[1])
-        
-        current_date = first_day
-        
-        while current_date <= last_day:
-            # Monday = 0, Tuesday = 1, ..., Friday = 4
-            if current_date.weekday() < 5:  # Monday to Friday
-                working_days.append(current_date)
-            current_date += timedelta(days=1)
-        
-        return working_days
@@ -3,17 +3,12 @@
 Management command to configure ZKTeco devices for auto push
 """
 
-import os
 import sys
-import django
 import logging
 from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 from django.conf import settings
 
-# Setup Django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'attendance_system.settings')
-django.setup()
 
 from core.models import Device, Office
 from core.zkteco_push_service import zkteco_push_service
@@ -5,20 +5,16 @@ Simple command to fetch attendance from all devices one by one
 Disables Redis/WebSocket broadcasting to prevent connection issues
 """
 
-import os
 import sys
-import django
 from datetime import datetime, timedelta
 import hashlib
 
-# Setup Django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'attendance_system.settings')
-django.setup()
 
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from django.db import transaction, connection
 from core.models import Device, CustomUser, Attendance
+from core.db_pool.pool import pooled_connection
 
 # Disable signals to prevent Redis broadcasting
 from django.db.models.signals import post_save
@@ -103,12 +99,12 @@ class Command(BaseCommand):
             )
             
             try:
-                # Ensure fresh database connection for each device
-                connection.close()
-                
-                processed, new_records, duplicates = self.fetch_device_attendance(
-                    device, start_date, end_date, limit
-                )
+                # One pooled unit of work per device: the connection goes back (or is
+                # discarded after an error) before the next device
+                with pooled_connection():
+                    processed, new_records, duplicates = self.fetch_device_attendance(
+                        device, start_date, end_date, limit
+                    )
                 
                 total_processed += processed
                 total_new_records += new_records
@@ -122,8 +118,6 @@ class Command(BaseCommand):
                 self.stdout.write(
                     self.style.ERROR(f"   {device.name}: Error - {str(e)}")
                 )
-                # Close connection on error
-                connection.close()
             
             self.stdout.write("")  # Empty line for readability
         
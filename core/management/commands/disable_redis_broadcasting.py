@@ -4,13 +4,8 @@ Disable Redis Broadcasting for Attendance Commands
 This command temporarily disables Redis/WebSocket broadcasting to prevent connection issues
 """
 
-import os
 import sys
-import django
 
-# Setup Django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'attendance_system.settings')
-django.setup()
 
 from django.core.management.base import BaseCommand
 from django.db.models.signals import post_save
@@ -0,0 +1,141 @@
+"""
+Run EXPLAIN on the queries behind the busiest attendance endpoints and report
+full table scans, so an endpoint change that stops using the indexes is caught.
+"""
+
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from core.models import Attendance, Device, ESSLAttendanceLog, Office
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot attendance/report queries and report full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Database alias to explain against (default: default)',
+        )
+        parser.add_argument(
+            '--min-rows',
+            type=int,
+            default=1000,
+            help='Ignore full scans the planner estimates below this many rows (MySQL only; default: 1000)',
+        )
+        parser.add_argument(
+            '--fail-on-scan',
+            action='store_true',
+            help='Exit with an error when a full scan is found (for CI / deploy checks)',
+        )
+        parser.add_argument(
+            '--verbose-plan',
+            action='store_true',
+            help='Print every plan row, not only the scans',
+        )
+
+    def hot_queries(self):
+        """(name, queryset) pairs mirroring the endpoint queries the indexes were designed for"""
+        now = timezone.now()
+        today = now.date()
+        month_start = today.replace(day=1)
+        office_id = Office.objects.values_list('id', flat=True).first() or uuid.uuid4()
+        device_id = Device.objects.values_list('id', flat=True).first() or uuid.uuid4()
+        active = Attendance.objects.filter(user_active=True)
+
+        return [
+            ('reports.attendance (date range + status)',
+             active.filter(date__gte=month_start, date__lte=today, status='present')),
+            ('dashboard.stats (today present)',
+             active.filter(date=today, status='present')),
+            ('office day view (office + date)',
+             active.filter(office_id=office_id, date=today)),
+            ('attendance.fingerprint_changes',
+             Attendance.objects.filter(date=today, updated_at__gte=now - timedelta(minutes=5)).order_by('-updated_at')),
+            ('attendance.latest_attendance',
+             active.select_related('user', 'user__office', 'device').order_by('-created_at')[:10]),
+            ('AttendanceConsumer.get_latest_attendance',
+             Attendance.objects.select_related('user', 'user__office', 'device').order_by('-created_at')[:10]),
+            ('device sync duplicate punch check',
+             ESSLAttendanceLog.objects.filter(device_id=device_id, biometric_id='1', punch_time=now)),
+        ]
+
+    def explain(self, queryset, alias):
+        """Plan rows as dicts with table / access / key / rows / full_scan"""
+        connection = connections[alias]
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                cursor.execute(f'EXPLAIN {sql}', params)
+                columns = [column[0] for column in cursor.description]
+                plan = []
+                for row in cursor.fetchall():
+                    row = dict(zip(columns, row))
+                    plan.append({
+                        'table': row.get('table'),
+                        'access': row.get('type'),
+                        'key': row.get('key'),
+                        'rows': row.get('rows'),
+                        'extra': row.get('Extra') or '',
+                        # ALL = table scan; index = full walk of an index
+                        'full_scan': row.get('type') in ('ALL', 'index'),
+                    })
+                return plan
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                plan = []
+                for row in cursor.fetchall():
+                    detail = row[-1]
+                    plan.append({
+                        'table': detail.split()[1] if len(detail.split()) > 1 else '',
+                        'access': detail.split()[0],
+                        'key': detail.split('INDEX', 1)[1].strip() if 'INDEX' in detail else None,
+                        'rows': None,
+                        'extra': detail,
+                        'full_scan': detail.startswith('SCAN') and 'COVERING INDEX' not in detail,
+                    })
+                return plan
+        raise CommandError(f"EXPLAIN parsing is not implemented for {connection.vendor}")
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        min_rows = options['min_rows']
+        problems = []
+
+        for name, queryset in self.hot_queries():
+            try:
+                plan = self.explain(queryset.using(alias), alias)
+            except CommandError:
+                raise
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f"? {name}: EXPLAIN failed: {e}"))
+                continue
+
+            scans = [
+                row for row in plan
+                if row['full_scan'] and (row['rows'] is None or row['rows'] >= min_rows)
+            ]
+            if scans:
+                problems.append(name)
+                self.stdout.write(self.style.ERROR(f"✗ {name}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"✓ {name}"))
+
+            for row in plan if options['verbose_plan'] else scans:
+                rows = f", ~{row['rows']} rows" if row['rows'] is not None else ''
+                self.stdout.write(
+                    f"    {row['table']}: {row['access']} key={row['key'] or '-'}{rows} {row['extra']}".rstrip()
+                )
+
+        if problems:
+            message = f"{len(problems)} hot quer{'y' if len(problems) == 1 else 'ies'} with full scans: {', '.join(problems)}"
+            if options['fail_on_scan']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS('No full scans in hot queries'))
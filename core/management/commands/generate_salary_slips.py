@@ -0,0 +1,84 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.salary_slip_batch import OUTPUT_CHOICES, OUTPUT_ZIP, SalarySlipBatch, batch_zip_path
+
+
+class Command(BaseCommand):
+    help = 'Generate salary slip PDFs for a month in a process pool (ZIP or per-employee documents)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            required=True,
+            help='Salary month as YYYY-MM',
+        )
+        parser.add_argument(
+            '--office',
+            help='Only generate slips for this office ID',
+        )
+        parser.add_argument(
+            '--output',
+            choices=OUTPUT_CHOICES,
+            default=OUTPUT_ZIP,
+            help='zip: one archive under PRIVATE_MEDIA_ROOT/salary_slips/; documents: a GeneratedDocument per employee',
+        )
+        parser.add_argument(
+            '--employee',
+            action='append',
+            dest='employees',
+            help='Only generate slips for this employee ID (repeatable)',
+        )
+        parser.add_argument(
+            '--job-id',
+            help='Report progress under this job ID (set by the batch_salary_slips API)',
+        )
+        parser.add_argument(
+            '--requested-by',
+            help='User ID recorded as the generator of the documents',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Worker processes (default: one per CPU core)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            salary_month = datetime.strptime(options['month'], '%Y-%m').date()
+        except ValueError:
+            raise CommandError('Invalid --month. Use YYYY-MM')
+
+        def report(progress):
+            if progress.get('total'):
+                self.stdout.write(f"  {progress.get('done', 0) + progress.get('failed', 0)}/{progress['total']} slips")
+
+        requested_by = None
+        if options['requested_by']:
+            from core.models import CustomUser
+            requested_by = CustomUser.objects.filter(id=options['requested_by']).first()
+
+        batch = SalarySlipBatch(
+            salary_month,
+            office_id=options['office'],
+            employee_ids=options['employees'],
+            output=options['output'],
+            requested_by=requested_by,
+            job_id=options['job_id'],
+            workers=options['workers'],
+            progress_callback=report,
+        )
+        result = batch.execute()
+        if result.get('status') != 'completed':
+            raise CommandError(f"Salary slip batch failed: {result.get('error')}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {result['done']} salary slips ({result['failed']} failed) in {result['duration_seconds']}s"
+            )
+        )
+        if result.get('file_name'):
+            self.stdout.write(f"ZIP: {batch_zip_path(result)}")
+        for error in result.get('errors', []):
+            self.stdout.write(self.style.WARNING(f"  {error['employee_id']}: {error['error']}"))
@@ -0,0 +1,100 @@
+"""
+Print the deployment's metrics (request histograms, fetch daemon and push counters)
+as published by each process to the cache.
+"""
+
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import metrics
+
+
+class Command(BaseCommand):
+    help = 'Show a snapshot of the request / attendance ingest metrics'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=['table', 'json', 'prometheus'],
+            default='table',
+            help='Output format (default: table)',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            metavar='SECONDS',
+            help='Take a second snapshot after SECONDS and report counters as per-second rates '
+                 '(e.g. punches/sec); processes publish every METRICS_PUBLISH_INTERVAL seconds',
+        )
+        parser.add_argument(
+            '--prefix',
+            default='',
+            help='Only metrics whose name starts with this (e.g. attendance_, http_)',
+        )
+
+    def handle(self, *args, **options):
+        snapshot = self._filtered(metrics.collect(), options['prefix'])
+
+        if options['format'] == 'prometheus':
+            self.stdout.write(metrics.render_prometheus(snapshot), ending='')
+            return
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(metrics.snapshot_as_json(snapshot), indent=2, default=str))
+            return
+
+        rates = None
+        if options['rate']:
+            time.sleep(options['rate'])
+            later = self._filtered(metrics.collect(), options['prefix'])
+            rates = self._rates(snapshot, later, options['rate'])
+            snapshot = later
+
+        if not snapshot:
+            self.stdout.write(self.style.WARNING(
+                'No metrics recorded yet (with the locmem cache only this process is visible)'
+            ))
+            return
+        self._print_table(snapshot, rates)
+
+    def _filtered(self, snapshot, prefix):
+        return {name: samples for name, samples in snapshot.items() if name.startswith(prefix)}
+
+    def _rates(self, before, after, seconds):
+        """{(name, label key): per-second increase} for counters present in both snapshots"""
+        rates = {}
+        for name, samples in after.items():
+            if metrics.METRICS[name][0] != 'counter':
+                continue
+            for key, value in samples.items():
+                previous = before.get(name, {}).get(key)
+                if previous is not None and value >= previous:
+                    rates[(name, key)] = (value - previous) / seconds
+        return rates
+
+    def _print_table(self, snapshot, rates):
+        for name, data in metrics.snapshot_as_json(snapshot).items():
+            self.stdout.write(self.style.SUCCESS(f"{name} ({data['type']})"))
+            raw = snapshot[name]
+            for key, sample in zip(sorted(raw), data['samples']):
+                labels = ' '.join(f'{label}={value}' for label, value in sample['labels'].items()) or '-'
+                if data['type'] == 'histogram':
+                    self.stdout.write(
+                        f"    {labels}: count={sample['count']} avg={self._number(sample['avg'])} "
+                        f"p50={self._number(sample['p50'])} p95={self._number(sample['p95'])} "
+                        f"p99={self._number(sample['p99'])}"
+                    )
+                    continue
+                line = f"    {labels}: {self._number(sample['value'])}"
+                if rates is not None and (name, key) in rates:
+                    line += f"  ({rates[(name, key)]:.2f}/s)"
+                self.stdout.write(line)
+
+    @staticmethod
+    def _number(value):
+        if value is None:
+            return '-'
+        if isinstance(value, float):
+            return f'{value:.4g}'
+        return str(value)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.payroll import recompute_stale_salaries
+
+
+class Command(BaseCommand):
+    help = 'Recompute salaries flagged as stale by attendance changes (paid salaries are skipped)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Maximum number of salaries to recompute in this run',
+        )
+
+    def handle(self, *args, **options):
+        result = recompute_stale_salaries(limit=options['limit'])
+        months = ', '.join(result['months']) or 'none'
+        self.stdout.write(
+            self.style.SUCCESS(f"Recomputed {result['recomputed']} stale salaries (months: {months})")
+        )
@@ -6,16 +6,12 @@ This can be used for development or manual service management
 
 import os
 import sys
-import django
 import logging
 import signal
 import time
 from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 
-# Setup Django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'attendance_system.settings')
-django.setup()
 
 from core.management.commands.auto_fetch_attendance import AutoAttendanceService
 
@@ -4,16 +4,11 @@ Management command to update existing attendance records with new status fields
 Run this command after adding the new fields to update existing data
 """
 
-import os
 import sys
-import django
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from django.db import transaction
 
-# Setup Django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'attendance_system.settings')
-django.setup()
 
 from core.models import Attendance, WorkingHoursSettings
 
@@ -4,18 +4,14 @@ View and manage existing attendance data
 This command works with data already in the database without connecting to devices
 """
 
-import os
 import sys
-import django
 from datetime import datetime, timedelta
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from django.db.models import Q
 
-# Setup Django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'attendance_system.settings')
-django.setup()
 
+from core.db_routers import reporting_reads
 from core.models import CustomUser, Attendance, Device
 
 class Command(BaseCommand):
@@ -50,6 +46,11 @@ class Command(BaseCommand):
         )
         
     def handle(self, *args, **options):
+        # Read-only: use the reporting database when one is configured
+        with reporting_reads():
+            self._handle(options)
+
+    def _handle(self, options):
         if options['today']:
             self.show_todays_attendance()
         elif options['date']:
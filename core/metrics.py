@@ -0,0 +1,310 @@
+"""
+Metrics
+Per-route request histograms and attendance ingest counters.
+
+Every process (web workers, the fetch daemon) records into its own registry and
+publishes a snapshot to the cache every METRICS_PUBLISH_INTERVAL seconds. Readers
+(the Prometheus endpoint, the metrics_snapshot command) merge the published
+snapshots with their own live registry, so with a shared cache backend they see
+the whole deployment; with the default locmem cache only the current process.
+"""
+
+import logging
+import math
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+PROCESS_INDEX_KEY = 'metrics:processes'
+PROCESS_SNAPSHOT_KEY = 'metrics:process:{process_id}'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+RTT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LAG_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 900, 3600, 21600, 86400)
+
+# name: (type, help, label names, buckets)
+METRICS = {
+    'http_request_duration_seconds': (
+        'histogram', 'Request latency by route', ('route', 'method'), LATENCY_BUCKETS),
+    'http_request_db_seconds': (
+        'histogram', 'Database time spent per request by route', ('route',), LATENCY_BUCKETS),
+    'http_request_queries': (
+        'histogram', 'SQL queries executed per request by route', ('route',), QUERY_BUCKETS),
+    'http_response_bytes': (
+        'histogram', 'Response body size on the wire by route', ('route',), BYTES_BUCKETS),
+    'http_requests_total': (
+        'counter', 'Requests by route, method and status class', ('route', 'method', 'status'), None),
+    'attendance_punches_total': (
+        'counter', 'Punches written to attendance', ('device', 'source'), None),
+    'attendance_device_rtt_seconds': (
+        'histogram', 'Round trip to a biometric device', ('device', 'operation'), RTT_BUCKETS),
+    'attendance_ingest_lag_seconds': (
+        'histogram', 'Delay from punch_time to the committed attendance write', ('source',), LAG_BUCKETS),
+    'attendance_fetch_cycles_total': (
+        'counter', 'Completed fetch daemon cycles (AutoAttendanceService.stats)', (), None),
+    'attendance_fetch_records_total': (
+        'counter', 'New records saved by the fetch daemon (AutoAttendanceService.stats)', (), None),
+    'attendance_fetch_duplicates_total': (
+        'counter', 'Device records skipped as already seen (AutoAttendanceService.stats)', (), None),
+    'attendance_fetch_errors_total': (
+        'counter', 'Fetch daemon errors (AutoAttendanceService.stats)', (), None),
+    'attendance_fetch_last_success_timestamp_seconds': (
+        'gauge', 'Unix time of the last successful fetch cycle', (), None),
+    'attendance_push_batches_total': (
+        'counter', 'Push batches processed per device (ZKTecoPushService.push_endpoints)', ('device',), None),
+    'attendance_push_last_timestamp_seconds': (
+        'gauge', 'Unix time of the last push batch per device', ('device',), None),
+}
+
+
+class Histogram:
+    """Fixed-bucket histogram; `counts` are per bucket (not cumulative), the last one is +Inf"""
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            index = len(self.buckets)
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def as_dict(self):
+        return {'counts': list(self.counts), 'count': self.count, 'sum': self.sum}
+
+
+class Registry:
+    """One process's metric values, keyed by metric name and sorted label tuples"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {name: {} for name in METRICS}
+        self._collectors = []
+        self._last_publish = 0.0
+        self.process_id = f'{socket.gethostname()}:{os.getpid()}'
+
+    def _key(self, name, labels):
+        label_names = METRICS[name][2]
+        return tuple((label, str(labels.get(label, ''))) for label in label_names)
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._values[name].get(key)
+            if histogram is None:
+                histogram = self._values[name][key] = Histogram(METRICS[name][3])
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._values[name][key] = self._values[name].get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._values[name][key] = value
+
+    def register_collector(self, collector):
+        """`collector(registry)` runs before every snapshot and sets values from live service state"""
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def snapshot(self):
+        """{name: {label tuple: number or histogram dict}} including collector values"""
+        for collector in self._collectors:
+            try:
+                collector(self)
+            except Exception as e:
+                logger.warning(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+        with self._lock:
+            return {
+                name: {
+                    key: value.as_dict() if isinstance(value, Histogram) else value
+                    for key, value in samples.items()
+                }
+                for name, samples in self._values.items()
+                if samples
+            }
+
+    def maybe_publish(self):
+        """Publish the snapshot to the cache when the last publish is older than the interval"""
+        interval = getattr(settings, 'METRICS_PUBLISH_INTERVAL', 10)
+        now = time.monotonic()
+        if now - self._last_publish < interval:
+            return
+        self._last_publish = now
+        self.publish()
+
+    def publish(self):
+        ttl = getattr(settings, 'METRICS_PROCESS_TTL', 300)
+        try:
+            cache.set(PROCESS_SNAPSHOT_KEY.format(process_id=self.process_id), self.snapshot(), ttl)
+            # Read-modify-write: a lost update is repaired by that process's next publish
+            now = time.time()
+            index = {
+                process_id: seen for process_id, seen in (cache.get(PROCESS_INDEX_KEY) or {}).items()
+                if now - seen < ttl
+            }
+            index[self.process_id] = now
+            cache.set(PROCESS_INDEX_KEY, index, None)
+        except Exception as e:
+            logger.warning(f"Could not publish metrics snapshot: {e}")
+
+
+registry = Registry()
+
+
+def observe(name, value, **labels):
+    registry.observe(name, value, **labels)
+
+
+def inc(name, amount=1, **labels):
+    registry.inc(name, amount, **labels)
+
+
+def set_gauge(name, value, **labels):
+    registry.set(name, value, **labels)
+
+
+def register_collector(collector):
+    registry.register_collector(collector)
+
+
+def merge_snapshots(snapshots):
+    """Sum counters and histograms across processes; gauges keep the highest value"""
+    merged = {}
+    for snapshot in snapshots:
+        for name, samples in snapshot.items():
+            if name not in METRICS:
+                continue
+            kind = METRICS[name][0]
+            target = merged.setdefault(name, {})
+            for key, value in samples.items():
+                current = target.get(key)
+                if current is None:
+                    target[key] = {**value, 'counts': list(value['counts'])} if kind == 'histogram' else value
+                elif kind == 'histogram':
+                    if len(current['counts']) == len(value['counts']):
+                        current['counts'] = [a + b for a, b in zip(current['counts'], value['counts'])]
+                        current['count'] += value['count']
+                        current['sum'] += value['sum']
+                elif kind == 'gauge':
+                    target[key] = max(current, value)
+                else:
+                    target[key] = current + value
+    return merged
+
+
+def collect():
+    """Deployment-wide snapshot: this process live, every other process as last published"""
+    snapshots = [registry.snapshot()]
+    try:
+        index = cache.get(PROCESS_INDEX_KEY) or {}
+        keys = [
+            PROCESS_SNAPSHOT_KEY.format(process_id=process_id)
+            for process_id in index if process_id != registry.process_id
+        ]
+        snapshots.extend(cache.get_many(keys).values() if keys else [])
+    except Exception as e:
+        logger.warning(f"Could not read published metrics snapshots: {e}")
+    return merge_snapshots(snapshots)
+
+
+def histogram_quantile(quantile, histogram, buckets):
+    """Estimate a quantile by linear interpolation inside the bucket, as Prometheus does"""
+    if not histogram['count']:
+        return None
+    rank = quantile * histogram['count']
+    seen = 0
+    lower = 0.0
+    for bound, count in zip(tuple(buckets) + (math.inf,), histogram['counts']):
+        if seen + count >= rank:
+            if bound == math.inf:
+                return lower
+            return lower + (bound - lower) * ((rank - seen) / count if count else 0)
+        seen += count
+        lower = bound
+    return lower
+
+
+def _format_labels(key, extra=()):
+    pairs = tuple(key) + tuple(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        f'{label}="' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for label, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_number(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(snapshot):
+    """Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for name, (kind, help_text, _, buckets) in METRICS.items():
+        samples = snapshot.get(name)
+        if not samples:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for key, value in sorted(samples.items()):
+            if kind != 'histogram':
+                lines.append(f'{name}{_format_labels(key)} {_format_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(tuple(buckets) + (math.inf,), value['counts']):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(key, [("le", _format_number(bound))])} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(key)} {_format_number(value["sum"])}')
+            lines.append(f'{name}_count{_format_labels(key)} {value["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def snapshot_as_json(snapshot):
+    """Snapshot with label tuples turned into dicts and histogram percentiles added"""
+    result = {}
+    for name, samples in snapshot.items():
+        kind, _, _, buckets = METRICS[name]
+        rows = []
+        for key, value in sorted(samples.items()):
+            row = {'labels': dict(key)}
+            if kind == 'histogram':
+                row.update({
+                    'count': value['count'],
+                    'sum': round(value['sum'], 6),
+                    'avg': round(value['sum'] / value['count'], 6) if value['count'] else None,
+                    'p50': histogram_quantile(0.5, value, buckets),
+                    'p95': histogram_quantile(0.95, value, buckets),
+                    'p99': histogram_quantile(0.99, value, buckets),
+                })
+            else:
+                row['value'] = value
+            rows.append(row)
+        result[name] = {'type': kind, 'samples': rows}
+    return result
@@ -6,9 +6,10 @@ Custom Middleware for the Attendance System
 import logging
 import time
 from django.db import close_old_connections
-from core.db_manager import db_manager
 from django.http import HttpResponsePermanentRedirect
 from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
 
 logger = logging.getLogger(__name__)
 
@@ -19,17 +20,13 @@ class DatabaseConnectionMiddleware:
         self.get_response = get_response
         
     def __call__(self, request):
-        # Close old connections before processing request
-        close_old_connections()
-        
+        # Django already releases connections on request_started/request_finished
+        # (honouring CONN_MAX_AGE / the pool); closing here as well only costs reconnects
         start_time = time.time()
         
         # Process the request
         response = self.get_response(request)
         
-        # Close connections after processing request
-        close_old_connections()
-        
         # Log slow requests
         duration = time.time() - start_time
         if duration > 5:  # Log requests taking more than 5 seconds
@@ -58,6 +55,24 @@ class DatabaseConnectionMiddleware:
         close_old_connections()
         return None
 
+class ReadYourWritesMiddleware:
+    """Pins a user's report reads to the primary for a short while after a request of theirs wrote"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from core.db_routers import pin_user_to_primary, track_request_writes
+
+        with track_request_writes() as state:
+            response = self.get_response(request)
+
+        # DRF copies the authenticated (JWT) user back onto the Django request
+        user = getattr(request, 'user', None)
+        if state.wrote and user is not None and user.is_authenticated:
+            pin_user_to_primary(user, response)
+        return response
+
 class DisableTrailingSlashMiddleware:
     """Middleware to handle trailing slashes in URLs"""
     
@@ -130,4 +145,183 @@ class AdminCSPMiddleware:
             )
             response['Content-Security-Policy'] = csp_policy
         
-        return response
\ No newline at end of file
+        return response
+
+class QueryInstrumentationMiddleware:
+    """Opt-in per-request query count, duplicate SQL, DB time and render time reporting
+
+    Enabled with QUERY_INSTRUMENTATION_ENABLED. Results are exposed as a
+    Server-Timing header and a single structured log line per request.
+    """
+
+    def __init__(self, get_response):
+        from django.core.exceptions import MiddlewareNotUsed
+
+        if not getattr(settings, 'QUERY_INSTRUMENTATION_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.warn_threshold = getattr(settings, 'QUERY_INSTRUMENTATION_WARN_THRESHOLD', 50)
+
+    def __call__(self, request):
+        from core.query_instrumentation import request_queries
+
+        request._render_duration = 0.0
+        start_time = time.perf_counter()
+
+        with request_queries(request) as recorder:
+            response = self.get_response(request)
+
+        total = time.perf_counter() - start_time
+        render = request._render_duration
+        duplicates = recorder.duplicates
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"',
+            f'dup;desc="{recorder.duplicate_count} duplicate queries"',
+            f'render;dur={render * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+        log = logger.warning if recorder.count > self.warn_threshold else logger.info
+        top_duplicate = f'{duplicates[0][1]}x {duplicates[0][0][:200]}' if duplicates else ''
+        log(
+            f"query_stats method={request.method} path={request.path} status={response.status_code} "
+            f"queries={recorder.count} duplicates={recorder.duplicate_count} "
+            f"db_ms={recorder.duration * 1000:.1f} render_ms={render * 1000:.1f} "
+            f"total_ms={total * 1000:.1f} top_duplicate=\"{top_duplicate}\""
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        """Time DRF response rendering (serializer output to JSON)"""
+        render_start = time.perf_counter()
+
+        def _record_render(rendered):
+            request._render_duration = time.perf_counter() - render_start
+
+        response.add_post_render_callback(_record_render)
+        return response
+
+class CompressionMiddleware(GZipMiddleware):
+    """Brotli for JSON API responses, Django's GZipMiddleware for the rest
+
+    Gzip goes through GZipMiddleware, whose random length padding mitigates
+    BREACH on pages mixing secrets (CSRF tokens) with reflected input. Brotli has
+    no such padding, so it is used only for application/json, and only when the
+    client accepts it and the `brotli` package is installed. Authentication
+    responses (JWTs next to the submitted username) are never compressed, nor
+    are bodies below RESPONSE_COMPRESSION_MIN_BYTES, streaming or partial
+    responses and responses that already carry a Content-Encoding. Strong ETags
+    are weakened on compressed responses.
+    """
+
+    COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'application/xml', 'image/svg+xml')
+    BROTLI_TYPES = ('application/json',)
+
+    def __init__(self, get_response):
+        from django.core.exceptions import MiddlewareNotUsed
+
+        if not getattr(settings, 'RESPONSE_COMPRESSION_ENABLED', True):
+            raise MiddlewareNotUsed()
+        super().__init__(get_response)
+        self.min_bytes = getattr(settings, 'RESPONSE_COMPRESSION_MIN_BYTES', 1024)
+        self.brotli_quality = getattr(settings, 'RESPONSE_COMPRESSION_BROTLI_QUALITY', 5)
+        self.excluded_paths = tuple(getattr(settings, 'RESPONSE_COMPRESSION_EXCLUDED_PATHS', ()))
+        try:
+            import brotli
+            self.brotli = brotli
+        except ImportError:
+            self.brotli = None
+
+    def accepts_brotli(self, accept_encoding):
+        """True when Accept-Encoding allows br (q=0 excludes a coding)"""
+        if self.brotli is None:
+            return False
+        weights = {}
+        for item in accept_encoding.split(','):
+            coding, _, params = item.strip().partition(';')
+            weight = 1.0
+            params = params.strip()
+            if params.startswith('q='):
+                try:
+                    weight = float(params[2:])
+                except ValueError:
+                    weight = 0.0
+            if coding:
+                weights[coding.strip().lower()] = weight
+        return weights.get('br', weights.get('*', 0.0)) > 0
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding') or response.status_code in (204, 206, 304):
+            return response
+        if request.path.startswith(self.excluded_paths):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if not content_type.startswith(self.COMPRESSIBLE_TYPES):
+            return response
+        if len(response.content) < self.min_bytes:
+            return response
+
+        if content_type not in self.BROTLI_TYPES or not self.accepts_brotli(request.headers.get('Accept-Encoding', '')):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        body = self.brotli.compress(response.content, quality=self.brotli_quality)
+        if len(body) >= len(response.content):
+            return response
+        response.content = body
+        response['Content-Length'] = str(len(body))
+        response['Content-Encoding'] = 'br'
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+class MetricsMiddleware:
+    """Per-route latency, DB time, query count and response size histograms (core.metrics)
+
+    Enabled with METRICS_ENABLED. Sits outermost so latency covers the whole
+    middleware stack and response sizes are the compressed bytes sent.
+    """
+
+    def __init__(self, get_response):
+        from django.core.exceptions import MiddlewareNotUsed
+
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from core import metrics
+        from core.query_instrumentation import request_queries
+
+        start_time = time.perf_counter()
+        with request_queries(request) as counter:
+            response = self.get_response(request)
+        duration = time.perf_counter() - start_time
+
+        route = self.route_name(request)
+        metrics.observe('http_request_duration_seconds', duration, route=route, method=request.method)
+        metrics.observe('http_request_db_seconds', counter.duration, route=route)
+        metrics.observe('http_request_queries', counter.count, route=route)
+        size = self.response_size(response)
+        if size is not None:
+            metrics.observe('http_response_bytes', size, route=route)
+        metrics.inc('http_requests_total', route=route, method=request.method, status=f'{response.status_code // 100}xx')
+        metrics.registry.maybe_publish()
+        return response
+
+    @staticmethod
+    def route_name(request):
+        """URL name (or view path) of the matched route: bounded label values, unlike request.path"""
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unmatched'
+        return match.view_name or match.route or 'unnamed'
+
+    @staticmethod
+    def response_size(response):
+        if response.streaming:
+            length = response.get('Content-Length')
+            return int(length) if length and length.isdigit() else None
+        return len(response.content)
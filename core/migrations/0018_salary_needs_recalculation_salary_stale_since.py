@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_remove_customuser_upi_qr_reason_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salary',
+            name='needs_recalculation',
+            field=models.BooleanField(db_index=True, default=False, help_text='Attendance changed since worked days were calculated'),
+        ),
+        migrations.AddField(
+            model_name='salary',
+            name='stale_since',
+            field=models.DateTimeField(blank=True, help_text='When the salary first became stale', null=True),
+        ),
+    ]
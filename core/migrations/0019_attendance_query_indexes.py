@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_salary_needs_recalculation_salary_stale_since'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['office', 'is_active'], name='core_custom_office__2542d3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'status', 'user'], name='core_attend_date_1c34db_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', '-updated_at'], name='core_attend_date_ed6a6b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['-created_at'], name='core_attend_created_b52513_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='esslattendancelog',
+            index=models.Index(fields=['device', 'biometric_id', 'punch_time'], name='core_esslat_device__fe4e44_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BATCH_SIZE = 2000
+
+
+def copy_user_scope(apps, schema_editor):
+    """Fill office/user_active from each user, a bounded batch of rows per UPDATE"""
+    Attendance = apps.get_model('core', 'Attendance')
+    CustomUser = apps.get_model('core', 'CustomUser')
+    db = schema_editor.connection.alias
+
+    for user in CustomUser.objects.using(db).values('id', 'office_id', 'is_active').iterator():
+        stale = Attendance.objects.using(db).filter(user_id=user['id']).exclude(
+            office_id=user['office_id'], user_active=user['is_active']
+        )
+        while True:
+            ids = list(stale.values_list('pk', flat=True)[:BATCH_SIZE])
+            if not ids:
+                break
+            Attendance.objects.using(db).filter(pk__in=ids).update(
+                office_id=user['office_id'], user_active=user['is_active']
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_attendance_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='office',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.office'),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='user_active',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['office', 'date'], name='core_attend_office__9624c2_idx'),
+        ),
+        migrations.RunPython(copy_user_scope, migrations.RunPython.noop, elidable=True),
+    ]
@@ -158,6 +158,10 @@ class CustomUser(AbstractUser):
         verbose_name = "User"
         verbose_name_plural = "Users"
         ordering = ['username']
+        indexes = [
+            # Office-scoped lists of active staff, then (user, date) into attendance
+            models.Index(fields=['office', 'is_active']),
+        ]
 
     history = HistoricalRecords()
 
@@ -329,6 +333,39 @@ class BankAccountHistory(models.Model):
         
         return changed
 
+class DeviceQuerySet(models.QuerySet):
+    """QuerySet helpers for Device"""
+
+    def with_stats(self):
+        """
+        Annotate user counts, last punch time and today's punch count.
+        Punch figures use correlated subqueries so they don't multiply the device_users join.
+        """
+        from datetime import datetime, time as dt_time
+        from django.db.models.functions import Coalesce
+
+        today = timezone.localdate()
+        day_start = timezone.make_aware(datetime.combine(today, dt_time.min))
+        punches = ESSLAttendanceLog.objects.filter(device=models.OuterRef('pk')).order_by()
+
+        return self.annotate(
+            total_users_count=models.Count('device_users', distinct=True),
+            mapped_users_count=models.Count(
+                'device_users', filter=models.Q(device_users__is_mapped=True), distinct=True
+            ),
+            last_punch_time=models.Subquery(
+                punches.values('device').annotate(last=models.Max('punch_time')).values('last')[:1]
+            ),
+            punches_today=Coalesce(
+                models.Subquery(
+                    punches.filter(punch_time__gte=day_start)
+                    .values('device').annotate(total=models.Count('id')).values('total')[:1]
+                ),
+                0
+            ),
+        )
+
+
 class Device(models.Model):
     """Biometric device model for attendance tracking"""
     DEVICE_TYPE_CHOICES = [
@@ -362,6 +399,8 @@ class Device(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = DeviceQuerySet.as_manager()
+
     class Meta:
         ordering = ['name']
 
@@ -440,6 +479,10 @@ class Attendance(models.Model):
     late_minutes = models.IntegerField(default=0, help_text="Minutes late from start time")
     device = models.ForeignKey(Device, on_delete=models.SET_NULL, null=True, blank=True)
     notes = models.TextField(blank=True)
+    # Copies of user.office / user.is_active so office and active filters need no join to CustomUser.
+    # Set on save; kept in step on user changes by core.attendance_scope
+    office = models.ForeignKey(Office, on_delete=models.SET_NULL, null=True, blank=True, editable=False)
+    user_active = models.BooleanField(default=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -459,6 +502,17 @@ class Attendance(models.Model):
     class Meta:
         unique_together = ['user', 'date']
         ordering = ['-date', '-check_in_time']
+        # Designed from the hot queries; `python manage.py explain_hot_queries` checks they are used
+        indexes = [
+            # Day/range reports and dashboards: date + status, user_id read from the index for the join
+            models.Index(fields=['date', 'status', 'user']),
+            # fingerprint_changes: today's rows updated in the last few minutes
+            models.Index(fields=['date', '-updated_at']),
+            # latest_attendance / AttendanceConsumer feed
+            models.Index(fields=['-created_at']),
+            # Manager office-day views and office dashboards
+            models.Index(fields=['office', 'date']),
+        ]
 
     def __str__(self):
         try:
@@ -599,8 +653,20 @@ class Attendance(models.Model):
         # Automatically calculate attendance status
         self.calculate_attendance_status()
         
+        if self.copy_user_scope() and kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'office', 'user_active'}
         super().save(*args, **kwargs)
 
+    def copy_user_scope(self):
+        """Copy the user's office/active flag onto the row; returns True if they changed"""
+        if not self.user_id:
+            return False
+        office_id, user_active = self.user.office_id, self.user.is_active
+        if (self.office_id, self.user_active) == (office_id, user_active):
+            return False
+        self.office_id, self.user_active = office_id, user_active
+        return True
+
     def manual_update_status(self, new_status, new_day_status=None, notes=None):
         """Manually update attendance status without triggering automatic calculations"""
         # Use Django's update() method to bypass the model's save method
@@ -628,6 +694,12 @@ class Attendance(models.Model):
         # Use update() to bypass the model's save method
         Attendance.objects.filter(id=self.id).update(**update_data)
         
+        # update() skips signals, so flag the month's salary for recalculation here
+        from core.payroll import mark_salaries_stale
+        mark_salaries_stale([self.user_id], [self.date])
+        from core.conditional import bump_model_version
+        bump_model_version(Attendance)
+        
         return self
 
 
@@ -862,6 +934,8 @@ class ESSLAttendanceLog(models.Model):
         indexes = [
             models.Index(fields=['biometric_id', 'punch_time']),
             models.Index(fields=['device', 'punch_time']),
+            # Duplicate-punch check during device sync
+            models.Index(fields=['device', 'biometric_id', 'punch_time']),
         ]
 
     def __str__(self):
@@ -1085,6 +1159,8 @@ class Salary(models.Model):
     # Auto-calculation flags
     is_auto_calculated = models.BooleanField(default=False, help_text="Whether salary was auto-calculated from attendance")
     attendance_based = models.BooleanField(default=True, help_text="Whether salary is based on attendance")
+    needs_recalculation = models.BooleanField(default=False, db_index=True, help_text="Attendance changed since worked days were calculated")
+    stale_since = models.DateTimeField(null=True, blank=True, help_text="When the salary first became stale")
     
     # System fields
     created_by = models.ForeignKey(
@@ -1187,63 +1263,27 @@ class Salary(models.Model):
     def calculate_worked_days_from_attendance(self):
         """Calculate worked days from attendance records matching frontend logic"""
         try:
-            from django.utils import timezone
-            from datetime import datetime, timedelta
-            from coreapp.models import Holiday  # Local import to avoid circular dependencies
+            from core.month_calendar import get_month_calendar
             
-            # Get the month and year from salary_month
-            year = self.salary_month.year
-            month = self.salary_month.month
-            
-            # Calculate start and end dates for the month
-            start_date = datetime(year, month, 1).date()
-            if month == 12:
-                # For December, next month is Jan of next year
-                end_date = datetime(year + 1, 1, 1).date() - timedelta(days=1)
-            else:
-                end_date = datetime(year, month + 1, 1).date() - timedelta(days=1)
+            # Sundays, paid non-Sunday holidays and the padding to 30 days only depend
+            # on the month, so they come from the shared cached calendar
+            month_calendar = get_month_calendar(self.salary_month.year, self.salary_month.month)
             
-            # 1. Calculate Present Days
             # Count distinct dates where status is 'present'
             present_days_count = Attendance.objects.filter(
                 user=self.employee,
-                date__range=[start_date, end_date],
+                date__range=[month_calendar.first_day, month_calendar.last_day],
                 status='present'
             ).count()
             
-            # 2. Calculate Sundays
-            total_sundays = 0
-            current = start_date
-            while current <= end_date:
-                if current.weekday() == 6:  # 6 is Sunday
-                    total_sundays += 1
-                current += timedelta(days=1)
-                
-            # 3. Calculate Effective Holidays (excluding Sundays)
-            # Fetch holidays in the range
-            holidays_qs = Holiday.objects.filter(
-                date__range=[start_date, end_date]
-            )
-            
-            effective_holidays = 0
-            for holiday in holidays_qs:
-                # Check if holiday is NOT on a Sunday
-                if holiday.date.weekday() != 6:
-                    effective_holidays += 1
-                    
-            # 4. Calculate Extra Days (to reach 30 standard days logic if applicable)
-            # Matches frontend "Extra Days" logic: 30 - actual_days if actual < 30
-            actual_days_in_month = (end_date - start_date).days + 1
-            extra_days = 0
-            if actual_days_in_month < 30:
-                extra_days = 30 - actual_days_in_month
-            
             # Total Formula: Present + Sundays + Holidays(non-Sunday) + Extra
-            total_worked_days = present_days_count + total_sundays + effective_holidays + extra_days
+            total_worked_days = present_days_count + month_calendar.salary_base_days
             
             # Update worked_days
             self.worked_days = Decimal(str(total_worked_days))
             self.is_auto_calculated = True
+            self.needs_recalculation = False
+            self.stale_since = None
             
         except Exception as e:
             # If calculation fails, keep the current worked_days or log error
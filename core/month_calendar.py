@@ -0,0 +1,230 @@
+"""
+Month Calendar Service
+Cached per-(year, month) day metadata shared by attendance and salary calculation
+"""
+
+import calendar
+import logging
+from datetime import date, timedelta
+
+from django.core.cache import cache
+
+from .cache_utils import cache_is_shared
+
+logger = logging.getLogger(__name__)
+
+MONTH_CALENDAR_CACHE_PREFIX = 'month_calendar'
+MONTH_CALENDAR_CACHE_TIMEOUT = 60 * 60 * 24  # 1 day with a shared cache; Holiday signals invalidate earlier
+# A per-process cache only sees invalidations from its own process: keep copies short-lived
+MONTH_CALENDAR_LOCAL_CACHE_TIMEOUT = 60 * 60  # 1 hour
+
+
+class CalendarDay:
+    """Static metadata for a single day of a month"""
+
+    __slots__ = ('date', 'iso', 'weekday', 'is_sunday', 'is_weekend', 'holiday_name', 'is_paid_holiday')
+
+    def __init__(self, day, holiday_name=None, is_paid_holiday=False):
+        self.date = day
+        self.iso = day.isoformat()
+        self.weekday = day.weekday()
+        self.is_sunday = self.weekday == 6
+        self.is_weekend = self.weekday >= 5
+        self.holiday_name = holiday_name
+        self.is_paid_holiday = is_paid_holiday
+
+    @property
+    def is_holiday(self):
+        return self.holiday_name is not None
+
+    def __getstate__(self):
+        return (self.date, self.holiday_name, self.is_paid_holiday)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+
+class MonthCalendar:
+    """Day metadata for a (year, month), built once and reused from the cache"""
+
+    def __init__(self, year, month, holidays=None):
+        holidays = holidays or {}
+        self.year = year
+        self.month = month
+        self.days_in_month = calendar.monthrange(year, month)[1]
+        self.first_day = date(year, month, 1)
+        self.last_day = date(year, month, self.days_in_month)
+        self.month_name = self.first_day.strftime('%B')
+        self.days = []
+        for offset in range(self.days_in_month):
+            day = self.first_day + timedelta(days=offset)
+            holiday_name, is_paid = holidays.get(day, (None, False))
+            self.days.append(CalendarDay(day, holiday_name, is_paid))
+
+    @property
+    def sunday_count(self):
+        return sum(1 for day in self.days if day.is_sunday)
+
+    @property
+    def paid_holiday_count(self):
+        """Paid holidays that don't fall on a Sunday (Sundays are already counted)"""
+        return sum(1 for day in self.days if day.is_paid_holiday and not day.is_sunday)
+
+    @property
+    def working_days(self):
+        """Monday to Friday days that are not holidays"""
+        return [day.date for day in self.days if not day.is_weekend and not day.is_holiday]
+
+    @property
+    def padding_days(self):
+        """Days added so short months count as 30 for salary"""
+        return max(0, 30 - self.days_in_month)
+
+    @property
+    def salary_base_days(self):
+        """Paid days every employee gets regardless of attendance (Sundays + holidays + padding)"""
+        return self.sunday_count + self.paid_holiday_count + self.padding_days
+
+    def __iter__(self):
+        return iter(self.days)
+
+    def __len__(self):
+        return self.days_in_month
+
+
+def _cache_key(year, month):
+    return f'{MONTH_CALENDAR_CACHE_PREFIX}:{year}:{month:02d}'
+
+
+def _load_holidays(first_day, last_day):
+    """Return {date: (name, is_paid)} for holidays in the range"""
+    from coreapp.models import Holiday  # Local import to avoid circular dependencies
+
+    rows = Holiday.objects.filter(
+        date__range=[first_day, last_day]
+    ).values_list('date', 'name', 'is_paid')
+    return {holiday_date: (name, is_paid) for holiday_date, name, is_paid in rows}
+
+
+def _cache_timeout():
+    return MONTH_CALENDAR_CACHE_TIMEOUT if cache_is_shared() else MONTH_CALENDAR_LOCAL_CACHE_TIMEOUT
+
+
+def get_month_calendar(year, month):
+    """Get the cached calendar for a month, building it on a cache miss"""
+    key = _cache_key(year, month)
+    month_calendar = cache.get(key)
+    if month_calendar is not None:
+        return month_calendar
+
+    days_in_month = calendar.monthrange(year, month)[1]
+    holidays = _load_holidays(date(year, month, 1), date(year, month, days_in_month))
+    month_calendar = MonthCalendar(year, month, holidays)
+    cache.set(key, month_calendar, _cache_timeout())
+    return month_calendar
+
+
+def invalidate_month_calendar(year, month):
+    """Drop the cached calendar for a month"""
+    cache.delete(_cache_key(year, month))
+
+
+def invalidate_month_calendar_for_date(day):
+    """Drop the cached calendar for the month containing a date"""
+    if day:
+        invalidate_month_calendar(day.year, day.month)
+
+
+def build_monthly_attendance(month_calendar, attendance_by_date, today=None):
+    """
+    Merge a user's attendance records onto the month calendar.
+    Returns (monthly_data, statistics); the statistics are collected in the same pass.
+    """
+    today = today or date.today()
+    monthly_data = []
+    present_days = absent_days = upcoming_days = weekend_days = 0
+    complete_days = half_days = late_coming_days = past_working_days = 0
+
+    for day in month_calendar.days:
+        attendance = attendance_by_date.get(day.date)
+
+        if attendance is not None and not (day.is_sunday and attendance.status not in ('present', 'half_day')):
+            entry = {
+                'id': str(attendance.id),
+                'date': day.iso,
+                'check_in_time': attendance.check_in_time.isoformat() if attendance.check_in_time else None,
+                'check_out_time': attendance.check_out_time.isoformat() if attendance.check_out_time else None,
+                'total_hours': float(attendance.total_hours) if attendance.total_hours else None,
+                'status': attendance.status,
+                'day_status': attendance.day_status,
+                'is_late': attendance.is_late,
+                'late_minutes': attendance.late_minutes,
+                'device_name': attendance.device.name if attendance.device else None,
+                'notes': attendance.notes,
+                'created_at': attendance.created_at.isoformat() if attendance.created_at else None,
+                'updated_at': attendance.updated_at.isoformat() if attendance.updated_at else None,
+            }
+        else:
+            # Sundays without presence are weekends; otherwise the day is upcoming or absent
+            if attendance is not None:
+                day_state, notes = 'weekend', 'Sunday - Weekend'
+            elif day.date > today:
+                day_state, notes = 'upcoming', 'Upcoming day'
+            elif day.is_sunday:
+                day_state, notes = 'weekend', 'Sunday - Weekend'
+            else:
+                day_state, notes = 'absent', 'No attendance recorded'
+            entry = {
+                'id': str(attendance.id) if attendance is not None else None,
+                'date': day.iso,
+                'check_in_time': None,
+                'check_out_time': None,
+                'total_hours': None,
+                'status': day_state,
+                'day_status': day_state,
+                'is_late': False,
+                'late_minutes': 0,
+                'device_name': None,
+                'notes': notes,
+                'created_at': attendance.created_at.isoformat() if attendance is not None and attendance.created_at else None,
+                'updated_at': attendance.updated_at.isoformat() if attendance is not None and attendance.updated_at else None,
+            }
+        entry['is_holiday'] = day.is_holiday
+        entry['holiday_name'] = day.holiday_name
+        monthly_data.append(entry)
+
+        day_state = entry['status']
+        if day_state in ('present', 'half_day'):
+            present_days += 1
+        elif day_state == 'absent':
+            absent_days += 1
+        elif day_state == 'upcoming':
+            upcoming_days += 1
+        elif day_state == 'weekend':
+            weekend_days += 1
+
+        if entry['day_status'] == 'complete_day':
+            complete_days += 1
+        elif entry['day_status'] == 'half_day':
+            half_days += 1
+        if entry['is_late'] is True:
+            late_coming_days += 1
+
+        # Attendance rate is based on past working days only (Saturday and Sunday excluded)
+        if day.date <= today and day_state != 'upcoming' and not day.is_weekend:
+            past_working_days += 1
+
+    attendance_rate = (present_days / past_working_days) * 100 if past_working_days > 0 else 0
+
+    statistics = {
+        'total_days_in_month': month_calendar.days_in_month,
+        'present_days': present_days,
+        'absent_days': absent_days,
+        'upcoming_days': upcoming_days,
+        'weekend_days': weekend_days,
+        'complete_days': complete_days,
+        'half_days': half_days,
+        'late_coming_days': late_coming_days,
+        'attendance_rate': round(attendance_rate, 1),
+    }
+    return monthly_data, statistics
@@ -0,0 +1,79 @@
+"""
+Pagination classes for list endpoints that grow without bound
+"""
+
+import base64
+import uuid
+from datetime import date
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class AttendanceKeysetPagination(BasePagination):
+    """
+    Keyset pagination on (date, id), newest first.
+    The cursor is the (date, id) of the last row served, so each page is an
+    index range scan instead of an OFFSET that grows with the page number.
+    """
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def encode_cursor(self, row_date, row_id):
+        raw = f'{row_date.isoformat()}|{row_id}'.encode('ascii')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    def decode_cursor(self, encoded):
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            date_part, id_part = raw.split('|', 1)
+            return date.fromisoformat(date_part), uuid.UUID(id_part)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+
+        queryset = queryset.order_by('-date', '-id')
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            cursor_date, cursor_id = self.decode_cursor(encoded)
+            queryset = queryset.filter(
+                Q(date__lt=cursor_date) | Q(date=cursor_date, id__lt=cursor_id)
+            )
+
+        # Fetch one extra row to know whether another page exists
+        rows = list(queryset[:self.page_size_value + 1])
+        self.has_next = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+        self.next_cursor = self.encode_cursor(rows[-1].date, rows[-1].id) if self.has_next else None
+        return rows
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data, **extra):
+        payload = {
+            'next': self.get_next_link(),
+            'next_cursor': self.next_cursor,
+            'page_size': self.page_size_value,
+            'results': data,
+        }
+        payload.update(extra)
+        return Response(payload)
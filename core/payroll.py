@@ -0,0 +1,300 @@
+"""
+Payroll Run Engine
+Calculates a month's salaries for many employees with a fixed number of queries
+"""
+
+import logging
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Attendance, Salary
+from .month_calendar import get_month_calendar
+from .salary_rollup import invalidate_salary_rollup
+
+logger = logging.getLogger(__name__)
+
+SALARY_UPDATE_FIELDS = [
+    'basic_pay', 'worked_days', 'gross_salary', 'net_salary', 'remaining_pay',
+    'Bank_name', 'is_auto_calculated', 'needs_recalculation', 'stale_since', 'updated_at'
+]
+
+
+def get_present_day_counts(employee_ids, month_calendar):
+    """Present-day count per employee for the month, in one grouped query"""
+    rows = Attendance.objects.filter(
+        user_id__in=employee_ids,
+        date__range=[month_calendar.first_day, month_calendar.last_day],
+        status='present'
+    ).order_by().values('user_id').annotate(present=Count('id'))
+    return {row['user_id']: row['present'] for row in rows}
+
+
+def apply_salary_figures(salary, worked_days):
+    """Set worked_days and the derived amounts the same way Salary.save() does"""
+    salary.worked_days = Decimal(str(worked_days))
+    if salary.worked_days == 0 and not salary.attendance_based:
+        salary.worked_days = salary.total_days
+    salary.is_auto_calculated = True
+    salary.needs_recalculation = False
+    salary.stale_since = None
+    salary.gross_salary = Decimal(str(salary.per_day_pay)) * salary.worked_days
+    salary.net_salary = salary.gross_salary - salary.deduction
+    salary.calculate_remaining_pay()
+
+
+class PayrollRun:
+    """
+    One payroll run for a salary month.
+
+    Existing salaries and present-day counts are loaded up front, the month
+    calendar is resolved once and rows are written with bulk_create/bulk_update.
+    With dry_run=True nothing is written and the summary is a preview.
+    """
+
+    def __init__(self, salary_month, employees, created_by=None, template=None, basic_pay=None, dry_run=False):
+        self.salary_month = salary_month
+        self.employees = employees
+        self.created_by = created_by
+        self.template = template
+        self.basic_pay = basic_pay
+        self.dry_run = dry_run
+        self.errors = []
+
+    def _resolve_basic_pay(self, employee, salary):
+        """Basic pay for this employee: template when it matches, otherwise the requested amount"""
+        if self.template:
+            designation_name = employee.designation.name if employee.designation else None
+            office_name = employee.office.name if employee.office else None
+            if designation_name == self.template.designation_name and office_name == self.template.office_name:
+                return self.template.basic_pay
+            return salary.basic_pay
+        return self.basic_pay
+
+    def execute(self):
+        employees = list(self.employees.select_related('office', 'designation'))
+        employee_ids = [employee.id for employee in employees]
+
+        month_calendar = get_month_calendar(self.salary_month.year, self.salary_month.month)
+        base_days = month_calendar.salary_base_days
+        present_counts = get_present_day_counts(employee_ids, month_calendar)
+        existing = {
+            salary.employee_id: salary
+            for salary in Salary.objects.filter(employee_id__in=employee_ids, salary_month=self.salary_month)
+        }
+
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        rows = []
+        total_gross = Decimal('0')
+        total_net = Decimal('0')
+
+        for employee in employees:
+            salary = existing.get(employee.id)
+            created = salary is None
+            if created:
+                salary = Salary(
+                    employee=employee,
+                    salary_month=self.salary_month,
+                    created_by=self.created_by,
+                    attendance_based=True,
+                    is_auto_calculated=True,
+                )
+
+            basic_pay = self._resolve_basic_pay(employee, salary)
+            if basic_pay is None or basic_pay <= 0:
+                self.errors.append(f"Error processing employee {employee.get_full_name()}: Basic pay must be greater than zero.")
+                continue
+            salary.basic_pay = basic_pay
+
+            # Use employee's pay_bank_name if available and Bank_name is not set
+            if employee.pay_bank_name and not salary.Bank_name:
+                salary.Bank_name = employee.pay_bank_name
+
+            present_days = present_counts.get(employee.id, 0)
+            apply_salary_figures(salary, present_days + base_days)
+            salary.updated_at = now
+
+            total_gross += salary.gross_salary
+            total_net += salary.net_salary
+            (to_create if created else to_update).append(salary)
+            rows.append({
+                'employee_id': str(employee.id),
+                'employee_name': employee.get_full_name(),
+                'action': 'create' if created else 'update',
+                'present_days': present_days,
+                'worked_days': float(salary.worked_days),
+                'gross_salary': float(salary.gross_salary),
+                'net_salary': float(salary.net_salary),
+            })
+
+        if not self.dry_run:
+            with transaction.atomic():
+                if to_create:
+                    Salary.objects.bulk_create(to_create, batch_size=500)
+                if to_update:
+                    Salary.objects.bulk_update(to_update, SALARY_UPDATE_FIELDS, batch_size=500)
+            # Bulk writes skip the Salary signals
+            invalidate_salary_rollup(self.salary_month)
+            logger.info(
+                f"Payroll run {self.salary_month:%Y-%m}: created {len(to_create)}, "
+                f"updated {len(to_update)}, errors {len(self.errors)}"
+            )
+
+        return {
+            'salary_month': self.salary_month.strftime('%Y-%m-%d'),
+            'dry_run': self.dry_run,
+            'calendar': {
+                'days_in_month': month_calendar.days_in_month,
+                'sundays': month_calendar.sunday_count,
+                'holidays': month_calendar.paid_holiday_count,
+                'padding_days': month_calendar.padding_days,
+            },
+            'total_employees': len(employees),
+            'total_created': len(to_create),
+            'total_updated': len(to_update),
+            'total_gross': float(total_gross),
+            'total_net': float(total_net),
+            'rows': rows,
+            'errors': self.errors,
+        }
+
+
+def bulk_create_salaries(employee_ids, salary_month, created_by=None, template=None, basic_pay=None,
+                         increment=0, attendance_based=True):
+    """
+    Create salaries for many employees in one transaction.
+
+    Employees (with office/designation) and existing salaries for the month are
+    loaded in two queries, worked days come from one grouped attendance count and
+    rows are written with a single bulk_create. Returns (created, row_errors)
+    where each row error is {'employee_id', 'error'}.
+    """
+    from .models import CustomUser
+
+    employees = CustomUser.objects.select_related('office', 'designation').in_bulk(employee_ids)
+    existing_ids = set(
+        Salary.objects.filter(employee_id__in=employee_ids, salary_month=salary_month)
+        .values_list('employee_id', flat=True)
+    )
+
+    month_calendar = get_month_calendar(salary_month.year, salary_month.month)
+    present_counts = get_present_day_counts(list(employees), month_calendar) if attendance_based else {}
+
+    to_create = []
+    row_errors = []
+    for employee_id in employee_ids:
+        employee = employees.get(employee_id)
+        if employee is None:
+            row_errors.append({'employee_id': str(employee_id), 'error': f"Employee with ID {employee_id} not found"})
+            continue
+        if employee.id in existing_ids:
+            row_errors.append({
+                'employee_id': str(employee_id),
+                'error': f"Salary already exists for {employee.get_full_name()} for {salary_month.strftime('%B %Y')}"
+            })
+            continue
+
+        salary = Salary(
+            employee=employee,
+            salary_month=salary_month,
+            attendance_based=attendance_based,
+            is_auto_calculated=True,
+            created_by=created_by,
+        )
+        if template:
+            designation_name = employee.designation.name if employee.designation else None
+            office_name = employee.office.name if employee.office else None
+            if designation_name != template.designation_name or office_name != template.office_name:
+                row_errors.append({'employee_id': str(employee_id), 'error': f"Template doesn't match employee {employee.get_full_name()}"})
+                continue
+            salary.basic_pay = template.basic_pay
+        else:
+            salary.basic_pay = basic_pay
+            salary.increment = increment
+
+        if salary.basic_pay is None or salary.basic_pay <= 0:
+            row_errors.append({
+                'employee_id': str(employee_id),
+                'error': f"Error creating salary for employee {employee_id}: Basic pay must be greater than zero."
+            })
+            continue
+
+        # Use employee's pay_bank_name if available
+        if employee.pay_bank_name:
+            salary.Bank_name = employee.pay_bank_name
+
+        if attendance_based:
+            apply_salary_figures(salary, present_counts.get(employee.id, 0) + month_calendar.salary_base_days)
+        else:
+            apply_salary_figures(salary, salary.worked_days)
+        to_create.append(salary)
+
+    if to_create:
+        with transaction.atomic():
+            Salary.objects.bulk_create(to_create, batch_size=500)
+        invalidate_salary_rollup(salary_month)
+    return to_create, row_errors
+
+
+def mark_salaries_stale(user_ids, dates):
+    """
+    Flag the attendance-based, unpaid salaries of these users for the months of
+    these dates as needing recalculation. One UPDATE per distinct month.
+    """
+    user_ids = [user_id for user_id in set(user_ids) if user_id]
+    months = {(day.year, day.month) for day in dates if day}
+    if not user_ids or not months:
+        return 0
+
+    marked = 0
+    now = timezone.now()
+    for year, month in months:
+        marked += Salary.objects.filter(
+            employee_id__in=user_ids,
+            salary_month__year=year,
+            salary_month__month=month,
+            attendance_based=True,
+            needs_recalculation=False,
+        ).exclude(status='paid').update(needs_recalculation=True, stale_since=now)
+    return marked
+
+
+def recompute_stale_salaries(limit=None):
+    """
+    Refresh worked days and amounts for stale salaries, month by month.
+    Paid salaries are never touched. Returns a summary dict.
+    """
+    now = timezone.now()
+    recomputed = 0
+    with transaction.atomic():
+        # Lock the batch so a salary marked paid meanwhile can't be overwritten
+        stale = Salary.objects.select_for_update().filter(
+            needs_recalculation=True
+        ).exclude(status='paid').order_by('stale_since')
+        if limit:
+            stale = stale[:limit]
+
+        by_month = {}
+        for salary in stale:
+            by_month.setdefault((salary.salary_month.year, salary.salary_month.month), []).append(salary)
+
+        for (year, month), salaries in by_month.items():
+            month_calendar = get_month_calendar(year, month)
+            present_counts = get_present_day_counts([salary.employee_id for salary in salaries], month_calendar)
+            for salary in salaries:
+                apply_salary_figures(salary, present_counts.get(salary.employee_id, 0) + month_calendar.salary_base_days)
+                salary.updated_at = now
+            Salary.objects.bulk_update(salaries, SALARY_UPDATE_FIELDS, batch_size=500)
+            recomputed += len(salaries)
+
+    for year, month in by_month:
+        invalidate_salary_rollup(date(year, month, 1))
+
+    if recomputed:
+        logger.info(f"Recomputed {recomputed} stale salaries across {len(by_month)} months")
+    return {'recomputed': recomputed, 'months': [f'{year}-{month:02d}' for year, month in sorted(by_month)]}
@@ -0,0 +1,90 @@
+"""
+PDF Engine
+WeasyPrint (cairo/pango/fontconfig) loaded on first use instead of at import time
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_state = {}
+
+
+def _patch_pydyf(pydyf):
+    """Let WeasyPrint pass the PDF version to older pydyf releases that take no arguments"""
+    original_pdf_init = pydyf.PDF.__init__
+    if getattr(original_pdf_init, '_version_compat', False):
+        return
+
+    def patched_pdf_init(self, *args, **kwargs):
+        try:
+            original_pdf_init(self, *args, **kwargs)
+        except TypeError:
+            # If arguments fail, try without them (old pydyf version)
+            original_pdf_init(self)
+            # Manually set attributes that WeasyPrint expects but old pydyf doesn't accept in init
+            if args:
+                self.version = args[0] if isinstance(args[0], bytes) else str(args[0]).encode('ascii')
+            else:
+                self.version = b'1.7'  # Default expected by WeasyPrint
+
+    patched_pdf_init._version_compat = True
+    pydyf.PDF.__init__ = patched_pdf_init
+
+
+def _load():
+    try:
+        import pydyf
+        import weasyprint
+    except Exception as e:
+        logger.error(f"WeasyPrint not available: {e}")
+        return None
+
+    logger.info(f"WeasyPrint {weasyprint.__version__} loaded (pydyf {pydyf.__version__})")
+    try:
+        _patch_pydyf(pydyf)
+    except Exception as e:
+        logger.warning(f"Failed to patch pydyf: {e}")
+    return weasyprint
+
+
+def get_weasyprint():
+    """The weasyprint module, imported (and pydyf patched) once per process; None if unavailable"""
+    if 'weasyprint' not in _state:
+        with _lock:
+            if 'weasyprint' not in _state:
+                _state['weasyprint'] = _load()
+    return _state['weasyprint']
+
+
+def is_available():
+    return get_weasyprint() is not None
+
+
+def get_font_config():
+    """Shared FontConfiguration; building it scans the system fonts, so do it once"""
+    if 'font_config' not in _state:
+        weasyprint = get_weasyprint()
+        if weasyprint is None:
+            return None
+        from weasyprint.text.fonts import FontConfiguration
+        with _lock:
+            _state.setdefault('font_config', FontConfiguration())
+    return _state['font_config']
+
+
+def prewarm():
+    """
+    Pay the import and font scan cost up front. Meant for dedicated document
+    workers (PDF_ENGINE_PREWARM=true); web workers keep loading lazily.
+    """
+    weasyprint = get_weasyprint()
+    if weasyprint is None:
+        return False
+    get_font_config()
+    # A tiny render pulls in the remaining lazily imported layout code
+    weasyprint.HTML(string='<p>warm</p>').write_pdf(font_config=get_font_config())
+    logger.info("PDF engine pre-warmed")
+    return True
@@ -4,194 +4,180 @@ Custom permissions for the Employee Attendance System
 
 from rest_framework import permissions
 
+from .access_scope import get_access_scope
 
-class IsAdminOrManager(permissions.BasePermission):
+
+class RolePermission(permissions.BasePermission):
     """
-    Custom permission to only allow admins and managers to access.
+    Allows authenticated users whose role is in `allowed_roles`
+    (and superusers when `allow_superuser` is set).
     """
-    
+    allowed_roles = ()
+    allow_superuser = False
+
     def has_permission(self, request, view):
-        return (
-            request.user and 
-            request.user.is_authenticated and 
-            request.user.role in ['admin', 'manager']
-        )
+        scope = get_access_scope(request)
+        if not scope.authenticated:
+            return False
+        return scope.has_role(*self.allowed_roles) or (self.allow_superuser and scope.is_superuser)
+
+
+def _object_office_id(obj):
+    """Office the object belongs to: its own, its employee's or its user's"""
+    if getattr(obj, 'office_id', None):
+        return obj.office_id
+    for relation in ('employee', 'user'):
+        related = getattr(obj, relation, None)
+        if related is not None and getattr(related, 'office_id', None):
+            return related.office_id
+    return None
+
 
+class IsAdminOrManager(RolePermission):
+    """
+    Custom permission to only allow admins and managers to access.
+    """
+    allowed_roles = ('admin', 'manager')
 
-class IsAdminOrManagerOrAccountant(permissions.BasePermission):
+
+class IsAdminOrManagerOrAccountant(RolePermission):
     """
     Custom permission to only allow admins, managers, and accountants to access.
     """
-    
-    def has_permission(self, request, view):
-        return (
-            request.user and 
-            request.user.is_authenticated and 
-            request.user.role in ['admin', 'manager', 'accountant']
-        )
+    allowed_roles = ('admin', 'manager', 'accountant')
 
 
-class IsAdminOrManagerOrEmployee(permissions.BasePermission):
+class IsAdminOrManagerOrEmployee(RolePermission):
     """
     Custom permission to allow admins, managers, and employees to access.
     """
-    
-    def has_permission(self, request, view):
-        return (
-            request.user and 
-            request.user.is_authenticated and 
-            request.user.role in ['admin', 'manager', 'employee']
-        )
+    allowed_roles = ('admin', 'manager', 'employee')
 
 
-class IsAdminOnly(permissions.BasePermission):
+class IsAdminOnly(RolePermission):
     """
     Custom permission to only allow admins to access.
     """
-    
-    def has_permission(self, request, view):
-        return (
-            request.user and 
-            request.user.is_authenticated and 
-            request.user.role == 'admin'
-        )
+    allowed_roles = ('admin',)
+
+
+class IsManagerOnly(RolePermission):
+    """
+    Custom permission to only allow managers to access.
+    """
+    allowed_roles = ('manager',)
 
 
-class IsManagerOrAdmin(permissions.BasePermission):
+class IsAccountantOnly(RolePermission):
+    """
+    Custom permission to only allow accountants to access.
+    """
+    allowed_roles = ('accountant',)
+
+
+class IsSuperuserOrAdminOrManager(RolePermission):
+    """
+    Custom permission to allow superusers, admins, and managers to access.
+    """
+    allowed_roles = ('admin', 'manager')
+    allow_superuser = True
+
+
+class IsManagerOrAdmin(RolePermission):
     """
     Custom permission to allow managers and admins to access.
-    Managers can only access data for their office.
+    Managers can only access data for their offices.
     """
-    
-    def has_permission(self, request, view):
-        return (
-            request.user and 
-            request.user.is_authenticated and 
-            request.user.role in ['admin', 'manager']
-        )
-    
+    allowed_roles = ('admin', 'manager')
+
     def has_object_permission(self, request, view, obj):
+        scope = get_access_scope(request)
         # Admin can access all objects
-        if request.user.role == 'admin':
+        if scope.is_admin:
             return True
-        
-        # Manager can only access objects for their office
-        if request.user.role == 'manager':
-            if hasattr(obj, 'office') and obj.office:
-                return obj.office == request.user.office
-            elif hasattr(obj, 'employee') and obj.employee.office:
-                return obj.employee.office == request.user.office
-            elif hasattr(obj, 'user') and obj.user.office:
-                return obj.user.office == request.user.office
-        
+
+        # Manager can only access objects for their offices
+        if scope.is_manager:
+            return scope.can_access_office(_object_office_id(obj))
+
         return False
 
 
-class IsEmployeeOrManagerOrAdmin(permissions.BasePermission):
+class IsEmployeeOrManagerOrAdmin(RolePermission):
     """
     Custom permission to allow employees, managers, and admins to access.
     Employees can only access their own data.
-    Managers can access data for their office.
+    Managers can access data for their offices.
     """
-    
-    def has_permission(self, request, view):
-        return (
-            request.user and 
-            request.user.is_authenticated and 
-            request.user.role in ['admin', 'manager', 'employee']
-        )
-    
+    allowed_roles = ('admin', 'manager', 'employee')
+
     def has_object_permission(self, request, view, obj):
+        scope = get_access_scope(request)
         # Admin can access all objects
-        if request.user.role == 'admin':
+        if scope.is_admin:
             return True
-        
-        # Manager can access objects for their office
-        if request.user.role == 'manager':
-            if hasattr(obj, 'office') and obj.office:
-                return obj.office == request.user.office
-            elif hasattr(obj, 'employee') and obj.employee.office:
-                return obj.employee.office == request.user.office
-            elif hasattr(obj, 'user') and obj.user.office:
-                return obj.user.office == request.user.office
-        
+
+        # Manager can access objects for their offices
+        if scope.is_manager:
+            return scope.can_access_office(_object_office_id(obj))
+
         # Employee can only access their own data
-        if request.user.role == 'employee':
-            if hasattr(obj, 'employee') and obj.employee:
-                return obj.employee == request.user
-            elif hasattr(obj, 'user') and obj.user:
-                return obj.user == request.user
+        if scope.is_employee:
+            if getattr(obj, 'employee_id', None):
+                return obj.employee_id == scope.user_id
+            elif getattr(obj, 'user_id', None):
+                return obj.user_id == scope.user_id
             elif hasattr(obj, 'id'):
-                return obj.id == request.user.id
-        
+                return obj.id == scope.user_id
+
         return False
 
 
-class IsEmployeeSalaryAccess(permissions.BasePermission):
+class IsEmployeeSalaryAccess(RolePermission):
     """
     Custom permission for salary-related views.
     Allows employees to view their own salary, managers to view office salaries,
     accountants to view all salaries, and admins to view all salaries.
     """
-    
-    def has_permission(self, request, view):
-        return (
-            request.user and 
-            request.user.is_authenticated and 
-            request.user.role in ['admin', 'manager', 'employee', 'accountant']
-        )
-    
+    allowed_roles = ('admin', 'manager', 'employee', 'accountant')
+
     def has_object_permission(self, request, view, obj):
-        user = request.user
-        
-        # Admin can access all salaries
-        if user.role == 'admin':
-            return True
-            
-        # Accountant can access all salaries
-        if user.role == 'accountant':
+        scope = get_access_scope(request)
+
+        # Admin and accountant can access all salaries
+        if scope.is_admin or scope.is_accountant:
             return True
-        
-        # Manager can access salaries for their office
-        if user.role == 'manager':
-            if hasattr(obj, 'employee') and obj.employee:
-                return obj.employee.office == user.office
-        
+
+        # Manager can access salaries for their offices
+        if scope.is_manager:
+            if getattr(obj, 'employee_id', None):
+                return scope.can_access_office(obj.employee.office_id)
+
         # Employee can only access their own salary
-        if user.role == 'employee':
-            if hasattr(obj, 'employee') and obj.employee:
-                return obj.employee == user
+        if scope.is_employee:
+            if getattr(obj, 'employee_id', None):
+                return obj.employee_id == scope.user_id
             elif hasattr(obj, 'id'):
-                return obj.id == user.id
-        
+                return obj.id == scope.user_id
+
         return False
 
 
-class IsOfficeManagerOrAdmin(permissions.BasePermission):
+class IsOfficeManagerOrAdmin(RolePermission):
     """
     Custom permission for office-specific access.
-    Managers can only access data for their office.
+    Managers can only access data for their offices.
     """
-    
-    def has_permission(self, request, view):
-        return (
-            request.user and 
-            request.user.is_authenticated and 
-            request.user.role in ['admin', 'manager']
-        )
-    
+    allowed_roles = ('admin', 'manager')
+
     def has_object_permission(self, request, view, obj):
+        scope = get_access_scope(request)
         # Admin can access all objects
-        if request.user.role == 'admin':
+        if scope.is_admin:
             return True
-        
-        # Manager can only access objects for their office
-        if request.user.role == 'manager' and request.user.office:
-            if hasattr(obj, 'office') and obj.office:
-                return obj.office == request.user.office
-            elif hasattr(obj, 'employee') and obj.employee.office:
-                return obj.employee.office == request.user.office
-            elif hasattr(obj, 'user') and obj.user.office:
-                return obj.user.office == request.user.office
-        
+
+        # Manager can only access objects for their offices
+        if scope.is_manager:
+            return scope.can_access_office(_object_office_id(obj))
+
         return False
@@ -0,0 +1,134 @@
+"""
+Query instrumentation helpers
+Per-request query counting, duplicate SQL detection and timing
+"""
+
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connection, connections
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint_sql(sql):
+    """Normalize a SQL statement so queries differing only in literals compare equal"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryCounter:
+    """Database execute wrapper that records count and time of executed queries"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.record(sql)
+
+    def record(self, sql):
+        pass
+
+
+class QueryRecorder(QueryCounter):
+    """QueryCounter that also keeps fingerprints of executed queries"""
+
+    def __init__(self):
+        super().__init__()
+        self.fingerprints = Counter()
+
+    def record(self, sql):
+        self.fingerprints[fingerprint_sql(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """Fingerprints executed more than once, most repeated first (likely N+1 patterns)"""
+        return [(sql, n) for sql, n in self.fingerprints.most_common() if n > 1]
+
+    @property
+    def duplicate_count(self):
+        return sum(n - 1 for _, n in self.duplicates)
+
+
+@contextmanager
+def request_queries(request):
+    """
+    Count the request's queries on every connection, once per request.
+
+    The outermost middleware installs the recorder on request._query_recorder;
+    inner ones get the same object back instead of wrapping again. It is a
+    full QueryRecorder only when QUERY_INSTRUMENTATION_ENABLED asks for the
+    duplicate report, the cheaper QueryCounter otherwise.
+    """
+    recorder = getattr(request, '_query_recorder', None)
+    if recorder is not None:
+        yield recorder
+        return
+
+    if getattr(settings, 'QUERY_INSTRUMENTATION_ENABLED', False):
+        recorder = QueryRecorder()
+    else:
+        recorder = QueryCounter()
+    request._query_recorder = recorder
+    with ExitStack() as stack:
+        for db_connection in connections.all():
+            stack.enter_context(db_connection.execute_wrapper(recorder))
+        yield recorder
+
+
+@contextmanager
+def record_queries(using=None):
+    """Record queries executed on a connection inside the block"""
+    db_connection = connections[using] if using else connection
+    recorder = QueryRecorder()
+    with db_connection.execute_wrapper(recorder):
+        yield recorder
+
+
+@contextmanager
+def assert_max_queries(max_queries, max_duplicates=None, using=None):
+    """
+    Test helper that fails when the block exceeds a query budget.
+
+        with assert_max_queries(5):
+            client.get('/api/devices/')
+    """
+    with record_queries(using=using) as recorder:
+        yield recorder
+
+    problems = []
+    if recorder.count > max_queries:
+        problems.append(f'{recorder.count} queries executed, budget is {max_queries}')
+    if max_duplicates is not None and recorder.duplicate_count > max_duplicates:
+        problems.append(f'{recorder.duplicate_count} duplicate queries, budget is {max_duplicates}')
+    if problems:
+        details = '\n'.join(f'  {n}x {sql}' for sql, n in recorder.duplicates[:10])
+        message = '; '.join(problems)
+        if details:
+            message += f'\nRepeated queries:\n{details}'
+        raise AssertionError(message)
+
+
+def assert_endpoint_query_budget(client, path, max_queries, method='get', max_duplicates=None, **kwargs):
+    """Call an endpoint with a test client and assert its query budget; returns the response"""
+    with assert_max_queries(max_queries, max_duplicates=max_duplicates):
+        response = getattr(client, method)(path, **kwargs)
+        # DRF responses render lazily; force rendering inside the budget
+        if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+            response.render()
+    return response
@@ -0,0 +1,41 @@
+"""
+Response Renderers
+JSON rendering through orjson when it is installed, DRF's JSONRenderer otherwise
+"""
+
+import logging
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in JSONRenderer. orjson serializes dicts, lists, str, UUID, datetime,
+    date and time natively (UTC datetimes end in Z as with DRF, but microseconds
+    are kept rather than cut to milliseconds); anything else (Decimal, lazy
+    strings, timedelta, querysets...) goes through DRF's encoder, so it renders
+    as before. Indented output (the `indent` media type parameter) is left to
+    the stock renderer.
+    """
+    available = orjson is not None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            return orjson.dumps(data, default=self.encoder_class().default, option=orjson.OPT_UTC_Z)
+        except orjson.JSONEncodeError as e:
+            # e.g. int beyond 64 bits or a non-str dict key: the stock encoder copes
+            logger.debug(f"orjson could not render response, using JSONRenderer: {e}")
+            return super().render(data, accepted_media_type, renderer_context)
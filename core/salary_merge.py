@@ -0,0 +1,87 @@
+"""
+Employees x Salaries Merge
+Shared by the salary report and salary creation status endpoints
+"""
+
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Q, Sum
+from django.http import StreamingHttpResponse
+
+USER_FIELDS = (
+    'id', 'employee_id', 'first_name', 'last_name', 'email', 'salary', 'pay_bank_name',
+    'office_id', 'office__name', 'department_id', 'department__name', 'designation__name',
+)
+SALARY_FIELDS = ('id', 'employee_id', 'basic_pay', 'net_salary', 'status', 'salary_month', 'created_at')
+SALARY_STATUSES = ('paid', 'pending', 'hold')
+
+
+def display_name(user_row):
+    """Same result as CustomUser.get_full_name() for a values() row"""
+    first, last = user_row['first_name'], user_row['last_name']
+    if first and last:
+        return f"{first} {last}"
+    return first or last or user_row['email'] or "Unknown User"
+
+
+def salary_status_summary(salaries):
+    """Count and net amount overall and per status bucket, in one aggregate query"""
+    aggregates = {
+        'total_salaries': Count('id'),
+        'total_amount': Sum('net_salary'),
+    }
+    for salary_status in SALARY_STATUSES:
+        aggregates[f'{salary_status}_salaries'] = Count('id', filter=Q(status=salary_status))
+        aggregates[f'{salary_status}_amount'] = Sum('net_salary', filter=Q(status=salary_status))
+    totals = salaries.order_by().aggregate(**aggregates)
+    return {
+        key: (float(value or 0) if key.endswith('_amount') else value or 0)
+        for key, value in totals.items()
+    }
+
+
+def salary_map(salaries):
+    """{employee_id: salary values() row} for a month's salaries"""
+    return {row['employee_id']: row for row in salaries.order_by().values(*SALARY_FIELDS).iterator()}
+
+
+def merge_employees_salaries(users, salaries, order_by=None):
+    """
+    Hash-merge projected users with their salary for the month.
+    Yields (user_row, salary_row or None) without touching related objects per row.
+    """
+    salaries_by_employee = salary_map(salaries)
+    users = users.order_by(*order_by) if order_by else users
+    for user_row in users.values(*USER_FIELDS).iterator():
+        yield user_row, salaries_by_employee.get(user_row['id'])
+
+
+def stream_json_response(head, lists, tail=None):
+    """
+    Stream {**head, key: [rows...] for each (key, rows) in lists, **tail()}
+    without building the document in memory. `tail` is called after every list
+    is exhausted so it can report running totals.
+    """
+    def generate():
+        encoder = DjangoJSONEncoder()
+        yield '{'
+        separator = ''
+        for key, value in head.items():
+            yield f'{separator}{json.dumps(key)}: {encoder.encode(value)}'
+            separator = ', '
+        for key, rows in lists:
+            yield f'{separator}{json.dumps(key)}: ['
+            separator = ', '
+            first = True
+            for row in rows:
+                yield ('' if first else ',') + encoder.encode(row)
+                first = False
+            yield ']'
+        if tail:
+            for key, value in tail().items():
+                yield f'{separator}{json.dumps(key)}: {encoder.encode(value)}'
+                separator = ', '
+        yield '}'
+
+    return StreamingHttpResponse(generate(), content_type='application/json')
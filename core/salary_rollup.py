@@ -0,0 +1,107 @@
+"""
+Salary Rollups
+Cached per-month payroll totals used by salary statistics
+"""
+
+import logging
+from datetime import date
+
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+from .cache_utils import cache_is_shared
+
+logger = logging.getLogger(__name__)
+
+SALARY_ROLLUP_CACHE_PREFIX = 'salary_rollup'
+SALARY_ROLLUP_CACHE_TIMEOUT = 60 * 60 * 24  # 1 day with a shared cache; Salary signals invalidate earlier
+# A per-process cache only sees invalidations from its own process: keep copies short-lived
+SALARY_ROLLUP_LOCAL_CACHE_TIMEOUT = 60 * 5  # 5 minutes
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def previous_months(current_month, count):
+    """First days of `count` calendar months ending at current_month, newest first"""
+    months = []
+    year, month = current_month.year, current_month.month
+    for _ in range(count):
+        months.append(date(year, month, 1))
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+    return months
+
+
+def _cache_key(month):
+    return f'{SALARY_ROLLUP_CACHE_PREFIX}:{month:%Y-%m}'
+
+
+def _cache_timeout():
+    return SALARY_ROLLUP_CACHE_TIMEOUT if cache_is_shared() else SALARY_ROLLUP_LOCAL_CACHE_TIMEOUT
+
+
+def _scope_key(office_id):
+    return str(office_id) if office_id else 'all'
+
+
+def get_monthly_rollups(months, office_id=None):
+    """
+    Return {month: {'count', 'amount'}} for the given month starts.
+    Cached months are served from the cache; the rest come from one TruncMonth query.
+    """
+    from .models import Salary
+
+    scope = _scope_key(office_id)
+    cached = cache.get_many([_cache_key(month) for month in months])
+    result = {}
+    missing = []
+    for month in months:
+        entry = cached.get(_cache_key(month), {})
+        if scope in entry:
+            result[month] = entry[scope]
+        else:
+            missing.append(month)
+
+    if missing:
+        queryset = Salary.objects.filter(salary_month__gte=min(missing), salary_month__lt=_next_month(max(missing)))
+        if office_id:
+            queryset = queryset.filter(employee__office_id=office_id)
+        rows = queryset.order_by().annotate(month=TruncMonth('salary_month')).values('month').annotate(
+            count=Count('id'), amount=Sum('net_salary')
+        )
+        computed = {month_start(row['month']): {'count': row['count'], 'amount': float(row['amount'] or 0)} for row in rows}
+
+        to_cache = {}
+        for month in missing:
+            rollup = computed.get(month, {'count': 0, 'amount': 0.0})
+            result[month] = rollup
+            entry = dict(cached.get(_cache_key(month), {}))
+            entry[scope] = rollup
+            to_cache[_cache_key(month)] = entry
+        cache.set_many(to_cache, _cache_timeout())
+
+    return result
+
+
+def invalidate_salary_rollup(salary_month):
+    """Drop the cached rollup (every scope) for the month containing salary_month"""
+    if salary_month:
+        cache.delete(_cache_key(month_start(salary_month)))
+
+
+def invalidate_employee_salary_rollups(employee_id):
+    """Drop the cached rollups of every month the employee has a salary for (e.g. after an office move)"""
+    from .models import Salary
+
+    months = Salary.objects.filter(employee_id=employee_id).dates('salary_month', 'month')
+    cache.delete_many([_cache_key(month) for month in months])
+
+
+def _next_month(month):
+    if month.month == 12:
+        return date(month.year + 1, 1, 1)
+    return date(month.year, month.month + 1, 1)
@@ -0,0 +1,461 @@
+"""
+Salary Slip Batch Generation
+Renders a month's salary slips to PDF in a process pool, one worker per core
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+
+from .cache_utils import cache_is_shared
+from .file_serving import private_media_root
+
+logger = logging.getLogger(__name__)
+
+SALARY_SLIP_BATCH_CACHE_PREFIX = 'salary_slip_batch'
+SALARY_SLIP_BATCH_CACHE_TIMEOUT = 60 * 60 * 24  # Progress and ZIPs stay available for a day
+SALARY_SLIP_BATCH_DIR = 'salary_slips'
+OUTPUT_ZIP = 'zip'
+OUTPUT_DOCUMENTS = 'documents'
+OUTPUT_CHOICES = (OUTPUT_ZIP, OUTPUT_DOCUMENTS)
+MAX_REPORTED_ERRORS = 50
+
+_STYLE_BLOCK = re.compile(r'<style[^>]*>(.*?)</style>', re.IGNORECASE | re.DOTALL)
+
+# Per-worker state, filled once by _init_worker
+_worker = {}
+
+
+def batch_dir():
+    """Private directory holding batch ZIPs (and progress files without a shared cache)"""
+    return os.path.join(private_media_root(), SALARY_SLIP_BATCH_DIR)
+
+
+def batch_zip_path(progress):
+    """Absolute path of a completed job's ZIP, or None"""
+    file_name = (progress or {}).get('file_name')
+    return os.path.join(batch_dir(), os.path.basename(file_name)) if file_name else None
+
+
+def _job_id(job_id):
+    """Normalised job id; raises ValueError for anything but a UUID (it becomes a file name)"""
+    return str(uuid.UUID(str(job_id)))
+
+
+def _progress_key(job_id):
+    return f'{SALARY_SLIP_BATCH_CACHE_PREFIX}:{job_id}'
+
+
+def _progress_path(job_id):
+    return os.path.join(batch_dir(), f'{job_id}.json')
+
+
+def _progress_in_cache():
+    """
+    The web process polls progress the Celery worker writes; a per-process cache
+    (locmem) would never show it, so a JSON file under batch_dir() is used instead.
+    """
+    return cache_is_shared()
+
+
+def get_batch_progress(job_id):
+    """Progress dict for a batch job, or None if unknown/expired"""
+    try:
+        job_id = _job_id(job_id)
+    except ValueError:
+        return None
+    if _progress_in_cache():
+        return cache.get(_progress_key(job_id))
+
+    path = _progress_path(job_id)
+    try:
+        if time.time() - os.path.getmtime(path) > SALARY_SLIP_BATCH_CACHE_TIMEOUT:
+            return None
+        with open(path) as progress_file:
+            return json.load(progress_file)
+    except (OSError, ValueError):
+        return None
+
+
+def set_batch_progress(job_id, **fields):
+    """Merge fields into the stored progress of a batch job"""
+    job_id = _job_id(job_id)
+    progress = get_batch_progress(job_id) or {'job_id': job_id}
+    progress.update(fields)
+    if _progress_in_cache():
+        cache.set(_progress_key(job_id), progress, SALARY_SLIP_BATCH_CACHE_TIMEOUT)
+        return progress
+
+    os.makedirs(batch_dir(), exist_ok=True)
+    # Write-then-rename so a poll never reads a half-written file
+    handle, temp_path = tempfile.mkstemp(dir=batch_dir(), prefix=f'.{job_id}.', suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'w') as progress_file:
+            json.dump(progress, progress_file, default=str)
+        os.replace(temp_path, _progress_path(job_id))
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return progress
+
+
+def prune_batch_files(max_age=SALARY_SLIP_BATCH_CACHE_TIMEOUT):
+    """Delete ZIPs and progress files older than max_age seconds; returns the number removed"""
+    removed = 0
+    cutoff = time.time() - max_age
+    try:
+        entries = list(os.scandir(batch_dir()))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError as e:
+            logger.warning(f"Could not prune salary slip batch file {entry.name}: {e}")
+    return removed
+
+
+def launch_batch_process(job_id, salary_month, office_id=None, employee_ids=None, output=OUTPUT_ZIP,
+                         requested_by_id=None):
+    """
+    Start `manage.py generate_salary_slips` for the job in its own session, detached
+    from the web worker, and return without waiting. Used when Celery can't take the
+    job; the command runs the per-core pool and reports progress under job_id.
+    Raises OSError when the process can't be started.
+    """
+    command = [
+        sys.executable, os.path.join(str(settings.BASE_DIR), 'manage.py'), 'generate_salary_slips',
+        '--month', f'{salary_month:%Y-%m}', '--output', output, '--job-id', str(job_id),
+    ]
+    if office_id:
+        command += ['--office', str(office_id)]
+    for employee_id in employee_ids or []:
+        command += ['--employee', str(employee_id)]
+    if requested_by_id:
+        command += ['--requested-by', str(requested_by_id)]
+    subprocess.Popen(
+        command,
+        cwd=str(settings.BASE_DIR),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+        close_fds=True,
+    )
+
+
+def default_worker_count(job_count=None):
+    """One worker per core, capped by SALARY_SLIP_BATCH_MAX_WORKERS and the number of slips"""
+    workers = os.cpu_count() or 1
+    max_workers = getattr(settings, 'SALARY_SLIP_BATCH_MAX_WORKERS', None)
+    if max_workers:
+        workers = min(workers, max_workers)
+    if job_count is not None:
+        workers = min(workers, max(job_count, 1))
+    return max(workers, 1)
+
+
+def _init_worker(template_source, base_url, logo_data_uri=''):
+    """
+    Pool initializer: compile the Django template and parse the slip CSS and
+    fonts once per worker instead of once per slip.
+    """
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        # 'spawn' start method: the child starts without Django configured
+        django.setup()
+
+    from django.template import Template
+    from . import pdf_engine
+
+    weasyprint = pdf_engine.get_weasyprint()
+    if weasyprint is None:
+        raise RuntimeError('WeasyPrint is not available in the slip worker')
+
+    font_config = pdf_engine.get_font_config()
+    css_source = '\n'.join(_STYLE_BLOCK.findall(template_source))
+    stylesheets = []
+    if css_source.strip():
+        try:
+            stylesheets.append(weasyprint.CSS(string=css_source, font_config=font_config))
+            template_source = _STYLE_BLOCK.sub('', template_source)
+        except Exception as e:
+            # Keep the inline styles; WeasyPrint will parse them per slip
+            logger.warning(f"Could not pre-parse salary slip CSS, keeping inline styles: {e}")
+
+    _worker.update({
+        'template': Template(template_source),
+        'stylesheets': stylesheets,
+        'font_config': font_config,
+        'base_url': base_url,
+        'html_class': weasyprint.HTML,
+        'logo_data_uri': logo_data_uri,
+    })
+
+
+def _render_slip(job):
+    """
+    Render one slip inside a worker.
+    job is (salary_id, filename, context, output_dir, keep_html);
+    returns (salary_id, pdf_path or None, html or None, error or None).
+    """
+    from django.template import Context
+
+    salary_id, filename, context, output_dir, keep_html = job
+    try:
+        if _worker['logo_data_uri']:
+            # Inline logo: no HTTP fetch of the public logo URL per slip
+            context = dict(context, logo_url=_worker['logo_data_uri'])
+        html = _worker['template'].render(Context(context))
+        pdf_path = os.path.join(output_dir, filename)
+        _worker['html_class'](string=html, base_url=_worker['base_url']).write_pdf(
+            pdf_path,
+            stylesheets=_worker['stylesheets'],
+            font_config=_worker['font_config'],
+        )
+        return salary_id, pdf_path, html if keep_html else None, None
+    except Exception as e:
+        return salary_id, None, None, str(e)
+
+
+def salary_slip_data(salary):
+    """The salary slip `data` dict for a stored Salary (same keys the frontend posts)"""
+    worked_days = float(salary.worked_days or 0)
+    total_days = salary.total_days or 0
+    return {
+        'salary_month': salary.salary_month.strftime('%B'),
+        'salary_year': salary.salary_month.strftime('%Y'),
+        'basic_salary': salary.basic_pay,
+        'basic_pay': salary.basic_pay,
+        'per_day_pay': salary.per_day_pay,
+        'total_days': total_days,
+        'worked_days': worked_days,
+        'absent_days': max(total_days - worked_days, 0),
+        'gross_salary': salary.gross_salary,
+        'total_gross_salary': salary.gross_salary,
+        'total_salary': salary.gross_salary,
+        'total_deductions': salary.deduction,
+        'net_salary': salary.net_salary,
+        'final_salary': salary.final_salary,
+        'bank_name': salary.Bank_name or getattr(salary.employee, 'pay_bank_name', None) or 'Not specified',
+    }
+
+
+def _slip_filename(employee, salary_month):
+    employee_code = employee.employee_id or str(employee.id)[:8].upper()
+    name = re.sub(r'[^A-Za-z0-9]+', '_', f"{employee_code}_{employee.get_full_name()}").strip('_')
+    return f"Salary_Slip_{name}_{salary_month:%b_%Y}.pdf"
+
+
+class SalarySlipBatch:
+    """
+    Generate salary slips for every salary of a month (optionally one office or
+    a list of employees).
+
+    Template contexts are built in this process (it owns the DB connection);
+    only rendering and PDF layout run in the pool. Output is either one ZIP
+    under PRIVATE_MEDIA_ROOT/salary_slips/ (downloaded through an authenticated
+    view, never published by the web server) or a GeneratedDocument with its PDF
+    per employee. Progress is stored under the job id (see set_batch_progress).
+
+    The pool needs a non-daemonic process: inside a Celery prefork child the
+    slips are rendered serially (see _run_pool).
+    """
+
+    def __init__(self, salary_month, office_id=None, employee_ids=None, output=OUTPUT_ZIP,
+                 requested_by=None, job_id=None, workers=None, progress_callback=None):
+        if output not in OUTPUT_CHOICES:
+            raise ValueError(f"Unsupported output: {output}")
+        self.salary_month = salary_month
+        self.office_id = office_id
+        self.employee_ids = employee_ids
+        self.output = output
+        self.requested_by = requested_by
+        self.job_id = str(job_id or uuid.uuid4())
+        self.workers = workers
+        self.progress_callback = progress_callback
+        self.errors = []
+
+    def get_salaries(self):
+        from .models import Salary
+
+        salaries = Salary.objects.filter(salary_month=self.salary_month).select_related(
+            'employee', 'employee__office', 'employee__department', 'employee__designation'
+        )
+        if self.office_id:
+            salaries = salaries.filter(employee__office_id=self.office_id)
+        if self.employee_ids:
+            salaries = salaries.filter(employee_id__in=self.employee_ids)
+        return salaries.order_by('employee__employee_id')
+
+    def _report(self, **fields):
+        progress = set_batch_progress(self.job_id, **fields)
+        if self.progress_callback:
+            self.progress_callback(progress)
+        return progress
+
+    def _build_jobs(self, salaries, output_dir):
+        from .document_views import DocumentGenerationViewSet
+
+        builder = DocumentGenerationViewSet()
+        keep_html = self.output == OUTPUT_DOCUMENTS
+        jobs = []
+        for salary in salaries:
+            context = builder.get_salary_slip_context(salary.employee, salary_slip_data(salary))
+            filename = _slip_filename(salary.employee, self.salary_month)
+            jobs.append((str(salary.id), filename, context, output_dir, keep_html))
+        return jobs, builder.get_salary_slip_template()
+
+    def _run_pool(self, jobs, template_source, base_url):
+        """Yield worker results as they complete"""
+        from .document_rendering import get_logo_data_uri
+
+        initargs = (template_source, base_url, get_logo_data_uri())
+        workers = self.workers or default_worker_count(len(jobs))
+        if workers > 1 and multiprocessing.current_process().daemon:
+            # Daemonic processes (e.g. Celery prefork children) cannot start a pool
+            logger.info(
+                f"Salary slip batch {self.job_id} runs in a daemonic process: rendering "
+                f"{len(jobs)} slips serially (use a --pool=solo/threads worker or the "
+                f"generate_salary_slips command for one process per core)"
+            )
+            workers = 1
+        if workers <= 1:
+            _init_worker(*initargs)
+            for job in jobs:
+                yield _render_slip(job)
+            return
+
+        # Forked workers must not share this process's DB sockets
+        connections.close_all()
+        start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_worker,
+            initargs=initargs,
+        ) as executor:
+            futures = [executor.submit(_render_slip, job) for job in jobs]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def execute(self):
+        """Run the batch; any error marks the job failed so pollers don't wait on it forever"""
+        try:
+            return self._execute()
+        except Exception as e:
+            logger.error(f"Salary slip batch {self.job_id} failed: {e}")
+            self._report(status='failed', error=str(e))
+            raise
+
+    def _execute(self):
+        from . import pdf_engine
+
+        started_at = timezone.now()
+        self._report(status='running', started_at=started_at.isoformat(), total=0, done=0, failed=0,
+                     salary_month=self.salary_month.strftime('%Y-%m'), output=self.output)
+        if not pdf_engine.is_available():
+            return self._report(status='failed', error='WeasyPrint is not available')
+        prune_batch_files()
+
+        salaries = {str(salary.id): salary for salary in self.get_salaries()}
+        output_dir = tempfile.mkdtemp(prefix=f'salary_slips_{self.job_id[:8]}_')
+        try:
+            jobs, template_source = self._build_jobs(salaries.values(), output_dir)
+            total = len(jobs)
+            self._report(total=total)
+            # Report roughly every 2% so big runs don't hammer the cache
+            report_every = max(total // 50, 1)
+
+            rendered = []
+            done = failed = 0
+            base_url = str(settings.MEDIA_ROOT)
+            for salary_id, pdf_path, html, error in self._run_pool(jobs, template_source, base_url):
+                if error:
+                    failed += 1
+                    employee = salaries[salary_id].employee
+                    logger.error(f"Salary slip failed for {employee.get_full_name()}: {error}")
+                    if len(self.errors) < MAX_REPORTED_ERRORS:
+                        self.errors.append({'employee_id': str(employee.id), 'error': error})
+                else:
+                    done += 1
+                    rendered.append((salaries[salary_id], pdf_path, html))
+                if (done + failed) % report_every == 0 or done + failed == total:
+                    self._report(done=done, failed=failed, errors=self.errors)
+
+            if self.output == OUTPUT_ZIP:
+                result = self._deliver_zip(rendered)
+            else:
+                result = self._deliver_documents(rendered)
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+        duration = (timezone.now() - started_at).total_seconds()
+        logger.info(
+            f"Salary slip batch {self.job_id} ({self.salary_month:%Y-%m}): "
+            f"{done} generated, {failed} failed in {duration:.1f}s"
+        )
+        return self._report(status='completed', finished_at=timezone.now().isoformat(),
+                            duration_seconds=round(duration, 1), **result)
+
+    def _deliver_zip(self, rendered):
+        file_name = f"salary_slips_{self.salary_month:%Y_%m}_{self.job_id[:8]}.zip"
+        zip_path = os.path.join(batch_dir(), file_name)
+        os.makedirs(batch_dir(), exist_ok=True)
+        # PDFs are already compressed; storing avoids burning CPU for nothing
+        with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for _, pdf_path, _ in rendered:
+                archive.write(pdf_path, arcname=os.path.basename(pdf_path))
+        return {'file_name': file_name}
+
+    def _deliver_documents(self, rendered):
+        from django.core.files import File
+        from .models import DocumentTemplate, GeneratedDocument
+
+        template = DocumentTemplate.objects.filter(document_type='salary_slip', is_active=True).first()
+        if template is None:
+            from .document_views import DocumentGenerationViewSet
+            template = DocumentTemplate.objects.create(
+                name='Default Salary Slip',
+                document_type='salary_slip',
+                template_content=DocumentGenerationViewSet().get_salary_slip_template(),
+                is_active=True,
+                created_by=self.requested_by,
+            )
+
+        document_ids = []
+        for salary, pdf_path, html in rendered:
+            employee = salary.employee
+            document = GeneratedDocument.objects.create(
+                employee=employee,
+                template=template,
+                document_type='salary_slip',
+                title=f"Salary Slip - {employee.get_full_name()} - {self.salary_month:%B %Y}",
+                content=html,
+                generated_by=self.requested_by,
+                salary_data={key: str(value) for key, value in salary_slip_data(salary).items()},
+            )
+            with open(pdf_path, 'rb') as pdf_file:
+                document.pdf_file.save(os.path.basename(pdf_path), File(pdf_file), save=True)
+            document_ids.append(str(document.id))
+        return {'document_ids': document_ids}
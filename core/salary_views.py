@@ -11,12 +11,12 @@ from django.db.models import Q, Sum, Count, Avg, Max, Min
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.conf import settings
-from datetime import datetime, timedelta
+from datetime import datetime
 from decimal import Decimal
 import uuid
 
 from .models import (
-    Salary, SalaryTemplate, CustomUser, Office, Department, Designation, Attendance
+    Salary, SalaryTemplate, CustomUser, Designation, Attendance
 )
 from .serializers import (
     SalarySerializer, SalaryCreateSerializer, SalaryUpdateSerializer,
@@ -24,6 +24,12 @@ from .serializers import (
     SalaryTemplateCreateSerializer, SalaryBulkCreateSerializer, SalaryReportSerializer,
     SalarySummarySerializer, SalaryAutoCalculateSerializer
 )
+from .payroll import PayrollRun, bulk_create_salaries, recompute_stale_salaries
+from .salary_merge import (
+    display_name, merge_employees_salaries, salary_status_summary, stream_json_response
+)
+from .salary_rollup import get_monthly_rollups, previous_months
+from .db_routers import ReportingReadMixin, reporting_view
 from .permissions import IsAdminOrManager, IsAdminOrManagerOrAccountant, IsAdminOrManagerOrEmployee, IsEmployeeSalaryAccess
 
 
@@ -264,62 +270,38 @@ class SalaryBulkCreateView(APIView):
         increment = data.get('increment', 0)
         attendance_based = data.get('attendance_based', True)
 
-        created_salaries = []
-        errors = []
-
-        for employee_id in employee_ids:
+        # Resolve the template once for the whole batch
+        template = None
+        if template_id:
             try:
-                employee = CustomUser.objects.get(id=employee_id)
-                
-                # Check for existing salary for this employee and month
-                if Salary.objects.filter(employee=employee, salary_month=salary_month).exists():
-                    errors.append(f"Salary already exists for {employee.get_full_name()} for {salary_month.strftime('%B %Y')}")
-                    continue
-
-                # Get salary data from template or use provided basic_pay
-                if template_id:
-                    template = SalaryTemplate.objects.get(id=template_id)
-                    if employee.designation.name != template.designation_name or employee.office.name != template.office_name:
-                        errors.append(f"Template doesn't match employee {employee.get_full_name()}")
-                        continue
-                    
-                    salary_data = {
-                        'employee': employee,
-                        'basic_pay': template.basic_pay,
-                        'salary_month': salary_month,
-                        'attendance_based': attendance_based,
-                        'is_auto_calculated': True,
-                        'created_by': request.user
-                    }
-                else:
-                    salary_data = {
-                        'employee': employee,
-                        'basic_pay': basic_pay,
-                        'increment': increment,
-                        'salary_month': salary_month,
-                        'attendance_based': attendance_based,
-                        'is_auto_calculated': True,
-                        'created_by': request.user
-                    }
-                
-                # Use employee's pay_bank_name if available
-                if employee.pay_bank_name:
-                    salary_data['Bank_name'] = employee.pay_bank_name
-
-                salary = Salary.objects.create(**salary_data)
-                created_salaries.append(SalarySerializer(salary).data)
-
-            except CustomUser.DoesNotExist:
-                errors.append(f"Employee with ID {employee_id} not found")
+                template = SalaryTemplate.objects.get(id=template_id)
             except SalaryTemplate.DoesNotExist:
-                errors.append(f"Template with ID {template_id} not found")
-            except Exception as e:
-                errors.append(f"Error creating salary for employee {employee_id}: {str(e)}")
+                return Response(
+                    {'error': f'Template with ID {template_id} not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+        try:
+            created, row_errors = bulk_create_salaries(
+                employee_ids,
+                salary_month,
+                created_by=request.user,
+                template=template,
+                basic_pay=basic_pay,
+                increment=increment,
+                attendance_based=attendance_based
+            )
+        except Exception as e:
+            return Response(
+                {'error': f'Bulk salary creation failed: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
 
         response_data = {
-            'created_salaries': created_salaries,
-            'total_created': len(created_salaries),
-            'errors': errors
+            'created_salaries': SalarySerializer(created, many=True).data,
+            'total_created': len(created),
+            'errors': [row['error'] for row in row_errors],
+            'row_errors': row_errors
         }
 
         return Response(response_data, status=status.HTTP_201_CREATED)
@@ -329,6 +311,7 @@ class SalaryAutoCalculateView(APIView):
     """
     Auto-calculate salaries from attendance data
     - POST: Calculate salaries based on attendance (Admin/Manager/Accountant only)
+      Pass dry_run=true to preview the run without writing anything
     """
     permission_classes = [permissions.IsAuthenticated, IsAdminOrManagerOrAccountant]
 
@@ -356,59 +339,89 @@ class SalaryAutoCalculateView(APIView):
         if department_id:
             employees = employees.filter(department_id=department_id)
 
-        created_salaries = []
-        updated_salaries = []
-        errors = []
-
-        for employee in employees:
+        template = None
+        if template_id:
             try:
-                # Check if salary already exists
-                salary, created = Salary.objects.get_or_create(
-                    employee=employee,
-                    salary_month=salary_month,
-                    defaults={
-                        'created_by': request.user,
-                        'attendance_based': True,
-                        'is_auto_calculated': True
-                    }
+                template = SalaryTemplate.objects.get(id=template_id)
+            except SalaryTemplate.DoesNotExist:
+                return Response(
+                    {'error': f'Template with ID {template_id} not found'},
+                    status=status.HTTP_404_NOT_FOUND
                 )
 
-                # Set salary data
-                if template_id:
-                    template = SalaryTemplate.objects.get(id=template_id)
-                    if employee.designation.name == template.designation_name and employee.office.name == template.office_name:
-                        salary.basic_pay = template.basic_pay
-                        # Template fields are already set in salary_data
-                else:
-                    salary.basic_pay = basic_pay
+        payroll_run = PayrollRun(
+            salary_month=salary_month,
+            employees=employees,
+            created_by=request.user,
+            template=template,
+            basic_pay=basic_pay,
+            dry_run=data.get('dry_run', False)
+        )
+        try:
+            summary = payroll_run.execute()
+        except Exception as e:
+            return Response(
+                {'error': f'Payroll run failed: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
 
-                # Use employee's pay_bank_name if available and Bank_name is not set
-                if employee.pay_bank_name and not salary.Bank_name:
-                    salary.Bank_name = employee.pay_bank_name
+        return Response(summary, status=status.HTTP_200_OK)
 
-                # Auto-calculate worked days from attendance
-                salary.calculate_worked_days_from_attendance()
-                salary.save()
 
-                if created:
-                    created_salaries.append(SalarySerializer(salary).data)
-                else:
-                    updated_salaries.append(SalarySerializer(salary).data)
+class StaleSalaryListView(APIView):
+    """
+    Salaries whose attendance changed after worked days were calculated
+    - GET: List stale (unpaid) salaries (Admin/Manager/Accountant only)
+    - POST: Recompute stale salaries now instead of waiting for the background task
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrManagerOrAccountant]
 
-            except SalaryTemplate.DoesNotExist:
-                errors.append(f"Template with ID {template_id} not found for employee {employee.get_full_name()}")
-            except Exception as e:
-                errors.append(f"Error processing employee {employee.get_full_name()}: {str(e)}")
+    def get_queryset(self):
+        queryset = Salary.objects.filter(needs_recalculation=True).exclude(status='paid')
+        user = self.request.user
+        if user.role == 'manager' and user.office:
+            queryset = queryset.filter(employee__office=user.office)
+        return queryset
 
-        response_data = {
-            'created_salaries': created_salaries,
-            'updated_salaries': updated_salaries,
-            'total_created': len(created_salaries),
-            'total_updated': len(updated_salaries),
-            'errors': errors
-        }
+    def get(self, request):
+        """List stale salaries, oldest first"""
+        rows = self.get_queryset().order_by('stale_since').values(
+            'id', 'employee_id', 'employee__first_name', 'employee__last_name',
+            'employee__employee_id', 'employee__office__name', 'salary_month',
+            'status', 'worked_days', 'net_salary', 'stale_since'
+        )
+        stale_salaries = [
+            {
+                'id': str(row['id']),
+                'employee': str(row['employee_id']),
+                'employee_name': f"{row['employee__first_name']} {row['employee__last_name']}".strip(),
+                'employee_id': row['employee__employee_id'],
+                'office': row['employee__office__name'],
+                'salary_month': row['salary_month'].strftime('%Y-%m-%d'),
+                'status': row['status'],
+                'worked_days': float(row['worked_days']),
+                'net_salary': float(row['net_salary']),
+                'stale_since': row['stale_since'].isoformat() if row['stale_since'] else None,
+            }
+            for row in rows
+        ]
+        return Response({
+            'total_stale': len(stale_salaries),
+            'stale_salaries': stale_salaries
+        }, status=status.HTTP_200_OK)
 
-        return Response(response_data, status=status.HTTP_200_OK)
+    def post(self, request):
+        """Recompute stale salaries in one batch"""
+        if request.user.role == 'manager':
+            return Response(
+                {'error': 'Only admin or accountant can recompute payroll.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        try:
+            limit = int(request.data.get('limit')) if request.data.get('limit') else None
+        except (TypeError, ValueError):
+            return Response({'error': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(recompute_stale_salaries(limit=limit), status=status.HTTP_200_OK)
 
 
 class SalaryTemplateListView(generics.ListCreateAPIView):
@@ -472,7 +485,7 @@ class SalaryTemplateDetailView(generics.RetrieveUpdateDestroyAPIView):
         return queryset
 
 
-class SalaryReportView(APIView):
+class SalaryReportView(ReportingReadMixin, APIView):
     """
     Generate salary reports
     - GET: Get salary report data (Admin/Manager/Accountant only)
@@ -498,7 +511,7 @@ class SalaryReportView(APIView):
         queryset = Salary.objects.filter(
             salary_month__year=year,
             salary_month__month=month
-        ).select_related('employee', 'employee__office', 'employee__department')
+        )
 
         # Apply filters
         if office_id:
@@ -521,74 +534,48 @@ class SalaryReportView(APIView):
         else:
             all_users = User.objects.all()
         
-        # Calculate statistics
-        total_salaries = queryset.count()
-        total_amount = queryset.aggregate(total=Sum('net_salary'))['total'] or 0
-        # Total users (all users, not just those with salaries)
-        total_users = all_users.count()
-        paid_salaries = queryset.filter(status='paid').count()
-        paid_amount = queryset.filter(status='paid').aggregate(total=Sum('net_salary'))['total'] or 0
-        pending_salaries = queryset.filter(status='pending').count()
-        pending_amount = queryset.filter(status='pending').aggregate(total=Sum('net_salary'))['total'] or 0
-        hold_salaries = queryset.filter(status='hold').count()
-        hold_amount = queryset.filter(status='hold').aggregate(total=Sum('net_salary'))['total'] or 0
+        # One aggregate query for every status bucket
+        summary = salary_status_summary(queryset)
+        filters_data = {
+            'year': year,
+            'month': month,
+            'office_id': str(office_id) if office_id else None,
+            'department_id': str(department_id) if department_id else None,
+            'status': status_filter
+        }
 
-        # Get salary details - include all users, even those without salary records
-        salary_details = []
-        
-        # Create a mapping of employee_id to salary data
-        salary_map = {}
-        for salary in queryset:
-            salary_map[salary.employee.id] = {
-                'id': str(salary.id),
-                'employee_name': salary.employee.get_full_name(),
-                'employee_id': salary.employee.employee_id,
-                'office': salary.employee.office.name if salary.employee.office else None,
-                'department': salary.employee.department.name if salary.employee.department else None,
-                'basic_pay': float(salary.basic_pay),
-                'net_salary': float(salary.net_salary),
-                'status': salary.status,
-                'salary_month': salary.salary_month.strftime('%Y-%m-%d')
-            }
-        
-        # Add all users to the details
-        for user in all_users:
-            if user.id in salary_map:
-                # User has salary record
-                salary_details.append(salary_map[user.id])
-            else:
-                # User has no salary record for this month
-                salary_details.append({
+        def salary_details():
+            """Include all users, even those without salary records"""
+            for user_row, salary in merge_employees_salaries(all_users, queryset):
+                details = {
                     'id': None,
-                    'employee_name': user.get_full_name(),
-                    'employee_id': user.employee_id,
-                    'office': user.office.name if user.office else None,
-                    'department': user.department.name if user.department else None,
+                    'employee_name': display_name(user_row),
+                    'employee_id': user_row['employee_id'],
+                    'office': user_row['office__name'],
+                    'department': user_row['department__name'],
                     'basic_pay': 0,
                     'net_salary': 0,
                     'status': 'no_salary',
                     'salary_month': used_month.strftime('%Y-%m-%d')
-                })
+                }
+                if salary:
+                    details.update({
+                        'id': str(salary['id']),
+                        'basic_pay': float(salary['basic_pay']),
+                        'net_salary': float(salary['net_salary']),
+                        'status': salary['status'],
+                        'salary_month': salary['salary_month'].strftime('%Y-%m-%d')
+                    })
+                yield details
+
+        # Large companies can stream the details instead of building one big response
+        if request.query_params.get('stream', '').lower() == 'true':
+            return stream_json_response({'summary': summary}, [('details', salary_details())], lambda: {'filters': filters_data})
 
         report_data = {
-            'summary': {
-                'total_salaries': total_salaries,
-                'total_amount': float(total_amount),
-                'paid_salaries': paid_salaries,
-                'paid_amount': float(paid_amount),
-                'pending_salaries': pending_salaries,
-                'pending_amount': float(pending_amount),
-                'hold_salaries': hold_salaries,
-                'hold_amount': float(hold_amount)
-            },
-            'details': salary_details,
-            'filters': {
-                'year': year,
-                'month': month,
-                'office_id': str(office_id) if office_id else None,
-                'department_id': str(department_id) if department_id else None,
-                'status': status_filter
-            }
+            'summary': summary,
+            'details': list(salary_details()),
+            'filters': filters_data
         }
 
         return Response(report_data, status=status.HTTP_200_OK)
@@ -890,92 +877,90 @@ def salary_creation_status(request):
         salaries = Salary.objects.filter(
             salary_month__year=year,
             salary_month__month=month
-        ).select_related('employee')
-        
-        # Create a dictionary mapping employee UUID to salary for quick lookup
-        # Use employee.id (UUID) as the key to match with employee.id later
-        salary_dict = {}
-        employees_with_salary_ids = set()
-        for salary in salaries:
-            # Use the employee's UUID as the key (not employee_id field)
-            employee_uuid = str(salary.employee.id)
-            salary_dict[employee_uuid] = salary
-            employees_with_salary_ids.add(employee_uuid)
-        
-        # Debug logging (only in DEBUG mode)
-        if settings.DEBUG:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.info(f"Salary creation status - Year: {year}, Month: {month}, Found {len(salaries)} salaries, {len(employees_with_salary_ids)} unique users with salary")
-            # Log sample salary months to verify filtering
-            if salaries.exists():
-                sample_dates = [s.salary_month.strftime('%Y-%m-%d') for s in salaries[:5]]
-                logger.info(f"Sample salary_month dates found: {sample_dates}")
-        
-        # Build response data
-        employees_with_salary_list = []
-        employees_without_salary_list = []
-        
-        # Process all users
-        for employee in users.select_related('office', 'department', 'designation').order_by('first_name', 'last_name'):
-            employee_id_str = str(employee.id)
-            
-            employee_data = {
-                'id': employee_id_str,
-                'employee_id': employee.employee_id or '',
-                'first_name': employee.first_name or '',
-                'last_name': employee.last_name or '',
-                'full_name': employee.get_full_name() or '',
-                'email': employee.email or '',
-                'office': employee.office.name if employee.office else None,
-                'office_id': str(employee.office.id) if employee.office else None,
-                'department': employee.department.name if employee.department else None,
-                'department_id': str(employee.department.id) if employee.department else None,
-                'designation': employee.designation.name if employee.designation else None,
-                'salary': float(employee.salary) if employee.salary else 0.0,
-                'pay_bank_name': employee.pay_bank_name or '',
-            }
-            
-            if employee_id_str in employees_with_salary_ids:
-                # Employee has salary for this month
-                salary = salary_dict[employee_id_str]
-                employee_data['salary_id'] = str(salary.id)
-                employee_data['salary_status'] = salary.status
-                employee_data['net_salary'] = float(salary.net_salary) if salary.net_salary else 0.0
-                employee_data['created_at'] = salary.created_at.isoformat() if salary.created_at else None
-                employees_with_salary_list.append(employee_data)
-            else:
-                # Employee does NOT have salary for this month - this is what we want to show
-                employee_data['salary_id'] = None
-                employee_data['salary_status'] = 'not_created'
-                employee_data['net_salary'] = 0.0
-                employee_data['created_at'] = None
-                employees_without_salary_list.append(employee_data)
-        
-        # Calculate statistics
-        total_users = users.count()
-        active_users = users.filter(is_active=True).count()  # Should be same as total_users since we filter is_active=True
-        employees_with_salary_count = len(employees_with_salary_list)
-        employees_without_salary_count = len(employees_without_salary_list)
-        
-        response_data = {
-            'salary_month': salary_month.strftime('%Y-%m-%d'),
-            'year': year,
-            'month': month,
-            'statistics': {
+        )
+        filters_data = {
+            'office_id': str(office_id) if office_id else None,
+            'department_id': str(department_id) if department_id else None
+        }
+
+        def employee_rows(with_salary=None):
+            """Merged employee rows as (has_salary, data); with_salary limits them to one side"""
+            for employee, salary in merge_employees_salaries(users, salaries, order_by=('first_name', 'last_name')):
+                if with_salary is not None and (salary is not None) != with_salary:
+                    continue
+                employee_data = {
+                    'id': str(employee['id']),
+                    'employee_id': employee['employee_id'] or '',
+                    'first_name': employee['first_name'] or '',
+                    'last_name': employee['last_name'] or '',
+                    'full_name': display_name(employee) or '',
+                    'email': employee['email'] or '',
+                    'office': employee['office__name'],
+                    'office_id': str(employee['office_id']) if employee['office_id'] else None,
+                    'department': employee['department__name'],
+                    'department_id': str(employee['department_id']) if employee['department_id'] else None,
+                    'designation': employee['designation__name'],
+                    'salary': float(employee['salary']) if employee['salary'] else 0.0,
+                    'pay_bank_name': employee['pay_bank_name'] or '',
+                }
+                if salary is not None:
+                    # Employee has salary for this month
+                    employee_data['salary_id'] = str(salary['id'])
+                    employee_data['salary_status'] = salary['status']
+                    employee_data['net_salary'] = float(salary['net_salary']) if salary['net_salary'] else 0.0
+                    employee_data['created_at'] = salary['created_at'].isoformat() if salary['created_at'] else None
+                else:
+                    # Employee does NOT have salary for this month - this is what we want to show
+                    employee_data['salary_id'] = None
+                    employee_data['salary_status'] = 'not_created'
+                    employee_data['net_salary'] = 0.0
+                    employee_data['created_at'] = None
+                yield salary is not None, employee_data
+
+        def statistics(total_users, employees_with_salary_count):
+            employees_without_salary_count = total_users - employees_with_salary_count
+            return {
                 'total_users': total_users,
-                'active_users': active_users,
+                'active_users': total_users,  # users are already filtered to is_active=True
                 'total_employees': total_users,  # Keep for backward compatibility
                 'employees_with_salary': employees_with_salary_count,
                 'employees_without_salary': employees_without_salary_count,
                 'completion_percentage': round((employees_with_salary_count / total_users * 100) if total_users > 0 else 0, 2)
-            },
+            }
+
+        head = {
+            'salary_month': salary_month.strftime('%Y-%m-%d'),
+            'year': year,
+            'month': month,
+        }
+
+        if request.query_params.get('stream', '').lower() == 'true':
+            # Stream both lists; statistics are emitted last from the running counts
+            counts = {True: 0, False: 0}
+
+            def counted(with_salary):
+                for has_salary, row in employee_rows(with_salary):
+                    counts[has_salary] += 1
+                    yield row
+
+            return stream_json_response(
+                head,
+                [('employees_with_salary', counted(True)), ('employees_without_salary', counted(False))],
+                lambda: {'statistics': statistics(counts[True] + counts[False], counts[True]), 'filters': filters_data}
+            )
+
+        employees_with_salary_list = []
+        employees_without_salary_list = []
+        for has_salary, employee_data in employee_rows():
+            (employees_with_salary_list if has_salary else employees_without_salary_list).append(employee_data)
+        total_users = len(employees_with_salary_list) + len(employees_without_salary_list)
+
+        response_data = {
+            **head,
+            'statistics': statistics(total_users, len(employees_with_salary_list)),
             'employees_with_salary': employees_with_salary_list,
             'employees_without_salary': employees_without_salary_list,  # This is the list of remaining users
-            'filters': {
-                'office_id': str(office_id) if office_id else None,
-                'department_id': str(department_id) if department_id else None
-            }
+            'filters': filters_data
         }
         
         return Response(response_data, status=status.HTTP_200_OK)
@@ -995,6 +980,7 @@ def salary_creation_status(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated, IsAdminOrManagerOrAccountant])
+@reporting_view
 def salary_statistics(request):
     """
     Get detailed salary statistics
@@ -1021,55 +1007,34 @@ def salary_statistics(request):
         'monthly_trends': {}
     }
 
-    # Statistics by status
-    for status_choice in Salary.SALARY_STATUS_CHOICES:
-        status_value = status_choice[0]
-        count = queryset.filter(status=status_value).count()
-        amount = queryset.filter(status=status_value).aggregate(total=Sum('net_salary'))['total'] or 0
+    # Statistics by status (one grouped query)
+    status_rows = {
+        row['status']: row
+        for row in queryset.order_by().values('status').annotate(count=Count('id'), amount=Sum('net_salary'))
+    }
+    for status_value, _label in Salary.SALARY_STATUS_CHOICES:
+        row = status_rows.get(status_value, {})
         stats['by_status'][status_value] = {
-            'count': count,
-            'amount': float(amount)
+            'count': row.get('count', 0),
+            'amount': float(row.get('amount') or 0)
         }
 
-    # Statistics by office
-    offices = Office.objects.all()
-    for office in offices:
-        office_salaries = queryset.filter(employee__office=office)
-        count = office_salaries.count()
-        amount = office_salaries.aggregate(total=Sum('net_salary'))['total'] or 0
-        if count > 0:
-            stats['by_office'][office.name] = {
-                'count': count,
-                'amount': float(amount)
-            }
-
-    # Statistics by department
-    departments = Department.objects.all()
-    for department in departments:
-        dept_salaries = queryset.filter(employee__department=department)
-        count = dept_salaries.count()
-        amount = dept_salaries.aggregate(total=Sum('net_salary'))['total'] or 0
-        if count > 0:
-            stats['by_department'][department.name] = {
-                'count': count,
-                'amount': float(amount)
+    # Statistics by office and by department (one grouped query each)
+    for key, field in (('by_office', 'employee__office__name'), ('by_department', 'employee__department__name')):
+        rows = queryset.order_by().exclude(**{f'{field}__isnull': True}).values(field).annotate(
+            count=Count('id'), amount=Sum('net_salary')
+        )
+        for row in rows:
+            stats[key][row[field]] = {
+                'count': row['count'],
+                'amount': float(row['amount'] or 0)
             }
 
-    # Monthly trends (last 6 months)
-    for i in range(6):
-        month_date = current_month - timedelta(days=30 * i)
-        month_salaries = Salary.objects.filter(salary_month=month_date)
-        
-        if user.role == 'manager' and user.office:
-            month_salaries = month_salaries.filter(employee__office=user.office)
-        # Admin and Accountant can see all monthly trends
-        
-        count = month_salaries.count()
-        amount = month_salaries.aggregate(total=Sum('net_salary'))['total'] or 0
-        
-        stats['monthly_trends'][month_date.strftime('%Y-%m')] = {
-            'count': count,
-            'amount': float(amount)
-        }
+    # Monthly trends (last 6 calendar months), served from the cached per-month rollup
+    office_scope = user.office_id if user.role == 'manager' and user.office else None
+    months = previous_months(current_month, 6)
+    rollups = get_monthly_rollups(months, office_id=office_scope)
+    for month_date in months:
+        stats['monthly_trends'][month_date.strftime('%Y-%m')] = rollups[month_date]
 
     return Response(stats, status=status.HTTP_200_OK)
@@ -280,6 +280,8 @@ class DeviceSerializer(serializers.ModelSerializer):
     office_name = serializers.CharField(source='office.name', read_only=True)
     total_users = serializers.SerializerMethodField()
     mapped_users = serializers.SerializerMethodField()
+    last_punch_time = serializers.SerializerMethodField()
+    punches_today = serializers.SerializerMethodField()
     
     class Meta:
         model = Device
@@ -287,15 +289,39 @@ class DeviceSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'last_sync', 'created_at', 'updated_at')
     
     def get_total_users(self, obj):
-        """Get total number of users on this device"""
+        """Get total number of users on this device (annotated by Device.objects.with_stats())"""
+        if hasattr(obj, 'total_users_count'):
+            return obj.total_users_count
         return obj.device_users.count()
     
     def get_mapped_users(self, obj):
         """Get number of mapped users on this device"""
+        if hasattr(obj, 'mapped_users_count'):
+            return obj.mapped_users_count
         return obj.device_users.filter(is_mapped=True).count()
 
+    def get_last_punch_time(self, obj):
+        """Latest raw punch received from this device (annotation only)"""
+        last_punch_time = getattr(obj, 'last_punch_time', None)
+        return last_punch_time.isoformat() if last_punch_time else None
 
-class AttendanceSerializer(serializers.ModelSerializer):
+    def get_punches_today(self, obj):
+        """Raw punches received from this device today (annotation only)"""
+        return getattr(obj, 'punches_today', None)
+
+
+class FieldProjectionMixin:
+    """Drop serializer fields not listed in the `fields` context entry (from ?fields=a,b,c)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.context.get('fields')
+        if requested:
+            for field_name in set(self.fields) - set(requested):
+                self.fields.pop(field_name)
+
+
+class AttendanceSerializer(FieldProjectionMixin, serializers.ModelSerializer):
     """Serializer for Attendance model"""
     user = CustomUserSerializer(read_only=True)  # Include complete user object
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
@@ -310,6 +336,20 @@ class AttendanceSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'total_hours', 'day_status', 'is_late', 'late_minutes', 'created_at', 'updated_at')
 
 
+class AttendanceLeanSerializer(FieldProjectionMixin, serializers.ModelSerializer):
+    """Compact attendance row that references the user by id; user details go in a side-table"""
+    device_name = serializers.CharField(source='device.name', read_only=True, default=None)
+
+    class Meta:
+        model = Attendance
+        fields = [
+            'id', 'user', 'date', 'check_in_time', 'check_out_time', 'total_hours',
+            'status', 'day_status', 'is_late', 'late_minutes', 'device', 'device_name',
+            'notes', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
 class AttendanceCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating attendance records"""
     class Meta:
@@ -1382,6 +1422,7 @@ class SalaryAutoCalculateSerializer(serializers.Serializer):
     department_id = serializers.UUIDField(required=False)
     template_id = serializers.UUIDField(required=False)
     basic_pay = serializers.DecimalField(max_digits=15, decimal_places=2, required=False)
+    dry_run = serializers.BooleanField(default=False, required=False)
     
     def validate_salary_month(self, value):
         """Validate salary month"""
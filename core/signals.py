@@ -1,8 +1,11 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.backends.signals import connection_created
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save, m2m_changed
 from django.dispatch import receiver
 from django.utils import timezone
 from .models import (
-    CustomUser, Attendance, Leave, Document, Notification, AttendanceLog, Resignation, Device
+    CustomUser, Attendance, Leave, Document, Notification, AttendanceLog, Resignation, Device, Salary,
+    Office, Department, Designation, Shift, EmployeeShiftAssignment, DeviceUser, ESSLAttendanceLog,
 )
 from .consumers import broadcast_attendance_update_sync
 from .notification_service import (
@@ -86,6 +89,88 @@ def create_welcome_notification(sender, instance, created, **kwargs):
         )
 
 
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_auth_user(sender, instance, **kwargs):
+    """Role/office/active changes must reach the JWT auth cache immediately"""
+    from .authentication import invalidate_cached_user
+
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_save, sender=Office)
+@receiver(post_delete, sender=Office)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def invalidate_employee_directory(sender, instance, **kwargs):
+    """The directory snapshot shows user, office and department names"""
+    if sender is CustomUser and kwargs.get('update_fields') and set(kwargs['update_fields']) <= {'last_login', 'last_login_ip'}:
+        return
+    from .employee_directory import invalidate_directory
+
+    invalidate_directory()
+
+VERSIONED_MODELS = (
+    Office, Department, Designation, Shift, EmployeeShiftAssignment,
+    Device, DeviceUser, ESSLAttendanceLog, Attendance, CustomUser,
+)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_resource_version(sender, instance, **kwargs):
+    """Invalidate the conditional-GET ETags of list endpoints built from this model"""
+    if sender not in VERSIONED_MODELS:
+        return
+    if sender is CustomUser and kwargs.get('update_fields') and set(kwargs['update_fields']) <= {'last_login', 'last_login_ip'}:
+        return
+    from .conditional import bump_model_version
+
+    bump_model_version(sender)
+
+
+@receiver(m2m_changed, sender=Office.managers.through)
+def bump_office_version_on_managers_change(sender, instance, action, **kwargs):
+    """Manager assignment changes office listings and managers' access scope"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        from .conditional import bump_model_version
+
+        bump_model_version(Office)
+
+
+@receiver(pre_save, sender=CustomUser)
+def remember_user_scope(sender, instance, update_fields=None, **kwargs):
+    """Keep the stored office/active flag so post_save can tell whether attendance rows need re-syncing"""
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not {'office', 'is_active'} & set(update_fields):
+        return  # e.g. last_login updates
+    instance._previous_scope = CustomUser.objects.filter(pk=instance.pk).values('office_id', 'is_active').first()
+
+
+@receiver(post_save, sender=CustomUser)
+def sync_attendance_scope_on_user_change(sender, instance, created, **kwargs):
+    """Re-sync Attendance.office / user_active after the user's office or active flag changed"""
+    previous = getattr(instance, '_previous_scope', None)
+    instance._previous_scope = None
+    if created or previous is None:
+        return
+    if (previous['office_id'], previous['is_active']) == (instance.office_id, instance.is_active):
+        return
+    from .attendance_scope import schedule_user_scope_sync
+
+    user_id = instance.pk
+    transaction.on_commit(lambda: schedule_user_scope_sync(user_id))
+    if previous['office_id'] != instance.office_id:
+        from .salary_rollup import invalidate_employee_salary_rollups
+
+        # Per-office rollups group salaries by the employee's current office
+        transaction.on_commit(lambda: invalidate_employee_salary_rollups(user_id))
+
 @receiver(post_save, sender=Resignation)
 def create_resignation_notification(sender, instance, created, **kwargs):
     """Create notifications for resignation requests"""
@@ -184,3 +269,33 @@ def attendance_deleted(sender, instance, **kwargs):
         
     except Exception as e:
         logger.error(f"Error broadcasting attendance deletion: {e}")
+
+
+@receiver(post_save, sender=Salary)
+@receiver(post_delete, sender=Salary)
+def invalidate_salary_rollup_cache(sender, instance, **kwargs):
+    """Drop the cached payroll rollup for the salary's month"""
+    from .salary_rollup import invalidate_salary_rollup
+
+    invalidate_salary_rollup(instance.salary_month)
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def mark_salary_stale_on_attendance_change(sender, instance, **kwargs):
+    """Flag the employee's salary for the attendance month as needing recalculation"""
+    try:
+        from .payroll import mark_salaries_stale
+
+        mark_salaries_stale([instance.user_id], [instance.date])
+    except Exception as e:
+        logger.error(f"Error marking salary stale for attendance {instance.id}: {e}")
+
+
+@receiver(connection_created)
+def count_new_db_connection(sender, connection, **kwargs):
+    """Count physical connections against the hourly budget (the pooled engine counts its own)"""
+    if not getattr(connection, 'is_pooled', False):
+        from .db_pool.pool import record_unpooled_connection
+
+        record_unpooled_connection(connection.alias)
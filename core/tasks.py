@@ -43,3 +43,65 @@ def send_bulk_notification_emails(notification_ids):
     except Exception as e:
         logger.error(f"Error in send_bulk_notification_emails task: {e}")
         return {'error': str(e)}
+
+
+@shared_task
+def recompute_stale_salaries_task(limit=None):
+    """
+    Recompute salaries flagged as stale by attendance changes (paid salaries are skipped).
+    Production runs the same batch from salary_recompute.timer (recompute_stale_salaries
+    command); with a Celery worker and beat configured it can be scheduled here instead.
+    """
+    from .payroll import recompute_stale_salaries
+
+    try:
+        return recompute_stale_salaries(limit=limit)
+    except Exception as e:
+        logger.error(f"Error in recompute_stale_salaries_task: {e}")
+        return {'error': str(e)}
+
+
+@shared_task
+def generate_salary_slips_task(job_id, salary_month, office_id=None, employee_ids=None, output='zip', requested_by_id=None):
+    """
+    Generate a month's salary slips as a ZIP or per-employee documents.
+    Progress is readable with core.salary_slip_batch.get_batch_progress(job_id).
+    A prefork worker child is daemonic, so the slips render serially here; the
+    per-core pool runs on --pool=solo/threads workers and in generate_salary_slips.
+    """
+    from datetime import date
+    from .models import CustomUser
+    from .salary_slip_batch import SalarySlipBatch, set_batch_progress
+
+    try:
+        requested_by = CustomUser.objects.filter(id=requested_by_id).first() if requested_by_id else None
+        batch = SalarySlipBatch(
+            date.fromisoformat(salary_month),
+            office_id=office_id,
+            employee_ids=employee_ids,
+            output=output,
+            requested_by=requested_by,
+            job_id=job_id,
+        )
+        return batch.execute()
+    except Exception as e:
+        logger.error(f"Error in generate_salary_slips_task: {e}")
+        set_batch_progress(job_id, status='failed', error=str(e))
+        return {'error': str(e)}
+
+
+@shared_task
+def sync_attendance_scope_task(user_id=None, batch_size=2000):
+    """
+    Re-sync the denormalized Attendance.office / user_active columns for one user
+    (queued on office/active changes) or for everyone when user_id is None.
+    """
+    from .attendance_scope import backfill_attendance_scope, sync_user_attendance_scope
+
+    try:
+        if user_id is None:
+            return backfill_attendance_scope(batch_size=batch_size)
+        return {'updated': sync_user_attendance_scope(user_id, batch_size=batch_size)}
+    except Exception as e:
+        logger.error(f"Error in sync_attendance_scope_task: {e}")
+        return {'error': str(e)}
@@ -0,0 +1,311 @@
+import os
+import uuid
+
+from django.test import SimpleTestCase, TestCase
+
+from core.authentication import CACHED_USER_FIELDS, hydrate_cached_user
+
+
+class HydrateCachedUserTests(SimpleTestCase):
+    """The cached auth row must land on the right CustomUser attributes"""
+
+    def test_fields_survive_hydration(self):
+        user_id = uuid.uuid4()
+        office_id = uuid.uuid4()
+        department_id = uuid.uuid4()
+        values = {
+            'id': user_id,
+            'username': 'manager1',
+            'email': 'manager1@example.com',
+            'first_name': 'Asha',
+            'last_name': 'Nair',
+            'role': 'manager',
+            'office_id': office_id,
+            'department_id': department_id,
+            'designation_id': None,
+            'employee_id': 'EMP00001',
+            'biometric_id': '17',
+            'is_active': True,
+            'is_staff': False,
+            'is_superuser': False,
+        }
+        self.assertEqual(set(values), set(CACHED_USER_FIELDS))
+
+        user = hydrate_cached_user(values)
+
+        self.assertEqual(user.pk, user_id)
+        self.assertEqual(user.role, 'manager')
+        self.assertEqual(user.office_id, office_id)
+        self.assertEqual(user.department_id, department_id)
+        self.assertIs(user.is_superuser, False)
+        self.assertIs(user.is_staff, False)
+        self.assertIs(user.is_active, True)
+        self.assertEqual((user.first_name, user.last_name, user.email), ('Asha', 'Nair', 'manager1@example.com'))
+        self.assertFalse(user._state.adding)
+        self.assertIn('salary', user.get_deferred_fields())
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    """Brotli only for JSON, padded gzip for the rest, nothing for auth responses"""
+
+    def setUp(self):
+        from django.test import RequestFactory
+        self.factory = RequestFactory()
+
+    def _response(self, path, content_type, accept_encoding):
+        from django.http import HttpResponse
+        from core.middleware import CompressionMiddleware
+
+        body = b'{"results": [' + b'{"name": "Asha Nair", "office": "Head Office"},' * 200 + b'{}]}'
+        middleware = CompressionMiddleware(lambda request: HttpResponse(body, content_type=content_type))
+        return middleware(self.factory.get(path, HTTP_ACCEPT_ENCODING=accept_encoding))
+
+    def test_json_uses_brotli(self):
+        response = self._response('/api/offices/', 'application/json', 'gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+
+    def test_html_uses_padded_gzip(self):
+        import gzip
+
+        response = self._response('/admin/core/customuser/', 'text/html', 'gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response.content[3] & gzip.FNAME)  # GZipMiddleware's random filename padding
+
+    def test_auth_responses_are_not_compressed(self):
+        response = self._response('/api/auth/login/', 'application/json', 'gzip, br')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class PrimaryPinTests(SimpleTestCase):
+    """The read-your-writes pin travels in a signed cookie, so any worker honours it"""
+
+    def _user(self):
+        from core.models import CustomUser
+        return CustomUser(id=uuid.uuid4(), username='writer', role='employee')
+
+    def test_cookie_pins_only_its_user(self):
+        from unittest import mock
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from core.db_routers import PIN_COOKIE_NAME, pin_user_to_primary, user_pinned_to_primary
+
+        user = self._user()
+        with mock.patch('core.db_routers.reporting_alias', return_value='reporting'):
+            response = HttpResponse()
+            pin_user_to_primary(user, response)
+        cookie = response.cookies[PIN_COOKIE_NAME]
+
+        request = RequestFactory().get('/api/reports/')
+        request.COOKIES[PIN_COOKIE_NAME] = cookie.value
+        self.assertTrue(user_pinned_to_primary(user, request))
+        self.assertFalse(user_pinned_to_primary(self._user(), request))
+
+        request.COOKIES[PIN_COOKIE_NAME] = str(user.pk)  # unsigned
+        self.assertFalse(user_pinned_to_primary(user, request))
+
+
+class _FakeRawConnection:
+    def __init__(self):
+        self.closed = False
+
+    def ping(self):
+        if self.closed:
+            raise OSError('connection closed')
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Checkout reuses idle connections, stays bounded and reports the hourly budget"""
+
+    def _pool(self, **options):
+        from core.db_pool.pool import ConnectionPool
+
+        return ConnectionPool(f'test-{uuid.uuid4()}', lambda params: _FakeRawConnection(), options)
+
+    def test_checkout_reuses_released_connection(self):
+        pool = self._pool()
+        raw, reused = pool.checkout({})
+        self.assertFalse(reused)
+        pool.release(raw)
+
+        again, reused = pool.checkout({})
+        self.assertIs(again, raw)
+        self.assertTrue(reused)
+        self.assertEqual((pool.stats['opened'], pool.stats['reused']), (1, 1))
+
+    def test_discard_closes_connection(self):
+        pool = self._pool()
+        raw, _ = pool.checkout({})
+        pool.release(raw, discard=True)
+
+        self.assertTrue(raw.closed)
+        self.assertEqual(pool.size, 0)
+        replacement, reused = pool.checkout({})
+        self.assertIsNot(replacement, raw)
+        self.assertFalse(reused)
+
+    def test_full_pool_times_out(self):
+        pool = self._pool(MAX_SIZE=1, CHECKOUT_TIMEOUT=0.05)
+        pool.checkout({})
+
+        with self.assertRaises(TimeoutError):
+            pool.checkout({})
+        self.assertEqual(pool.stats['timeouts'], 1)
+
+    def test_budget_warns_then_errors_once_each(self):
+        pool = self._pool(MAX_SIZE=10, HOURLY_BUDGET=5, ALERT_RATIO=0.6)
+
+        with self.assertLogs('core.db_pool.pool', level='WARNING') as logs:
+            for _ in range(6):
+                raw, _ = pool.checkout({})
+                pool.release(raw, discard=True)
+
+        levels = [record.levelname for record in logs.records]
+        self.assertEqual(levels, ['WARNING', 'ERROR'])
+        self.assertIn('exhausted', logs.records[1].getMessage())
+
+
+class EndpointQueryBudgetTests(TestCase):
+    """List endpoints keep a flat query count as rows grow (no per-row lookups)
+
+    Device list budget includes the conditional-GET version queries.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        from core.models import CustomUser, Device, Office
+
+        cls.admin = CustomUser.objects.create_user(username='admin1', password='x', role='admin')
+        for n in range(3):
+            office = Office.objects.create(name=f'Office {n}', address='Main Road')
+            manager = CustomUser.objects.create_user(
+                username=f'manager{n}', password='x', role='manager', office=office
+            )
+            office.managers.add(manager)
+            for m in range(2):
+                Device.objects.create(
+                    name=f'Device {n}-{m}', device_type='zkteco', ip_address=f'10.0.{n}.{m + 1}', office=office
+                )
+                CustomUser.objects.create_user(
+                    username=f'employee{n}{m}', password='x', role='employee', office=office,
+                    employee_id=f'EMP{n}{m}',
+                )
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_device_list(self):
+        from core.query_instrumentation import assert_endpoint_query_budget
+
+        response = assert_endpoint_query_budget(self.client, '/api/devices/', 8, max_duplicates=0)
+        self.assertEqual(response.status_code, 200)
+
+    def test_office_list(self):
+        from core.query_instrumentation import assert_endpoint_query_budget
+
+        response = assert_endpoint_query_budget(self.client, '/api/offices/', 3, max_duplicates=0)
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_list(self):
+        from core.query_instrumentation import assert_endpoint_query_budget
+
+        response = assert_endpoint_query_budget(self.client, '/api/users/', 2, max_duplicates=0)
+        self.assertEqual(response.status_code, 200)
+
+
+class ServeFileTests(SimpleTestCase):
+    """Range/If-Range/304 handling and the front-end server offload branches"""
+
+    def setUp(self):
+        import tempfile
+        from django.test import RequestFactory
+
+        self.factory = RequestFactory()
+        self.media_root = tempfile.mkdtemp()
+        self.private_root = tempfile.mkdtemp()
+        self.addCleanup(self._cleanup)
+        self.body = bytes(range(256)) * 4
+        self.path = self._write(self.media_root, 'slip.pdf')
+        self.private_path = self._write(self.private_root, 'pdf_cache.pdf')
+
+    def _cleanup(self):
+        import shutil
+
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        shutil.rmtree(self.private_root, ignore_errors=True)
+
+    def _write(self, root, name):
+        path = os.path.join(root, name)
+        with open(path, 'wb') as handle:
+            handle.write(self.body)
+        return path
+
+    def _serve(self, path=None, mode='django', **headers):
+        from django.test import override_settings
+        from core.file_serving import serve_file
+
+        request = self.factory.get('/api/documents/1/download/', **headers)
+        with override_settings(FILE_SERVING_MODE=mode, MEDIA_ROOT=self.media_root,
+                               PRIVATE_MEDIA_ROOT=self.private_root):
+            return serve_file(request, path or self.path, 'slip.pdf')
+
+    def test_full_response(self):
+        response = self._serve()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.body)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_range_returns_partial_content(self):
+        response = self._serve(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.body)}')
+        self.assertEqual(b''.join(response.streaming_content), self.body[10:20])
+
+    def test_suffix_range(self):
+        response = self._serve(HTTP_RANGE='bytes=-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.body[-5:])
+
+    def test_stale_if_range_gets_whole_file(self):
+        response = self._serve(HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.body)
+
+    def test_matching_if_range_honours_range(self):
+        etag = self._serve()['ETag']
+        response = self._serve(HTTP_RANGE='bytes=0-3', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+
+    def test_unsatisfiable_range(self):
+        response = self._serve(HTTP_RANGE=f'bytes={len(self.body)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.body)}')
+
+    def test_matching_etag_is_not_modified(self):
+        etag = self._serve()['ETag']
+        response = self._serve(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_x_accel_redirect(self):
+        response = self._serve(mode='x-accel')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/slip.pdf')
+        self.assertEqual(response.content, b'')
+
+    def test_x_sendfile(self):
+        response = self._serve(mode='x-sendfile')
+        self.assertEqual(response['X-Sendfile'], os.path.realpath(self.path))
+        self.assertEqual(response.content, b'')
+
+    def test_private_files_are_streamed_by_django(self):
+        for mode in ('x-accel', 'x-sendfile'):
+            with self.subTest(mode=mode):
+                response = self._serve(self.private_path, mode=mode)
+                self.assertFalse(response.has_header('X-Accel-Redirect'))
+                self.assertFalse(response.has_header('X-Sendfile'))
+                self.assertEqual(b''.join(response.streaming_content), self.body)
@@ -23,6 +23,10 @@ from .views import (
     DepartmentViewSet,
     DesignationViewSet,
     debug_user_permissions,
+    db_pool_status,
+    conditional_get_status,
+    metrics_status,
+    prometheus_metrics,
     ShiftViewSet,
     EmployeeShiftAssignmentViewSet,
 )
@@ -33,6 +37,7 @@ from .salary_views import (
     SalaryPaymentView,
     SalaryBulkCreateView,
     SalaryAutoCalculateView,
+    StaleSalaryListView,
     SalaryTemplateListView,
     SalaryTemplateDetailView,
     SalaryReportView,
@@ -137,6 +142,7 @@ urlpatterns = [
     path('api/salaries/<uuid:pk>/payment/', SalaryPaymentView.as_view(), name='salary-payment'),
     path('api/salaries/bulk-create/', SalaryBulkCreateView.as_view(), name='salary-bulk-create'),
     path('api/salaries/auto-calculate/', SalaryAutoCalculateView.as_view(), name='salary-auto-calculate'),
+    path('api/salaries/stale/', StaleSalaryListView.as_view(), name='salary-stale'),
     path('api/salaries/<uuid:salary_id>/recalculate/', recalculate_salary, name='salary-recalculate'),
     path('api/salaries/employee/<uuid:employee_id>/history/', employee_salary_history, name='employee-salary-history'),
     path('api/salaries/reports/', SalaryReportView.as_view(), name='salary-reports'),
@@ -150,4 +156,8 @@ urlpatterns = [
     
     # Debug endpoint
     path('api/debug/user-permissions/', debug_user_permissions, name='debug-user-permissions'),
+    path('api/system/db-pool/', db_pool_status, name='db-pool-status'),
+    path('api/system/conditional-get/', conditional_get_status, name='conditional-get-status'),
+    path('api/system/metrics/', metrics_status, name='metrics-status'),
+    path('metrics/', prometheus_metrics, name='prometheus-metrics'),
 ]
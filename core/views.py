@@ -5,7 +5,6 @@ from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import rest_framework as django_filters
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.db.models import Sum, Count, Q
@@ -27,7 +26,7 @@ from .models import (
 from .serializers import (
     CustomUserSerializer, OfficeSerializer, DeviceSerializer, DeviceUserSerializer,
     DeviceUserCreateSerializer, DeviceUserMappingSerializer, DeviceUserBulkCreateSerializer,
-    AttendanceSerializer, AttendanceCreateSerializer, BulkAttendanceSerializer, WorkingHoursSettingsSerializer,
+    AttendanceSerializer, AttendanceLeanSerializer, AttendanceCreateSerializer, BulkAttendanceSerializer, WorkingHoursSettingsSerializer,
     ESSLAttendanceLogSerializer, LeaveSerializer, LeaveCreateSerializer, LeaveApprovalSerializer,
     DocumentSerializer, DocumentCreateSerializer, NotificationSerializer, SystemSettingsSerializer,
     UserRegistrationSerializer, UserProfileSerializer, PasswordChangeSerializer,
@@ -40,6 +39,16 @@ from .serializers import (
 # Permissions are defined inline in this file
 from .zkteco_service import zkteco_service
 from .db_manager import DatabaseConnectionManager
+from .month_calendar import get_month_calendar, build_monthly_attendance
+from .pagination import AttendanceKeysetPagination
+from .payroll import mark_salaries_stale
+from .permissions import (
+    IsAdminOnly, IsAdminOrManager, IsAdminOrManagerOrAccountant, IsSuperuserOrAdminOrManager
+)
+from .access_scope import AccessScopeMixin
+from .conditional import ConditionalGetMixin, bump_model_version
+from .authentication import ScopedRefreshToken
+from .db_routers import ReportingReadMixin
 
 logger = logging.getLogger(__name__)
 
@@ -104,49 +113,7 @@ class CustomUserFilter(django_filters.FilterSet):
         )
 
 
-class IsAdminUser(IsAuthenticated):
-    """Permission to only allow admin users"""
-    def has_permission(self, request, view):
-        return super().has_permission(request, view) and request.user.is_admin
-
-
-class IsManagerUser(IsAuthenticated):
-    """Permission to only allow manager users"""
-    def has_permission(self, request, view):
-        return super().has_permission(request, view) and request.user.is_manager
-
-
-class IsAdminOrManager(IsAuthenticated):
-    """Permission to allow admin or manager users"""
-    def has_permission(self, request, view):
-        return super().has_permission(request, view) and (
-            request.user.is_admin or request.user.is_manager
-        )
-
-
-class IsAccountantUser(IsAuthenticated):
-    """Permission to only allow accountant users"""
-    def has_permission(self, request, view):
-        return super().has_permission(request, view) and request.user.is_accountant
-
-
-class IsAdminOrManagerOrAccountant(IsAuthenticated):
-    """Permission to allow admin, manager, or accountant users"""
-    def has_permission(self, request, view):
-        return super().has_permission(request, view) and (
-            request.user.is_admin or request.user.is_manager or request.user.is_accountant
-        )
-
-
-class IsSuperuserOrAdminOrManager(IsAuthenticated):
-    """Permission to allow superuser, admin, or manager users"""
-    def has_permission(self, request, view):
-        return super().has_permission(request, view) and (
-            request.user.is_superuser or request.user.is_admin or request.user.is_manager
-        )
-
-
-class ReportsViewSet(viewsets.ViewSet):
+class ReportsViewSet(ReportingReadMixin, viewsets.ViewSet):
     """ViewSet for generating reports - Admin, Manager, and Accountant access"""
     permission_classes = [IsAdminOrManagerOrAccountant]
 
@@ -162,12 +129,12 @@ class ReportsViewSet(viewsets.ViewSet):
             status_filter = request.query_params.get('status')
 
             # Build query - only show attendance for active users
-            queryset = Attendance.objects.select_related('user', 'user__office', 'user__department').filter(user__is_active=True)
+            queryset = Attendance.objects.filter(user_active=True)
 
             # For managers, restrict to their assigned office
             if request.user.is_manager and not request.user.is_admin:
                 if request.user.office:
-                    queryset = queryset.filter(user__office=request.user.office)
+                    queryset = queryset.filter(office=request.user.office)
                 else:
                     # If manager has no office assigned, return empty result
                     return Response({
@@ -185,7 +152,7 @@ class ReportsViewSet(viewsets.ViewSet):
             elif request.user.is_admin:
                 # Admins can see all data, apply office filter if specified
                 if office_id:
-                    queryset = queryset.filter(user__office_id=office_id)
+                    queryset = queryset.filter(office_id=office_id)
 
             # Apply filters with proper date handling
             if start_date:
@@ -205,85 +172,83 @@ class ReportsViewSet(viewsets.ViewSet):
             if status_filter:
                 queryset = queryset.filter(status=status_filter)
 
-            # Get data with safe date handling
-            attendance_data = []
-            for attendance in queryset:
-                try:
-                    data = {
-                        'id': str(attendance.id),
-                        'date': attendance.date.isoformat() if attendance.date else None,
-                        'check_in_time': attendance.check_in_time.isoformat() if attendance.check_in_time else None,
-                        'check_out_time': attendance.check_out_time.isoformat() if attendance.check_out_time else None,
-                        'status': attendance.status,
-                        'user__id': str(attendance.user.id) if attendance.user else None,
-                        'user__first_name': attendance.user.first_name if attendance.user else None,
-                        'user__last_name': attendance.user.last_name if attendance.user else None,
-                        'user__employee_id': attendance.user.employee_id if attendance.user else None,
-                        'user__office__name': attendance.user.office.name if attendance.user and attendance.user.office else None,
-                        'user__department__name': attendance.user.department.name if attendance.user and attendance.user.department else None,
-                    }
-                    attendance_data.append(data)
-                except Exception as e:
-                    logger.warning(f"Error processing attendance record {attendance.id}: {e}")
-                    continue
-
-            # Calculate statistics
-            total_records = len(attendance_data)
-            present_count = sum(1 for a in attendance_data if a['status'] == 'present')
-            absent_count = sum(1 for a in attendance_data if a['status'] == 'absent')
-            late_count = sum(1 for a in attendance_data if a['status'] == 'late')
-            attendance_rate = (present_count / total_records * 100) if total_records > 0 else 0
+            # Summary and daily stats come from one GROUP BY date, status query
+            grouped = queryset.order_by().values('date', 'status').annotate(count=Count('id'))
 
-            # Group by date with safe date handling
+            total_records = 0
+            status_totals = {'present': 0, 'absent': 0, 'late': 0}
             daily_stats = {}
-            for record in attendance_data:
-                try:
-                    date = record['date']
-                    if date:
-                        # Extract just the date part if it's a full datetime string
-                        if 'T' in date:
-                            date = date.split('T')[0]
-                        
-                        if date not in daily_stats:
-                            daily_stats[date] = {'present': 0, 'absent': 0, 'late': 0, 'total': 0}
-                        daily_stats[date][record['status']] += 1
-                        daily_stats[date]['total'] += 1
-                except Exception as e:
-                    logger.warning(f"Error processing date for record: {e}")
+            for row in grouped:
+                count = row['count']
+                total_records += count
+                if row['status'] not in status_totals:
                     continue
+                status_totals[row['status']] += count
+                day = daily_stats.setdefault(row['date'], {'present': 0, 'absent': 0, 'late': 0, 'total': 0})
+                day[row['status']] += count
+                day['total'] += count
 
-            # Convert to list format
             daily_stats_list = []
-            for date, stats in daily_stats.items():
-                try:
-                    rate = (stats['present'] / stats['total'] * 100) if stats['total'] > 0 else 0
-                    daily_stats_list.append({
-                        'date': date,
-                        'present': stats['present'],
-                        'absent': stats['absent'],
-                        'late': stats['late'],
-                        'total': stats['total'],
-                        'rate': round(rate, 2)
-                    })
-                except Exception as e:
-                    logger.warning(f"Error calculating stats for date {date}: {e}")
-                    continue
+            for day_date in sorted(daily_stats):
+                stats = daily_stats[day_date]
+                rate = (stats['present'] / stats['total'] * 100) if stats['total'] > 0 else 0
+                daily_stats_list.append({
+                    'date': day_date.isoformat(),
+                    'present': stats['present'],
+                    'absent': stats['absent'],
+                    'late': stats['late'],
+                    'total': stats['total'],
+                    'rate': round(rate, 2)
+                })
 
-            # Sort by date
-            daily_stats_list.sort(key=lambda x: x['date'])
+            present_count = status_totals['present']
+            attendance_rate = (present_count / total_records * 100) if total_records > 0 else 0
 
-            return Response({
+            response_data = {
                 'type': 'attendance',
                 'summary': {
                     'totalRecords': total_records,
                     'presentCount': present_count,
-                    'absentCount': absent_count,
-                    'lateCount': late_count,
+                    'absentCount': status_totals['absent'],
+                    'lateCount': status_totals['late'],
                     'attendanceRate': round(attendance_rate, 2)
                 },
                 'dailyStats': daily_stats_list,
-                'rawData': attendance_data
-            })
+                'rawData': []
+            }
+
+            # Raw rows are opt-in (?include_raw=true) and paginated with raw_page/raw_page_size
+            if request.query_params.get('include_raw', '').lower() == 'true':
+                try:
+                    raw_page = max(1, int(request.query_params.get('raw_page', 1)))
+                    raw_page_size = min(5000, max(1, int(request.query_params.get('raw_page_size', 500))))
+                except (TypeError, ValueError):
+                    raw_page, raw_page_size = 1, 500
+                offset = (raw_page - 1) * raw_page_size
+                raw_rows = queryset.order_by('date', 'id').values(
+                    'id', 'date', 'check_in_time', 'check_out_time', 'status', 'user__id',
+                    'user__first_name', 'user__last_name', 'user__employee_id',
+                    'user__office__name', 'user__department__name'
+                )[offset:offset + raw_page_size]
+                response_data['rawData'] = [
+                    {
+                        **row,
+                        'id': str(row['id']),
+                        'date': row['date'].isoformat() if row['date'] else None,
+                        'check_in_time': row['check_in_time'].isoformat() if row['check_in_time'] else None,
+                        'check_out_time': row['check_out_time'].isoformat() if row['check_out_time'] else None,
+                        'user__id': str(row['user__id']) if row['user__id'] else None,
+                    }
+                    for row in raw_rows
+                ]
+                response_data['rawDataPagination'] = {
+                    'page': raw_page,
+                    'page_size': raw_page_size,
+                    'total': total_records,
+                    'has_next': offset + raw_page_size < total_records,
+                }
+
+            return Response(response_data)
 
         except Exception as e:
             logger.error(f"Error generating attendance report: {str(e)}")
@@ -782,11 +747,11 @@ class ReportsViewSet(viewsets.ViewSet):
             user_id = request.query_params.get('user')
             
             # Build query - only show attendance for active users
-            queryset = Attendance.objects.select_related('user', 'user__office', 'device').filter(user__is_active=True)
+            queryset = Attendance.objects.select_related('user', 'user__office', 'device').filter(user_active=True)
             
             # Apply filters
             if office_id:
-                queryset = queryset.filter(user__office_id=office_id)
+                queryset = queryset.filter(office_id=office_id)
             if user_id:
                 queryset = queryset.filter(user_id=user_id)
             
@@ -830,45 +795,46 @@ class ReportsViewSet(viewsets.ViewSet):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class OfficeViewSet(viewsets.ModelViewSet):
+class OfficeViewSet(ConditionalGetMixin, AccessScopeMixin, viewsets.ModelViewSet):
     """ViewSet for Office model"""
     queryset = Office.objects.all()
     serializer_class = OfficeSerializer
+    conditional_models = (Office, CustomUser)  # managers_data shows manager names
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'address', 'email']
     ordering_fields = ['name', 'created_at']
 
+    def get_conditional_sources(self):
+        """
+        managers_data follows Office.managers, and adding or removing a manager
+        touches neither table's updated_at or row count: without shared counters
+        (bumped on m2m_changed) there is no safe tag.
+        """
+        return None
+
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
-            return [IsAdminUser()]  # Only admin can modify offices
+            return [IsAdminOnly()]  # Only admin can modify offices
         elif self.action in ['list', 'retrieve']:
             return [IsAdminOrManagerOrAccountant()]  # Admin, manager, and accountant can view
         return [permissions.IsAuthenticated()]
 
     def get_queryset(self):
         """Get queryset based on user role"""
-        user = self.request.user
-        
-        if user.is_admin:
-            # Admin can see all offices
-            return Office.objects.all()
-        elif user.is_manager:
-            # Manager can only see their assigned office
-            if user.office:
-                return Office.objects.filter(id=user.office.id)
-            else:
-                # If manager has no office assigned, return empty queryset
-                return Office.objects.none()
-        elif user.is_accountant:
-            # Accountant can see all offices (read-only)
-            return Office.objects.all()
-        else:
-            # Regular employees can see their assigned office
-            if user.office:
-                return Office.objects.filter(id=user.office.id)
-            else:
-                # If employee has no office assigned, return empty queryset
-                return Office.objects.none()
+        scope = self.access_scope
+        # managers and managers_data both read the m2m: one prefetch instead of two queries per office
+        offices = Office.objects.prefetch_related('managers')
+
+        if scope.is_admin or scope.is_accountant:
+            # Admin can see all offices; accountant read-only
+            return offices
+        if scope.is_manager:
+            # Manager sees their own and managed offices
+            return scope.filter(offices, office_field='id')
+        # Regular employees can see their assigned office
+        if scope.office_id:
+            return offices.filter(id=scope.office_id)
+        return Office.objects.none()
 
     @action(detail=True, methods=['get'])
     def stats(self, request, pk=None):
@@ -880,14 +846,14 @@ class OfficeViewSet(viewsets.ModelViewSet):
             'office_name': office.name,
             'total_employees': CustomUser.objects.filter(office=office, role='employee', is_active=True).count(),
             'present_today': Attendance.objects.filter(
-                user__office=office, 
-                user__is_active=True,
+                office=office, 
+                user_active=True,
                 date=timezone.now().date(), 
                 status='present'
             ).count(),
             'absent_today': Attendance.objects.filter(
-                user__office=office, 
-                user__is_active=True,
+                office=office, 
+                user_active=True,
                 date=timezone.now().date(), 
                 status='absent'
             ).count(),
@@ -937,7 +903,7 @@ class OfficeViewSet(viewsets.ModelViewSet):
         return Response(debug_data)
 
 
-class CustomUserViewSet(viewsets.ModelViewSet):
+class CustomUserViewSet(AccessScopeMixin, viewsets.ModelViewSet):
     """ViewSet for CustomUser model"""
     serializer_class = CustomUserSerializer
     filter_backends = [filters.OrderingFilter, DjangoFilterBackend]
@@ -955,71 +921,31 @@ class CustomUserViewSet(viewsets.ModelViewSet):
         """Override list method to ensure all users are returned without pagination"""
         queryset = self.get_queryset()
         
-        # Debug logging for filtering
-        query_params = getattr(request, 'query_params', request.GET)
-        logger.info(f"CustomUserViewSet - User: {request.user.username} (admin: {request.user.is_admin})")
-        logger.info(f"CustomUserViewSet - Query params: {query_params}")
-        logger.info(f"CustomUserViewSet - Initial queryset count: {queryset.count()}")
-        
         # Apply filters
+        query_params = getattr(request, 'query_params', request.GET)
         filterset = self.filterset_class(query_params, queryset=queryset, request=request)
         if filterset.is_valid():
             queryset = filterset.qs
-            logger.info(f"CustomUserViewSet - Filtered queryset count: {queryset.count()}")
         else:
             logger.warning(f"CustomUserViewSet - Filter errors: {filterset.errors}")
         
-        # Additional debug for all users
-        logger.info(f"CustomUserViewSet.list - Final queryset count: {queryset.count()}")
-        if queryset.exists():
-            logger.info(f"CustomUserViewSet.list - Returning {queryset.count()} users")
-            # Log first few users for debugging
-            for user_obj in queryset[:3]:
-                logger.info(f"CustomUserViewSet.list - User: {user_obj.username} ({user_obj.first_name} {user_obj.last_name}) - Office: {user_obj.office}")
-        else:
-            logger.warning("CustomUserViewSet.list - No users found in queryset")
-        
         serializer = self.get_serializer(queryset, many=True, context={'request': request})
         return Response(serializer.data)
 
     def get_queryset(self):
-        user = self.request.user
         queryset = CustomUser.objects.select_related('office', 'department', 'designation')
-        
-        logger.info(f"CustomUserViewSet.get_queryset - User: {user.username}, Role: {user.role}, Is Manager: {user.is_manager}")
-        logger.info(f"CustomUserViewSet.get_queryset - User office: {user.office}")
-        
-        if user.is_admin:
-            queryset = queryset.all()
-            logger.info("CustomUserViewSet.get_queryset - Admin: returning all users")
-        elif user.is_manager:
-            # Managers can see users from their assigned office + themselves
-            if user.office:
-                queryset = queryset.filter(
-                    Q(office=user.office) | Q(id=user.id)
-                )
-                logger.info(f"CustomUserViewSet.get_queryset - Manager: filtering by office {user.office.id}")
-            else:
-                # If manager has no office, they can only see themselves
-                queryset = queryset.filter(id=user.id)
-                logger.info("CustomUserViewSet.get_queryset - Manager: no office, returning only self")
-        elif user.is_accountant:
-            # Accountant can see all users from all offices (read-only)
-            queryset = queryset.all()
-            logger.info("CustomUserViewSet.get_queryset - Accountant: returning all users")
-        else:
-            queryset = queryset.filter(id=user.id)
-            logger.info("CustomUserViewSet.get_queryset - Employee: returning only self")
-        
-        logger.info(f"CustomUserViewSet.get_queryset - Final queryset count: {queryset.count()}")
-        return queryset
+        # Admin/accountant: all users; manager: their offices + themselves; employee: themselves
+        return self.access_scope.filter(
+            queryset, office_field='office', user_field='id',
+            see_all=('admin', 'accountant'), manager_includes_own=True,
+        )
 
     def get_permissions(self):
         if self.action in ['login', 'register']:
             return [permissions.AllowAny()]
         elif self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [IsAdminOrManager()]  # Only admin/manager can modify users
-        elif self.action in ['list', 'retrieve']:
+        elif self.action in ['list', 'retrieve', 'directory']:
             return [IsAdminOrManagerOrAccountant()]  # Admin, manager, and accountant can view
         return [permissions.IsAuthenticated()]
 
@@ -1029,7 +955,7 @@ class CustomUserViewSet(viewsets.ModelViewSet):
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            refresh = RefreshToken.for_user(user)
+            refresh = ScopedRefreshToken.for_user(user)
             return Response({
                 'user': CustomUserSerializer(user).data,
                 'refresh': str(refresh),
@@ -1059,7 +985,7 @@ class CustomUserViewSet(viewsets.ModelViewSet):
                     'error': 'Access denied. Employee dashboard is only for employee users.'
                 }, status=status.HTTP_403_FORBIDDEN)
             
-            refresh = RefreshToken.for_user(user)
+            refresh = ScopedRefreshToken.for_user(user)
             return Response({
                 'user': CustomUserSerializer(user).data,
                 'refresh': str(refresh),
@@ -1079,6 +1005,29 @@ class CustomUserViewSet(viewsets.ModelViewSet):
         serializer = CustomUserSerializer(request.user, context={'request': request})
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def directory(self, request):
+        """
+        Lightweight user list for dropdowns (id, name, employee_id, office, department, role, active).
+        Served from a cached snapshot rebuilt after user changes; send If-None-Match for a 304.
+        """
+        from django.http import HttpResponse, HttpResponseNotModified
+        from .conditional import etag_matches
+        from .employee_directory import directory_body, directory_etag, get_snapshot
+
+        scope = self.access_scope
+        snapshot = get_snapshot()
+        etag = directory_etag(scope, snapshot)
+        if etag_matches(etag, request.headers.get('If-None-Match')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(directory_body(scope, snapshot), content_type='application/json')
+        response['ETag'] = etag
+        # Clients keep their copy but must revalidate; a 304 costs no queries beyond the scope
+        response['Cache-Control'] = 'private, no-cache'
+        response['Vary'] = 'Authorization'
+        return response
+
     @action(detail=False, methods=['put', 'patch'], parser_classes=[MultiPartParser, FormParser, JSONParser])
     def update_profile(self, request):
         """Update current user profile"""
@@ -1415,30 +1364,39 @@ class CustomUserViewSet(viewsets.ModelViewSet):
         })
 
 
-class DeviceViewSet(viewsets.ModelViewSet):
+class DeviceViewSet(ConditionalGetMixin, AccessScopeMixin, viewsets.ModelViewSet):
     """ViewSet for Device model"""
     serializer_class = DeviceSerializer
+    # with_stats(): user counts and punch figures
+    conditional_models = (Device, Office, DeviceUser, ESSLAttendanceLog)
+
+    def get_conditional_sources(self):
+        """Raw punches narrowed to today's, through the (device, punch_time) index"""
+        from datetime import time as dt_time
+
+        day_start = timezone.make_aware(datetime.combine(timezone.localdate(), dt_time.min))
+        device_ids = list(Device.objects.values_list('id', flat=True))
+        return [
+            Device.objects.all(),
+            # push/fetch record last_sync with update_fields, which leaves updated_at alone
+            (Device.objects.all(), 'last_sync'),
+            Office.objects.all(),
+            DeviceUser.objects.all(),
+            ESSLAttendanceLog.objects.filter(device_id__in=device_ids, punch_time__gte=day_start),
+        ]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'ip_address', 'serial_number']
     ordering_fields = ['name', 'created_at']
 
     def get_queryset(self):
-        user = self.request.user
-        print(f"DeviceViewSet.get_queryset() - User: {user.username}, Role: {getattr(user, 'role', 'No role')}, Is Admin: {getattr(user, 'is_admin', 'No is_admin property')}")
-        
-        if user.is_admin:
-            print(f"User {user.username} is admin, returning all devices")
-            return Device.objects.all()
-        elif user.is_manager:
-            print(f"User {user.username} is manager, returning office devices")
-            return Device.objects.filter(office=user.office)
-        else:
-            print(f"User {user.username} has no access to devices")
-            return Device.objects.none()
+        queryset = Device.objects.select_related('office')
+        if self.action in ['list', 'retrieve']:
+            queryset = queryset.with_stats()
+        return self.access_scope.filter(queryset, office_field='office')
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
-            return [IsAdminUser()]  # Only admin can modify devices
+            return [IsAdminOnly()]  # Only admin can modify devices
         return [permissions.IsAuthenticated()]
 
     @action(detail=True, methods=['post'])
@@ -1460,28 +1418,36 @@ class DeviceViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+class AttendanceViewSet(ConditionalGetMixin, AccessScopeMixin, viewsets.ModelViewSet):
     """ViewSet for Attendance model"""
     serializer_class = AttendanceSerializer
+    conditional_models = (Attendance, CustomUser, Office, Device)
+    conditional_actions = ('list', 'retrieve', 'today')
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['user__first_name', 'user__last_name', 'notes']
     ordering_fields = ['date', 'check_in_time', 'check_out_time']
     pagination_class = None  # Disable pagination for attendance data
 
+    def get_conditional_sources(self):
+        """Only the rows the action shows; the unfiltered list would aggregate the whole table"""
+        if self.action == 'today':
+            attendance = Attendance.objects.filter(date=timezone.now().date())
+        elif self.action == 'retrieve':
+            import uuid
+            try:
+                pk = uuid.UUID(str(self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)))
+            except ValueError:
+                return None  # get_object() answers the 404
+            attendance = Attendance.objects.filter(pk=pk)
+        else:
+            return None
+        return [attendance, CustomUser.objects.all(), Office.objects.all(), Device.objects.all()]
+
     def get_queryset(self):
-        user = self.request.user
         # Base queryset - only show attendance for active users
-        base_queryset = Attendance.objects.select_related('user', 'user__office', 'device').filter(user__is_active=True)
-        
-        if user.is_admin:
-            return base_queryset
-        elif user.is_manager:
-            return base_queryset.filter(user__office=user.office)
-        elif user.is_accountant:
-            # Accountant can only see their own attendance (like employee)
-            return base_queryset.filter(user=user)
-        else:
-            return base_queryset.filter(user=user)
+        base_queryset = Attendance.objects.select_related('user', 'user__office', 'device').filter(user_active=True)
+        # Accountants, like employees, only see their own attendance here
+        return self.access_scope.filter(base_queryset, office_field='office', user_field='user')
 
     def list(self, request, *args, **kwargs):
         """Override list method to limit data and prevent large responses"""
@@ -1508,7 +1474,7 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         if user_id:
             queryset = queryset.filter(user_id=user_id)
         if office_id:
-            queryset = queryset.filter(user__office_id=office_id)
+            queryset = queryset.filter(office_id=office_id)
         if status:
             queryset = queryset.filter(status=status)
         if day_status:
@@ -1518,6 +1484,19 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         if device_id:
             queryset = queryset.filter(device_id=device_id)
         
+        lean = request.query_params.get('lean', '').lower() == 'true'
+        use_cursor = 'cursor' in request.query_params or request.query_params.get('paginate') == 'cursor'
+        if lean:
+            # Lean rows carry only the user id, so skip the user joins
+            queryset = queryset.select_related(None).select_related('device')
+
+        if use_cursor:
+            paginator = AttendanceKeysetPagination()
+            rows = paginator.paginate_queryset(queryset, request, view=self)
+            serializer = self.get_serializer(rows, many=True)
+            extra = {'users': self._user_side_table(rows)} if lean else {}
+            return paginator.get_paginated_response(serializer.data, **extra)
+
         # Apply limit to prevent large responses
         try:
             limit = int(limit)
@@ -1526,8 +1505,44 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             queryset = queryset[:100]  # Default to 100 if limit is invalid
         
         serializer = self.get_serializer(queryset, many=True)
+        if lean:
+            return Response({
+                'results': serializer.data,
+                'users': self._user_side_table(queryset),
+            })
         return Response(serializer.data)
 
+    def _user_side_table(self, rows):
+        """Build the deduplicated users table referenced by lean attendance rows"""
+        user_ids = {row.user_id for row in rows}
+        if not user_ids:
+            return {}
+        users = CustomUser.objects.filter(id__in=user_ids).values(
+            'id', 'first_name', 'last_name', 'email', 'employee_id',
+            'office_id', 'office__name', 'department__name'
+        )
+        return {
+            str(u['id']): {
+                'first_name': u['first_name'],
+                'last_name': u['last_name'],
+                'full_name': f"{u['first_name']} {u['last_name']}".strip(),
+                'email': u['email'],
+                'employee_id': u['employee_id'],
+                'office_id': str(u['office_id']) if u['office_id'] else None,
+                'office_name': u['office__name'],
+                'department_name': u['department__name'],
+            }
+            for u in users
+        }
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == 'list':
+            fields = [f.strip() for f in self.request.query_params.get('fields', '').split(',') if f.strip()]
+            if fields:
+                context['fields'] = fields
+        return context
+
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [IsAdminOrManager()]  # Only admin/manager can modify attendance
@@ -1538,6 +1553,8 @@ class AttendanceViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action == 'create':
             return AttendanceCreateSerializer
+        if self.action == 'list' and self.request.query_params.get('lean', '').lower() == 'true':
+            return AttendanceLeanSerializer
         return AttendanceSerializer
 
     @action(detail=False, methods=['post'])
@@ -1555,9 +1572,13 @@ class AttendanceViewSet(viewsets.ModelViewSet):
                     status=data['status'],
                     notes=data.get('notes', '')
                 )
+                attendance.copy_user_scope()
                 attendances.append(attendance)
             
             Attendance.objects.bulk_create(attendances)
+            # bulk_create skips signals, so flag the affected salaries and list ETags here
+            mark_salaries_stale(data['user_ids'], [data['date']])
+            bump_model_version(Attendance)
             return Response({'message': f'{len(attendances)} attendance records created'})
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -1668,136 +1689,18 @@ class AttendanceViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            # Create target date for the month and capture today's date once
-            target_date = date(year, month, 1)
-            today = date.today()
-            
-            # Get ALL days in the month (including weekends)
-            all_days = []
-            first_day = date(year, month, 1)
-            last_day = date(year, month, calendar.monthrange(year, month)[1])
-            current_date = first_day
-            
-            while current_date <= last_day:
-                all_days.append(current_date)
-                current_date += timedelta(days=1)
-            
+            month_calendar = get_month_calendar(year, month)
+
             # Get existing attendance records for the month
             existing_attendance = Attendance.objects.filter(
                 user=user,
-                date__gte=first_day,
-                date__lte=last_day
+                date__gte=month_calendar.first_day,
+                date__lte=month_calendar.last_day
             ).select_related('device')
-            
-            # Create a dictionary for quick lookup
             attendance_dict = {att.date: att for att in existing_attendance}
-            
-            # Prepare monthly data with all days
-            monthly_data = []
-            
-            for day in all_days:
-                if day in attendance_dict:
-                    # Existing attendance record
-                    attendance = attendance_dict[day]
-                    is_sunday = day.weekday() == 6
-
-                    # Rule: If the day is Sunday and the user is not present, treat as weekend
-                    if is_sunday and attendance.status not in ['present', 'half_day']:
-                        monthly_data.append({
-                            'id': str(attendance.id),
-                            'date': day.isoformat(),
-                            'check_in_time': None,
-                            'check_out_time': None,
-                            'total_hours': None,
-                            'status': 'weekend',
-                            'day_status': 'weekend',
-                            'is_late': False,
-                            'late_minutes': 0,
-                            'device_name': None,
-                            'notes': 'Sunday - Weekend',
-                            'created_at': attendance.created_at.isoformat() if attendance.created_at else None,
-                            'updated_at': attendance.updated_at.isoformat() if attendance.updated_at else None,
-                        })
-                    else:
-                        monthly_data.append({
-                            'id': str(attendance.id),
-                            'date': day.isoformat(),
-                            'check_in_time': attendance.check_in_time.isoformat() if attendance.check_in_time else None,
-                            'check_out_time': attendance.check_out_time.isoformat() if attendance.check_out_time else None,
-                            'total_hours': float(attendance.total_hours) if attendance.total_hours else None,
-                            'status': attendance.status,
-                            'day_status': attendance.day_status,
-                            'is_late': attendance.is_late,
-                            'late_minutes': attendance.late_minutes,
-                            'device_name': attendance.device.name if attendance.device else None,
-                            'notes': attendance.notes,
-                            'created_at': attendance.created_at.isoformat() if attendance.created_at else None,
-                            'updated_at': attendance.updated_at.isoformat() if attendance.updated_at else None,
-                        })
-                else:
-                    # Determine status based on date
-                    today = date.today()
-                    is_sunday = day.weekday() == 6  # Sunday = 6, Saturday = 5
-                    
-                    if day > today:
-                        # Future date - mark as upcoming
-                        status = 'upcoming'
-                        day_status = 'upcoming'
-                        notes = 'Upcoming day'
-                    elif is_sunday:
-                        # Only Sunday - mark as weekend
-                        status = 'weekend'
-                        day_status = 'weekend'
-                        notes = 'Sunday - Weekend'
-                    else:
-                        # Past working day without attendance - mark as absent (including Saturday)
-                        status = 'absent'
-                        day_status = 'absent'
-                        notes = 'No attendance recorded'
-                    
-                    monthly_data.append({
-                        'id': None,
-                        'date': day.isoformat(),
-                        'check_in_time': None,
-                        'check_out_time': None,
-                        'total_hours': None,
-                        'status': status,
-                        'day_status': day_status,
-                        'is_late': False,
-                        'late_minutes': 0,
-                        'device_name': None,
-                        'notes': notes,
-                        'created_at': None,
-                        'updated_at': None,
-                    })
-            
-            # Calculate monthly statistics
-            total_days_in_month = len(all_days)
-            present_days = sum(1 for day in monthly_data if day['status'] in ['present', 'half_day'])
-            absent_days = sum(1 for day in monthly_data if day['status'] == 'absent')
-            upcoming_days = sum(1 for day in monthly_data if day['status'] == 'upcoming')
-            weekend_days = sum(1 for day in monthly_data if day['status'] == 'weekend')
-            complete_days = sum(1 for day in monthly_data if day['day_status'] == 'complete_day')
-            half_days = sum(1 for day in monthly_data if day['day_status'] == 'half_day')
-            late_coming_days = sum(1 for day in monthly_data if day['is_late'] is True)
-            
-            # Calculate attendance rate based on past working days only (excluding upcoming days)
-            try:
-                past_working_days = sum(
-                    1
-                    for day in monthly_data
-                    if day['date'] <= today.isoformat()
-                    and day['status'] != 'upcoming'
-                    and not (datetime.strptime(day['date'], '%Y-%m-%d').weekday() >= 5)
-                )
-                if past_working_days > 0:
-                    attendance_rate = (present_days / past_working_days) * 100
-                else:
-                    attendance_rate = 0
-            except Exception:
-                # Be resilient to any unexpected parsing issues so endpoint never 500s for edge cases
-                attendance_rate = 0
-            
+
+            monthly_data, statistics = build_monthly_attendance(month_calendar, attendance_dict, date.today())
+
             # Prepare response
             response_data = {
                 'user': {
@@ -1811,20 +1714,10 @@ class AttendanceViewSet(viewsets.ModelViewSet):
                 'month': {
                     'year': year,
                     'month': month,
-                    'month_name': target_date.strftime('%B'),
-                    'total_days_in_month': total_days_in_month,
-                },
-                'statistics': {
-                    'total_days_in_month': total_days_in_month,
-                    'present_days': present_days,
-                    'absent_days': absent_days,
-                    'upcoming_days': upcoming_days,
-                    'weekend_days': weekend_days,
-                    'complete_days': complete_days,
-                    'half_days': half_days,
-                    'late_coming_days': late_coming_days,
-                    'attendance_rate': round(attendance_rate, 1),
+                    'month_name': month_calendar.month_name,
+                    'total_days_in_month': month_calendar.days_in_month,
                 },
+                'statistics': statistics,
                 'monthly_data': monthly_data
             }
             
@@ -1844,6 +1737,97 @@ class AttendanceViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['get'])
+    def monthly_attendance_batch(self, request):
+        """Get monthly attendance data for several users in one request"""
+        try:
+            year = int(request.query_params.get('year'))
+            month = int(request.query_params.get('month'))
+            user_ids = [uid.strip() for uid in request.query_params.get('users', '').split(',') if uid.strip()]
+            office_id = request.query_params.get('office')
+
+            if not user_ids and not office_id:
+                return Response(
+                    {'error': 'users or office parameter is required'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            import uuid
+            try:
+                user_ids = [uuid.UUID(uid) for uid in user_ids]
+                office_id = uuid.UUID(office_id) if office_id else None
+            except ValueError:
+                return Response(
+                    {'error': 'users and office must be valid UUIDs'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            users = CustomUser.objects.select_related('department', 'office').filter(is_active=True)
+            if user_ids:
+                users = users.filter(id__in=user_ids)
+            if office_id:
+                users = users.filter(office_id=office_id)
+
+            # Same visibility rules as the attendance list
+            if request.user.is_manager:
+                users = users.filter(office=request.user.office)
+            elif not request.user.is_admin:
+                users = users.filter(id=request.user.id)
+            users = list(users.order_by('first_name', 'last_name'))
+
+            month_calendar = get_month_calendar(year, month)
+            today = date.today()
+
+            attendance_by_user = {}
+            existing_attendance = Attendance.objects.filter(
+                user__in=users,
+                date__gte=month_calendar.first_day,
+                date__lte=month_calendar.last_day
+            ).select_related('device')
+            for att in existing_attendance:
+                attendance_by_user.setdefault(att.user_id, {})[att.date] = att
+
+            results = []
+            for user in users:
+                monthly_data, statistics = build_monthly_attendance(
+                    month_calendar, attendance_by_user.get(user.id, {}), today
+                )
+                results.append({
+                    'user': {
+                        'id': str(user.id),
+                        'first_name': user.first_name,
+                        'last_name': user.last_name,
+                        'employee_id': user.employee_id,
+                        'department': user.department.name if user.department else None,
+                        'office_name': user.office.name if user.office else None,
+                    },
+                    'statistics': statistics,
+                    'monthly_data': monthly_data,
+                })
+
+            return Response({
+                'month': {
+                    'year': year,
+                    'month': month,
+                    'month_name': month_calendar.month_name,
+                    'total_days_in_month': month_calendar.days_in_month,
+                },
+                'count': len(results),
+                'results': results,
+            })
+
+        except (ValueError, TypeError) as e:
+            return Response(
+                {'error': f'Invalid parameters: {str(e)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            logger.error(f"Error in monthly_attendance_batch: {str(e)}")
+            return Response(
+                {'error': f'An error occurred: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
     @action(detail=False, methods=['post'])
     def update_status(self, request):
         """Update attendance status for a specific date - Only for managers and admins"""
@@ -2116,7 +2100,7 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             
             # Apply filters
             if office_id:
-                queryset = queryset.filter(user__office_id=office_id)
+                queryset = queryset.filter(office_id=office_id)
             if user_id:
                 queryset = queryset.filter(user_id=user_id)
             
@@ -2700,7 +2684,7 @@ class ZKTecoAttendanceViewSet(viewsets.ViewSet):
             )
 
 
-class LeaveViewSet(viewsets.ModelViewSet):
+class LeaveViewSet(AccessScopeMixin, viewsets.ModelViewSet):
     """ViewSet for Leave model"""
     serializer_class = LeaveSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -2716,7 +2700,6 @@ class LeaveViewSet(viewsets.ModelViewSet):
     ordering_fields = ['start_date', 'end_date', 'created_at']
 
     def get_queryset(self):
-        user = self.request.user
         base_queryset = Leave.objects.select_related(
             'user', 
             'user__department', 
@@ -2724,13 +2707,7 @@ class LeaveViewSet(viewsets.ModelViewSet):
             'user__office',
             'approved_by'
         ).prefetch_related('user__department', 'user__designation')
-        
-        if user.is_admin:
-            return base_queryset
-        elif user.is_manager:
-            return base_queryset.filter(user__office=user.office)
-        else:
-            return base_queryset.filter(user=user)
+        return self.access_scope.filter(base_queryset, office_field='user__office', user_field='user')
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -2796,7 +2773,7 @@ class LeaveViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class DocumentViewSet(viewsets.ModelViewSet):
+class DocumentViewSet(AccessScopeMixin, viewsets.ModelViewSet):
     """ViewSet for Document model"""
     serializer_class = DocumentSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -2804,18 +2781,15 @@ class DocumentViewSet(viewsets.ModelViewSet):
     ordering_fields = ['title', 'created_at']
 
     def get_queryset(self):
-        user = self.request.user
         base_queryset = Document.objects.select_related('user', 'user__office', 'uploaded_by')
-        
-        if user.is_admin:
-            return base_queryset.all()
-        elif user.is_manager:
+        scope = self.access_scope
+
+        if scope.is_manager:
             # Managers can see documents uploaded by them or documents of their office employees
             return base_queryset.filter(
-                Q(uploaded_by=user) | Q(user__office=user.office)
+                Q(uploaded_by_id=scope.user_id) | Q(user__office__in=scope.office_ids)
             )
-        else:
-            return base_queryset.filter(user=user)
+        return scope.filter(base_queryset, office_field='user__office', user_field='user')
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -2923,26 +2897,14 @@ class DocumentViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
         
         try:
-            from django.http import FileResponse
             import os
-            import mimetypes
-            from urllib.parse import quote
+            from .file_serving import serve_file
             
-            file_path = document.file.path
-            if os.path.exists(file_path):
-                filename = os.path.basename(document.file.name) or os.path.basename(file_path)
-                content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
-                fh = open(file_path, 'rb')
-                response = FileResponse(fh, content_type=content_type)
-                # RFC 5987 encoding for UTF-8 filenames
-                response['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
-                try:
-                    response['Content-Length'] = os.path.getsize(file_path)
-                except Exception:
-                    pass
-                return response
-            else:
-                return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+            filename = os.path.basename(document.file.name) or os.path.basename(document.file.path)
+            # Streams from disk (or via X-Accel-Redirect/X-Sendfile) with Range and ETag support
+            return serve_file(request, document.file.path, filename)
+        except FileNotFoundError:
+            return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({'error': f'Error downloading file: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -3170,13 +3132,13 @@ class SystemSettingsViewSet(viewsets.ModelViewSet):
     """ViewSet for SystemSettings model - Admin only"""
     queryset = SystemSettings.objects.all()
     serializer_class = SystemSettingsSerializer
-    permission_classes = [IsAdminUser]
+    permission_classes = [IsAdminOnly]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['key', 'description']
     ordering_fields = ['key', 'created_at']
 
 
-class AttendanceLogViewSet(viewsets.ReadOnlyModelViewSet):
+class AttendanceLogViewSet(AccessScopeMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for AttendanceLog model - Read only"""
     serializer_class = AttendanceLogSerializer
     permission_classes = [IsAdminOrManager]
@@ -3184,13 +3146,7 @@ class AttendanceLogViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['created_at']
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_admin:
-            return AttendanceLog.objects.all()
-        elif user.is_manager:
-            return AttendanceLog.objects.filter(attendance__user__office=user.office)
-        else:
-            return AttendanceLog.objects.none()
+        return self.access_scope.filter(AttendanceLog.objects.all(), office_field='attendance__office')
 
 
 # Dashboard Views
@@ -3224,7 +3180,69 @@ def debug_user_permissions(request):
     })
 
 
-class DashboardViewSet(viewsets.ViewSet):
+@api_view(['GET'])
+@permission_classes([IsAdminOnly])
+def db_pool_status(request):
+    """
+    Connection pool and hourly connection budget for this worker process
+    """
+    from django.conf import settings as django_settings
+    from .db_pool.pool import pool_metrics
+
+    return Response({
+        'databases': {
+            alias: {
+                'engine': config.get('ENGINE'),
+                'conn_max_age': config.get('CONN_MAX_AGE', 0),
+                'pool': config.get('POOL'),
+            }
+            for alias, config in django_settings.DATABASES.items()
+        },
+        'pools': pool_metrics(),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminOnly])
+def conditional_get_status(request):
+    """
+    ETag revalidation counts (requests, 304s, hit rate) per viewset for this worker process
+    """
+    from .conditional import conditional_get_metrics
+
+    return Response({'resources': conditional_get_metrics()})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminOnly])
+def metrics_status(request):
+    """
+    Per-route request histograms and fetch daemon counters as JSON, with p50/p95/p99 estimates
+    """
+    from .metrics import collect, snapshot_as_json
+
+    return Response({'metrics': snapshot_as_json(collect())})
+
+
+def prometheus_metrics(request):
+    """
+    Prometheus scrape endpoint; authenticated with `Authorization: Bearer <METRICS_TOKEN>`.
+    Plain Django view: the JWT authentication would reject the scrape token.
+    """
+    import hmac
+    from django.conf import settings as django_settings
+    from django.http import Http404, HttpResponse
+    from .metrics import collect, render_prometheus
+
+    token = getattr(django_settings, 'METRICS_TOKEN', '')
+    if not token:
+        raise Http404()
+    supplied = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(supplied.encode('utf-8'), f'Bearer {token}'.encode('utf-8')):
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    return HttpResponse(render_prometheus(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+class DashboardViewSet(ReportingReadMixin, viewsets.ViewSet):
     """ViewSet for dashboard statistics"""
     permission_classes = [permissions.IsAuthenticated]
 
@@ -3248,11 +3266,11 @@ class DashboardViewSet(viewsets.ViewSet):
                 today_attendance = Attendance.objects.filter(
                     date=today, 
                     status='present',
-                    user__is_active=True
+                    user_active=True
                 ).count()
                 total_today_records = Attendance.objects.filter(
                     date=today,
-                    user__is_active=True
+                    user_active=True
                 ).count()
                 attendance_rate = (today_attendance / total_today_records * 100) if total_today_records > 0 else 0
                 
@@ -3306,14 +3324,14 @@ class DashboardViewSet(viewsets.ViewSet):
                 
                 # Office attendance statistics - only active users
                 today_attendance = Attendance.objects.filter(
-                    user__office=office,
-                    user__is_active=True,
+                    office=office,
+                    user_active=True,
                     date=today, 
                     status='present'
                 ).count()
                 total_today_records = Attendance.objects.filter(
-                    user__office=office,
-                    user__is_active=True,
+                    office=office,
+                    user_active=True,
                     date=today
                 ).count()
                 attendance_rate = (today_attendance / total_today_records * 100) if total_today_records > 0 else 0
@@ -3460,7 +3478,7 @@ class DashboardViewSet(viewsets.ViewSet):
         
         # Today's attendance for the office
         today_attendance = Attendance.objects.filter(
-            user__office=office,
+            office=office,
             date=today,
             status='present'
         ).count()
@@ -3485,7 +3503,7 @@ class DashboardViewSet(viewsets.ViewSet):
         # Recent activity (last 7 days)
         week_ago = today - timedelta(days=7)
         recent_attendance = Attendance.objects.filter(
-            user__office=office,
+            office=office,
             date__gte=week_ago
         ).count()
         
@@ -3664,7 +3682,7 @@ class DashboardViewSet(viewsets.ViewSet):
         
         # Build queryset for office attendance
         queryset = Attendance.objects.filter(
-            user__office=office
+            office=office
         ).select_related('user', 'user__office', 'device')
         
         # Apply filters
@@ -3773,7 +3791,7 @@ class DashboardViewSet(viewsets.ViewSet):
         })
 
 
-class ResignationViewSet(viewsets.ModelViewSet):
+class ResignationViewSet(AccessScopeMixin, viewsets.ModelViewSet):
     """ViewSet for Resignation model"""
     serializer_class = ResignationSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -3784,24 +3802,11 @@ class ResignationViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Get queryset based on user role"""
-        user = self.request.user
-        
-        if user.is_admin:
-            # Admin can see all resignations
-            return Resignation.objects.select_related('user', 'approved_by').all()
-        elif user.is_manager:
-            # Manager can see resignations from their office
-            if user.office:
-                return Resignation.objects.select_related('user', 'approved_by').filter(
-                    user__office=user.office
-                )
-            else:
-                return Resignation.objects.none()
-        else:
-            # Employee can only see their own resignations
-            return Resignation.objects.select_related('user', 'approved_by').filter(
-                user=user
-            )
+        # Admin: all; manager: their offices; employee: their own resignations
+        return self.access_scope.filter(
+            Resignation.objects.select_related('user', 'approved_by'),
+            office_field='user__office', user_field='user',
+        )
 
     def get_serializer_class(self):
         """Return appropriate serializer based on action"""
@@ -4042,10 +4047,12 @@ class ResignationViewSet(viewsets.ModelViewSet):
         )
 
 
-class DepartmentViewSet(viewsets.ReadOnlyModelViewSet):
+class DepartmentViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for Department model - Read only for dropdowns"""
     queryset = Department.objects.filter(is_active=True)
     serializer_class = DepartmentSerializer
+    conditional_models = (Department, Designation)
+    conditional_actions = ('list', 'retrieve', 'designations')
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
@@ -4061,10 +4068,11 @@ class DepartmentViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 
-class DesignationViewSet(viewsets.ReadOnlyModelViewSet):
+class DesignationViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for Designation model - Read only for dropdowns"""
     queryset = Designation.objects.filter(is_active=True)
     serializer_class = DesignationSerializer
+    conditional_models = (Designation, Department)
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description', 'department__name']
@@ -4170,7 +4178,7 @@ class DeviceUserFilter(django_filters.FilterSet):
         )
 
 
-class DeviceUserViewSet(viewsets.ModelViewSet):
+class DeviceUserViewSet(AccessScopeMixin, viewsets.ModelViewSet):
     """ViewSet for DeviceUser model"""
     serializer_class = DeviceUserSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -4180,19 +4188,9 @@ class DeviceUserViewSet(viewsets.ModelViewSet):
     ordering = ['device', 'device_user_id']
 
     def get_queryset(self):
-        user = self.request.user
-        
-        if user.is_superuser or user.is_admin:
-            # Superuser and admin can see all device users
-            return DeviceUser.objects.select_related('device', 'system_user', 'device__office').all()
-        elif user.is_manager:
-            # Manager can see device users from their office devices
-            return DeviceUser.objects.select_related('device', 'system_user', 'device__office').filter(
-                device__office=user.office
-            )
-        else:
-            # Other users have no access
-            return DeviceUser.objects.none()
+        queryset = DeviceUser.objects.select_related('device', 'system_user', 'device__office')
+        # Superuser/admin: all; manager: devices of their offices; others: none
+        return self.access_scope.filter(queryset, office_field='device__office', see_all=('admin', 'superuser'))
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -4333,36 +4331,52 @@ class DeviceUserViewSet(viewsets.ModelViewSet):
         """Get device user statistics"""
         queryset = self.get_queryset()
         
-        total_users = queryset.count()
-        mapped_users = queryset.filter(is_mapped=True).count()
-        unmapped_users = queryset.filter(is_mapped=False).count()
-        
-        # Group by device
-        device_stats = queryset.values('device__name', 'device__id').annotate(
+        # One grouped query by (device, privilege); every figure below is folded from it
+        grouped = queryset.order_by().values(
+            'device__id', 'device__name', 'device_user_privilege'
+        ).annotate(
             total_users=Count('id'),
-            mapped_users=Count('id', filter=Q(is_mapped=True)),
-            unmapped_users=Count('id', filter=Q(is_mapped=False))
+            mapped_users=Count('id', filter=Q(is_mapped=True))
         )
         
-        # Group by privilege
-        privilege_stats = queryset.values('device_user_privilege').annotate(
-            count=Count('id')
-        )
+        device_stats = {}
+        privilege_stats = {}
+        total_users = 0
+        mapped_users = 0
+        for row in grouped:
+            total_users += row['total_users']
+            mapped_users += row['mapped_users']
+            device = device_stats.setdefault(row['device__id'], {
+                'device__name': row['device__name'],
+                'device__id': row['device__id'],
+                'total_users': 0,
+                'mapped_users': 0,
+                'unmapped_users': 0,
+            })
+            device['total_users'] += row['total_users']
+            device['mapped_users'] += row['mapped_users']
+            device['unmapped_users'] += row['total_users'] - row['mapped_users']
+            privilege = row['device_user_privilege']
+            privilege_stats[privilege] = privilege_stats.get(privilege, 0) + row['total_users']
         
         return Response({
             'total_users': total_users,
             'mapped_users': mapped_users,
-            'unmapped_users': unmapped_users,
+            'unmapped_users': total_users - mapped_users,
             'mapping_percentage': round((mapped_users / total_users * 100) if total_users > 0 else 0, 2),
-            'device_stats': list(device_stats),
-            'privilege_stats': list(privilege_stats)
+            'device_stats': list(device_stats.values()),
+            'privilege_stats': [
+                {'device_user_privilege': privilege, 'count': count}
+                for privilege, count in privilege_stats.items()
+            ]
         })
 
 
-class ShiftViewSet(viewsets.ModelViewSet):
+class ShiftViewSet(ConditionalGetMixin, AccessScopeMixin, viewsets.ModelViewSet):
     """ViewSet for Shift model"""
     queryset = Shift.objects.all()
     serializer_class = ShiftSerializer
+    conditional_models = (Shift, Office, EmployeeShiftAssignment)
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'shift_type']
     ordering_fields = ['name', 'start_time', 'created_at']
@@ -4383,22 +4397,8 @@ class ShiftViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Get queryset based on user role"""
-        user = self.request.user
-        
-        if user.is_admin:
-            # Admin can see all shifts
-            return Shift.objects.all()
-        elif user.is_manager:
-            # Manager can only see shifts from their office
-            if user.office:
-                return Shift.objects.filter(office=user.office)
-            else:
-                return Shift.objects.none()
-        elif user.is_accountant:
-            # Accountant can see all shifts (read-only)
-            return Shift.objects.all()
-        else:
-            return Shift.objects.none()
+        # Admin/accountant (read-only): all shifts; manager: their offices' shifts
+        return self.access_scope.filter(Shift.objects.all(), office_field='office', see_all=('admin', 'accountant'))
 
     def perform_create(self, serializer):
         """Automatically set office and created_by for managers"""
@@ -4425,7 +4425,7 @@ class ShiftViewSet(viewsets.ModelViewSet):
             serializer.save(created_by=user)
 
 
-class EmployeeShiftAssignmentViewSet(viewsets.ModelViewSet):
+class EmployeeShiftAssignmentViewSet(AccessScopeMixin, viewsets.ModelViewSet):
     """ViewSet for EmployeeShiftAssignment model"""
     queryset = EmployeeShiftAssignment.objects.all()
     serializer_class = EmployeeShiftAssignmentSerializer
@@ -4437,18 +4437,13 @@ class EmployeeShiftAssignmentViewSet(viewsets.ModelViewSet):
     def get_pagination_class(self):
         """Disable pagination for list action to show all assignments"""
         if self.action == 'list':
-            logger.info("EmployeeShiftAssignmentViewSet - Pagination disabled for list action")
             return None
         return super().get_pagination_class()
     
     def list(self, request, *args, **kwargs):
         """Override list method to ensure all assignments are returned"""
         queryset = self.get_queryset()
-        logger.info(f"EmployeeShiftAssignmentViewSet.list - Final queryset count: {queryset.count()}")
-        
         serializer = self.get_serializer(queryset, many=True)
-        logger.info(f"EmployeeShiftAssignmentViewSet.list - Returning {len(serializer.data)} assignments")
-        
         return Response(serializer.data)
 
     def get_permissions(self):
@@ -4460,33 +4455,10 @@ class EmployeeShiftAssignmentViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Get queryset based on user role"""
-        user = self.request.user
-        
-        if user.is_admin:
-            # Admin can see all assignments
-            queryset = EmployeeShiftAssignment.objects.all()
-            logger.info(f"EmployeeShiftAssignmentViewSet - Admin: returning {queryset.count()} assignments")
-            return queryset
-        elif user.is_manager:
-            # Manager can only see assignments from their office
-            if user.office:
-                queryset = EmployeeShiftAssignment.objects.filter(shift__office=user.office)
-                logger.info(f"EmployeeShiftAssignmentViewSet - Manager: office={user.office}, returning {queryset.count()} assignments")
-                # Log some details about the assignments
-                for assignment in queryset[:5]:  # Log first 5 assignments
-                    logger.info(f"Assignment: {assignment.employee.get_full_name()} -> {assignment.shift.name} (Office: {assignment.shift.office.name})")
-                return queryset
-            else:
-                logger.info("EmployeeShiftAssignmentViewSet - Manager: no office assigned")
-                return EmployeeShiftAssignment.objects.none()
-        elif user.is_accountant:
-            # Accountant can see all assignments (read-only)
-            queryset = EmployeeShiftAssignment.objects.all()
-            logger.info(f"EmployeeShiftAssignmentViewSet - Accountant: returning {queryset.count()} assignments")
-            return queryset
-        else:
-            logger.info("EmployeeShiftAssignmentViewSet - No permission")
-            return EmployeeShiftAssignment.objects.none()
+        # Admin/accountant (read-only): all assignments; manager: their offices' shifts
+        return self.access_scope.filter(
+            EmployeeShiftAssignment.objects.all(), office_field='shift__office', see_all=('admin', 'accountant'),
+        )
 
     def perform_create(self, serializer):
         """Automatically set assigned_by for managers and validate for duplicates"""
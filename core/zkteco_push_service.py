@@ -13,6 +13,7 @@ from django.utils import timezone
 from django.db import transaction
 from django.conf import settings
 
+from . import metrics
 from .models import Device, CustomUser, Attendance, ESSLAttendanceLog
 
 logger = logging.getLogger(__name__)
@@ -23,6 +24,7 @@ class ZKTecoPushService:
     def __init__(self):
         self.active_devices = {}
         self.push_endpoints = {}
+        metrics.register_collector(self.collect_metrics)
         
     def register_device_for_push(self, device: Device, push_url: str = None):
         """Register a ZKTeco device for push data"""
@@ -63,13 +65,14 @@ class ZKTecoPushService:
         try:
             processed_count = 0
             error_count = 0
+            punch_times = []
             
             logger.info(f"Processing {len(attendance_data)} attendance records from {device.name}")
             
             with transaction.atomic():
                 for record in attendance_data:
                     try:
-                        if self._process_single_record(device, record):
+                        if self._process_single_record(device, record, punch_times):
                             processed_count += 1
                         else:
                             error_count += 1
@@ -86,6 +89,14 @@ class ZKTecoPushService:
                     self.push_endpoints[device.id]['last_push'] = timezone.now()
                     self.push_endpoints[device.id]['push_count'] += 1
             
+            # Committed: record ingest lag for the punches that changed attendance
+            committed_at = timezone.now()
+            if punch_times:
+                metrics.inc('attendance_punches_total', len(punch_times), device=device.name, source='zkteco_push')
+            for punch_time in punch_times:
+                metrics.observe('attendance_ingest_lag_seconds', (committed_at - punch_time).total_seconds(),
+                                source='zkteco_push')
+            
             result = {
                 'success': True,
                 'processed_count': processed_count,
@@ -106,8 +117,8 @@ class ZKTecoPushService:
                 'timestamp': timezone.now().isoformat()
             }
     
-    def _process_single_record(self, device: Device, record: Dict) -> bool:
-        """Process a single attendance record"""
+    def _process_single_record(self, device: Device, record: Dict, punch_times: Optional[List] = None) -> bool:
+        """Process a single attendance record; punch times that changed attendance are appended to punch_times"""
         try:
             # Extract user information
             user_id = record.get('user_id') or record.get('uid') or record.get('employee_id')
@@ -211,6 +222,8 @@ class ZKTecoPushService:
                     attendance_type=punch_type,
                     raw_data=json.dumps(record)
                 )
+                if punch_times is not None:
+                    punch_times.append(timestamp)
             
             return True
             
@@ -250,5 +263,14 @@ class ZKTecoPushService:
         
         return status
 
+    def collect_metrics(self, registry):
+        """Metrics collector: exports push_endpoints counters"""
+        for endpoint_info in list(self.push_endpoints.values()):
+            device_name = endpoint_info['device'].name
+            registry.set('attendance_push_batches_total', endpoint_info['push_count'], device=device_name)
+            if endpoint_info['last_push']:
+                registry.set('attendance_push_last_timestamp_seconds', endpoint_info['last_push'].timestamp(),
+                             device=device_name)
+
 # Global service instance
 zkteco_push_service = ZKTecoPushService()
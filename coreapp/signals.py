@@ -1,4 +1,4 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from decimal import Decimal
@@ -47,8 +47,27 @@ def apply_salary_increment(sender, instance, created, **kwargs):
 @receiver(pre_save, sender=Holiday)
 def update_holiday(sender, instance, **kwargs):
     """
-    Placeholder for holiday-related pre-save logic.
+    Remember the stored date so a moved holiday invalidates both months.
     """
-    if instance.is_paid and instance.double_pay_if_worked:
-        # Potential future logic
-        pass
\ No newline at end of file
+    instance._previous_date = None
+    if instance.pk:
+        instance._previous_date = Holiday.objects.filter(pk=instance.pk).values_list('date', flat=True).first()
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def invalidate_holiday_month_calendar(sender, instance, **kwargs):
+    """Drop cached month calendars affected by a holiday change"""
+    from core.month_calendar import invalidate_month_calendar_for_date
+
+    invalidate_month_calendar_for_date(instance.date)
+    invalidate_month_calendar_for_date(getattr(instance, '_previous_date', None))
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def bump_holiday_version(sender, instance, **kwargs):
+    """Invalidate the holiday list ETags"""
+    from core.conditional import bump_model_version
+
+    bump_model_version(Holiday)
@@ -10,6 +10,7 @@ from .serializers import (
     HolidaySerializer,  
 )
 from .permissions import IsAdminManagerOrSuperuser
+from core.conditional import ConditionalGetMixin
 
 
 class SalaryIncrementViewSet(viewsets.ModelViewSet):
@@ -176,13 +177,14 @@ class SalaryIncrementHistoryViewSet(viewsets.ReadOnlyModelViewSet):
         return qs
 
 
-class HolidayViewSet(viewsets.ModelViewSet):
+class HolidayViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     Create / Update / Delete holidays.
     """
 
     queryset = Holiday.objects.all()
     serializer_class = HolidaySerializer
+    conditional_models = (Holiday,)
     
     def get_permissions(self):
         """
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Worker cold-start benchmark.
+
+Runs each startup profile in a fresh interpreter under `python -X importtime`
+and reports wall time, total import time and the most expensive modules.
+PDF support must stay out of the web worker profile: if a forbidden module
+(WeasyPrint, cairo, pango) shows up there the script exits with status 1.
+
+Usage:
+    python importtime_benchmark.py                      # all profiles, 3 runs each
+    python importtime_benchmark.py --profile wsgi --repeat 5 --top 25
+    python importtime_benchmark.py --json importtime_history.jsonl   # append results
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+PROFILES = {
+    # What a WSGI/ASGI worker does before serving its first request
+    'wsgi': (
+        "from django.core.wsgi import get_wsgi_application\n"
+        "get_wsgi_application()\n"
+        "import attendance_system.urls\n"
+    ),
+    # What every management command (and the fetch daemons) pays
+    'setup': "import django\ndjango.setup()\n",
+    # Cost moved to the first PDF render
+    'pdf': (
+        "import django\ndjango.setup()\n"
+        "from core import pdf_engine\npdf_engine.get_weasyprint()\n"
+    ),
+}
+
+# Modules that must only be imported lazily by web workers
+FORBIDDEN = {
+    'wsgi': ('weasyprint', 'cairocffi', 'pydyf', 'tinycss2', 'cssselect2'),
+    'setup': ('weasyprint', 'cairocffi', 'pydyf'),
+}
+
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def run_profile(code, settings_module):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module, PYTHONDONTWRITEBYTECODE='1')
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - started
+
+    modules = []
+    for line in completed.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append({
+                'module': name,
+                'self_us': int(self_us),
+                'cumulative_us': int(cumulative_us),
+                'depth': len(indent) // 2,
+            })
+    errors = [line for line in completed.stderr.splitlines() if not line.startswith('import time:')]
+    return {
+        'returncode': completed.returncode,
+        'wall_seconds': wall,
+        'import_seconds': sum(module['self_us'] for module in modules) / 1_000_000,
+        'modules': modules,
+        'errors': errors[-5:],
+    }
+
+
+def summarize(name, runs, top):
+    walls = [run['wall_seconds'] for run in runs]
+    imports = [run['import_seconds'] for run in runs]
+    last = runs[-1]
+    print(f"\n== {name}: wall {statistics.median(walls):.3f}s (min {min(walls):.3f}s), "
+          f"imports {statistics.median(imports):.3f}s, {len(last['modules'])} modules")
+    if last['returncode'] != 0:
+        print(f"   exited with {last['returncode']}:")
+        for line in last['errors']:
+            print(f"   {line}")
+
+    # Top-level packages by cumulative time are what a lazy import would save
+    top_level = sorted(
+        (module for module in last['modules'] if module['depth'] == 0),
+        key=lambda module: module['cumulative_us'],
+        reverse=True,
+    )[:top]
+    for module in top_level:
+        print(f"   {module['cumulative_us'] / 1000:9.1f} ms  {module['module']}")
+
+    imported = {module['module'].split('.')[0] for module in last['modules']}
+    return sorted(imported & set(FORBIDDEN.get(name, ())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profile', choices=sorted(PROFILES), action='append',
+                        help='Profile to run (repeatable; default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per profile; the median is reported')
+    parser.add_argument('--top', type=int, default=15, help='Top-level imports to list per profile')
+    parser.add_argument('--settings', default=os.environ.get('DJANGO_SETTINGS_MODULE', 'attendance_system.settings'),
+                        help='DJANGO_SETTINGS_MODULE for the child interpreters')
+    parser.add_argument('--json', metavar='FILE', help='Append one JSON line per profile to FILE')
+    args = parser.parse_args()
+
+    violations = {}
+    failed = []
+    for name in args.profile or list(PROFILES):
+        runs = [run_profile(PROFILES[name], args.settings) for _ in range(max(args.repeat, 1))]
+        forbidden = summarize(name, runs, args.top)
+        if any(run['returncode'] != 0 for run in runs):
+            failed.append(name)
+        if forbidden:
+            violations[name] = forbidden
+
+        if args.json:
+            record = {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'profile': name,
+                'python': sys.version.split()[0],
+                'wall_seconds': round(statistics.median(run['wall_seconds'] for run in runs), 4),
+                'import_seconds': round(statistics.median(run['import_seconds'] for run in runs), 4),
+                'module_count': len(runs[-1]['modules']),
+                'forbidden_imports': forbidden,
+            }
+            with open(args.json, 'a') as history:
+                history.write(json.dumps(record) + '\n')
+
+    for name, modules in violations.items():
+        print(f"\n!! {name} imports PDF modules at startup: {', '.join(modules)}")
+    if failed:
+        print(f"\n!! profiles failed to start: {', '.join(failed)}")
+        return 2
+    return 1 if violations else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+API response size and render-time benchmark.
+
+Renders representative payloads (reports rawData, monthly_attendance, the user
+list, a salary report) with DRF's JSONRenderer and core.renderers.FastJSONRenderer,
+then compresses each body with gzip and brotli at the levels the compression
+middleware uses. Reports median render / compress time and bytes on the wire.
+
+Usage:
+    python response_benchmark.py                          # all payloads, default sizes
+    python response_benchmark.py --payload monthly_attendance --scale 3 --repeat 20
+    python response_benchmark.py --json response_history.jsonl   # append results
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+OFFICES = ['Head Office', 'North Branch', 'South Branch', 'Warehouse', 'Field Operations']
+DEPARTMENTS = ['Accounts', 'Human Resources', 'Operations', 'Sales', 'Logistics', 'IT']
+STATUSES = ['present', 'present', 'present', 'present', 'absent', 'late', 'leave']
+
+
+def _people(rng, count):
+    return [
+        {
+            'id': uuid.UUID(int=rng.getrandbits(128)),
+            'first_name': rng.choice(['Asha', 'Ravi', 'Meera', 'Arjun', 'Fatima', 'John', 'Priya', 'Vikram']),
+            'last_name': rng.choice(['Sharma', 'Patel', 'Khan', 'Nair', 'Iyer', 'Das', 'Singh']),
+            'employee_id': f'EMP{index:05d}',
+            'office': rng.choice(OFFICES),
+            'department': rng.choice(DEPARTMENTS),
+        }
+        for index in range(count)
+    ]
+
+
+def reports_raw_data(rng, scale):
+    """ReportsViewSet.attendance rawData page: values() rows with ISO strings"""
+    people = _people(rng, 100 * scale)
+    start = date(2025, 1, 1)
+    rows = []
+    for index in range(500 * scale):
+        person = rng.choice(people)
+        day = start + timedelta(days=index % 28)
+        check_in = datetime.combine(day, dt_time(9, rng.randint(0, 59)), dt_timezone.utc)
+        rows.append({
+            'id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'date': day.isoformat(),
+            'check_in_time': check_in.isoformat(),
+            'check_out_time': (check_in + timedelta(hours=8, minutes=rng.randint(0, 90))).isoformat(),
+            'status': rng.choice(STATUSES),
+            'user__id': str(person['id']),
+            'user__first_name': person['first_name'],
+            'user__last_name': person['last_name'],
+            'user__employee_id': person['employee_id'],
+            'user__office__name': person['office'],
+            'user__department__name': person['department'],
+        })
+    return {'summary': {'total_records': len(rows)}, 'rawData': rows}
+
+
+def monthly_attendance(rng, scale):
+    """AttendanceViewSet.monthly_attendance: one row per employee with a 31-day calendar"""
+    result = []
+    for person in _people(rng, 40 * scale):
+        days = []
+        for day_number in range(1, 32):
+            status = rng.choice(STATUSES)
+            worked = status in ('present', 'late')
+            days.append({
+                'id': str(uuid.UUID(int=rng.getrandbits(128))) if worked else None,
+                'date': date(2025, 1, day_number).isoformat(),
+                'check_in_time': f'2025-01-{day_number:02d}T09:{rng.randint(0, 59):02d}:00+05:30' if worked else None,
+                'check_out_time': f'2025-01-{day_number:02d}T18:{rng.randint(0, 59):02d}:00+05:30' if worked else None,
+                'total_hours': round(rng.uniform(7, 10), 2) if worked else None,
+                'status': status,
+                'day_status': 'complete_day' if worked else status,
+                'is_late': status == 'late',
+                'late_minutes': rng.randint(1, 60) if status == 'late' else 0,
+                'device_name': 'Main Gate' if worked else None,
+                'notes': '',
+                'created_at': None,
+                'updated_at': None,
+            })
+        result.append({
+            'user_id': str(person['id']),
+            'user_name': f"{person['first_name']} {person['last_name']}",
+            'employee_id': person['employee_id'],
+            'office_name': person['office'],
+            'attendance': days,
+        })
+    return result
+
+
+def user_list(rng, scale):
+    """CustomUserViewSet.list-like rows; native UUID / datetime / Decimal values"""
+    joined = datetime(2022, 4, 1, tzinfo=dt_timezone.utc)
+    return [
+        {
+            'id': person['id'],
+            'username': person['employee_id'].lower(),
+            'first_name': person['first_name'],
+            'last_name': person['last_name'],
+            'email': f"{person['employee_id'].lower()}@example.com",
+            'employee_id': person['employee_id'],
+            'role': rng.choice(['employee'] * 8 + ['manager', 'accountant']),
+            'office_name': person['office'],
+            'department_name': person['department'],
+            'designation_name': 'Executive',
+            'salary': Decimal(rng.randint(18000, 90000)).quantize(Decimal('0.01')),
+            'date_joined': joined + timedelta(days=rng.randint(0, 900), seconds=rng.randint(0, 86400)),
+            'is_active': True,
+        }
+        for person in _people(rng, 250 * scale)
+    ]
+
+
+def salary_report(rng, scale):
+    """Salary report rows: Decimal amounts, as values() returns them"""
+    rows = []
+    for person in _people(rng, 250 * scale):
+        basic = Decimal(rng.randint(18000, 90000))
+        allowances = (basic * Decimal('0.2')).quantize(Decimal('0.01'))
+        deductions = (basic * Decimal('0.05')).quantize(Decimal('0.01'))
+        rows.append({
+            'id': uuid.UUID(int=rng.getrandbits(128)),
+            'employee_id': person['employee_id'],
+            'employee_name': f"{person['first_name']} {person['last_name']}",
+            'office_name': person['office'],
+            'department_name': person['department'],
+            'salary_month': date(2025, 1, 1),
+            'basic_pay': basic,
+            'allowances': allowances,
+            'deductions': deductions,
+            'net_salary': basic + allowances - deductions,
+            'worked_days': rng.randint(20, 31),
+            'status': rng.choice(['draft', 'approved', 'paid']),
+        })
+    return {'count': len(rows), 'results': rows}
+
+
+PAYLOADS = {
+    'reports_raw_data': reports_raw_data,
+    'monthly_attendance': monthly_attendance,
+    'user_list': user_list,
+    'salary_report': salary_report,
+}
+
+
+def timed(function, repeat):
+    """(median seconds, last result)"""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations), result
+
+
+def bench_payload(name, data, renderers, repeat, gzip_level, brotli_quality):
+    print(f"\n== {name}")
+    results = []
+    reference = None
+    for label, renderer in renderers:
+        render_seconds, body = timed(lambda: renderer.render(data, 'application/json', {}), repeat)
+        if reference is None:
+            reference = json.loads(body)
+        elif json.loads(body) != reference:
+            print(f"   !! {label} output differs from {renderers[0][0]}")
+
+        gzip_seconds, gzipped = timed(lambda: gzip.compress(body, compresslevel=gzip_level, mtime=0), repeat)
+        row = {
+            'payload': name,
+            'renderer': label,
+            'render_ms': round(render_seconds * 1000, 3),
+            'json_bytes': len(body),
+            'gzip_bytes': len(gzipped),
+            'gzip_ms': round(gzip_seconds * 1000, 3),
+            'br_bytes': None,
+            'br_ms': None,
+        }
+        if brotli is not None:
+            br_seconds, compressed = timed(
+                lambda: brotli.compress(body, quality=brotli_quality), repeat
+            )
+            row['br_bytes'] = len(compressed)
+            row['br_ms'] = round(br_seconds * 1000, 3)
+        results.append(row)
+
+        br = f"br {row['br_bytes']:>9,} B in {row['br_ms']:7.2f} ms" if row['br_bytes'] is not None else 'br  (brotli not installed)'
+        print(f"   {label:<10} render {row['render_ms']:8.2f} ms  json {row['json_bytes']:>10,} B  "
+              f"gzip {row['gzip_bytes']:>9,} B in {row['gzip_ms']:7.2f} ms  {br}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--payload', choices=sorted(PAYLOADS), action='append',
+                        help='Payload to run (repeatable; default: all)')
+    parser.add_argument('--scale', type=int, default=1, help='Multiply payload row counts')
+    parser.add_argument('--repeat', type=int, default=10, help='Runs per measurement; the median is reported')
+    parser.add_argument('--settings', default=os.environ.get('DJANGO_SETTINGS_MODULE', 'attendance_system.settings'),
+                        help='DJANGO_SETTINGS_MODULE (renderers read REST_FRAMEWORK / compression settings)')
+    parser.add_argument('--json', metavar='FILE', help='Append one JSON line per payload and renderer to FILE')
+    args = parser.parse_args()
+
+    os.environ['DJANGO_SETTINGS_MODULE'] = args.settings
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import django
+    django.setup()
+    from django.conf import settings
+    from rest_framework.renderers import JSONRenderer
+    from core.renderers import FastJSONRenderer
+
+    renderers = [('drf', JSONRenderer())]
+    if FastJSONRenderer.available:
+        renderers.append(('orjson', FastJSONRenderer()))
+    else:
+        print('orjson is not installed: FastJSONRenderer falls back to JSONRenderer, only drf is measured')
+
+    gzip_level = 6  # django.utils.text.compress_string, used by GZipMiddleware
+    brotli_quality = getattr(settings, 'RESPONSE_COMPRESSION_BROTLI_QUALITY', 5)
+    print(f"gzip level {gzip_level}, brotli quality {brotli_quality}, median of {args.repeat} runs")
+
+    for name in args.payload or list(PAYLOADS):
+        data = PAYLOADS[name](random.Random(42), max(args.scale, 1))
+        results = bench_payload(name, data, renderers, max(args.repeat, 1), gzip_level, brotli_quality)
+        if args.json:
+            with open(args.json, 'a') as history:
+                for row in results:
+                    record = {
+                        'timestamp': datetime.now().isoformat(timespec='seconds'),
+                        'python': sys.version.split()[0],
+                        'scale': args.scale,
+                        **row,
+                    }
+                    history.write(json.dumps(record) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())